@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the boxcar filters in wcslib: running-sum kernel
+(`kernels.moving_sum`) versus direct-form FIR filtering with
+`scipy.signal.lfilter(np.ones(Kb), 1, x)`.
+
+Prints the time of `wcslib.decode_baseband_signal()` with either kernel as a
+function of the pulse width Kb and the signal length N:
+
+$ python3 benchmarks/bench_boxcar.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+from scipy import signal
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import detection
+import wcslib as wcs
+
+
+def lfilter_sum(x, K, segment=None):
+    return signal.lfilter(np.ones(K), 1, x, axis=-1)
+
+
+def bench(Kb, N, repeat):
+    rng = np.random.default_rng(0)
+    fs = 20000
+    yb = rng.standard_normal(N) + 1j*rng.standard_normal(N)
+
+    def run(kernel):
+        wcs.moving_sum = detection.moving_sum = kernel
+        return min(timeit.repeat(
+            lambda: wcs.decode_baseband_signal(yb.copy(), Kb/fs, fs),
+            number=1, repeat=repeat
+        ))
+
+    moving_sum = wcs.moving_sum
+    try:
+        t_lfilter = run(lfilter_sum)
+        t_cumsum = run(moving_sum)
+    finally:
+        wcs.moving_sum = detection.moving_sum = moving_sum
+    return t_lfilter, t_cumsum
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--Kb', type=int, nargs='+', default=[10, 100, 1000, 4000])
+    parser.add_argument('-N', type=int, nargs='+', default=[10**5, 10**6])
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'Kb':>6} {'N':>9} {'lfilter [s]':>12} {'cumsum [s]':>12} {'speed-up':>9}")
+    for N in args.N:
+        for Kb in args.Kb:
+            t_lfilter, t_cumsum = bench(Kb, N, args.repeat)
+            print(f"{Kb:>6} {N:>9} {t_lfilter:>12.4f} {t_cumsum:>12.4f} {t_lfilter/t_cumsum:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the multi-burst synchronization: Time to find all bursts in
+recordings of increasing length (a recording with three bursts, repeated), and
+the time per sample normalized by log2(N), which stays roughly constant for
+O(N log N) scaling:
+
+$ python3 benchmarks/bench_burstsync.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+from scipy import signal
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import burstsync
+import wcslib as wcs
+from filters import design_bandpass, design_lowpass
+from parameters import Tb, fc, fs
+
+
+def recording(rng):
+    pieces = [np.zeros(15000)]
+    for msg, A in [("First", 1.0), ("Second burst", 0.5), ("3rd", 2.0)]:
+        xb = wcs.encode_baseband_signal(wcs.encode_string(msg), Tb, fs)
+        pieces += [A*xb*np.sin(2*np.pi*fc*np.arange(len(xb))/fs), np.zeros(10000)]
+    x = signal.sosfilt(design_bandpass(), np.concatenate(pieces) + 0.3*rng.standard_normal(sum(map(len, pieces))))
+    t = np.arange(len(x))/fs
+    return signal.sosfilt(design_lowpass(), 2*x*np.exp(1j*2*np.pi*fc*t))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-r', '--repeats', type=int, nargs='+', default=[1, 4, 16, 64], help='number of repetitions of the recording')
+    parser.add_argument('-q', type=int, default=1, help='decimation factor')
+    args = parser.parse_args()
+
+    yb = recording(np.random.default_rng(0))[::args.q]
+    print(f"{'N':>10} {'bursts':>7} {'time [s]':>9} {'ns/(N log2 N)':>14}")
+    for r in args.repeats:
+        y = np.tile(yb, r)
+        t = min(timeit.repeat(lambda: burstsync.find_bursts(y, Tb, fs/args.q), number=1, repeat=3))
+        n = len(burstsync.find_bursts(y, Tb, fs/args.q))
+        print(f"{len(y):>10} {n:>7} {t:>9.3f} {1e9*t/(len(y)*np.log2(len(y))):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the string codec: Time to encode and decode a payload with the
+former per-character implementation of `encode_string()`/`decode_string()` and
+with the current bytes-based one, for increasing payload sizes:
+
+$ python3 benchmarks/bench_codec.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+
+
+def encode_string_loop(instr):
+    tmp = [np.uint8(ord(c)) for c in instr]
+    return np.unpackbits(tmp)
+
+
+def decode_string_loop(inbin):
+    tmp = np.packbits(inbin)
+    return "".join([chr(b) for b in tmp])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--size', type=int, nargs='+', default=[10**3, 10**5, 10**6, 10**7], help='payload sizes (characters)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'size':>9} {'loop enc [s]':>13} {'loop dec [s]':>13} {'enc [s]':>9} {'dec [s]':>9} {'MB/s':>8}")
+    for n in args.size:
+        s = rng.integers(32, 127, n).astype(np.uint8).tobytes().decode('ascii')
+        b = wcs.encode_string(s)
+        t = [
+            min(timeit.repeat(lambda: f(x), number=1, repeat=3))
+            for f, x in [(encode_string_loop, s), (decode_string_loop, b), (wcs.encode_string, s), (wcs.decode_string, b)]
+        ]
+        assert wcs.decode_string(b) == decode_string_loop(encode_string_loop(s))
+        print(f"{n:>9} {t[0]:>13.4f} {t[1]:>13.4f} {t[2]:>9.4f} {t[3]:>9.4f} {n/1e6/(t[2]+t[3]):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
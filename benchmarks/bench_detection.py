@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the signal detection: Time of the chi-squared test of the
+normalized energy when the CDF is evaluated for every sample
+(`chi2.cdf(xm2/var, 2*Kb) > 0.99`) and when the energy is compared to the
+cached 99 % quantile (`detection.EnergyDetector`), for increasing signal
+lengths:
+
+$ python3 benchmarks/bench_detection.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+from scipy.stats import chi2
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from detection import EnergyDetector
+from kernels import moving_sum
+
+
+def cdf_test(xm, Kb):
+    xm2 = moving_sum(xm**2, Kb)
+    return chi2.cdf(xm2/np.var(xm, dtype=np.float64), 2*Kb) > 0.99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--Kb', type=int, default=1000, help='pulse width (samples)')
+    parser.add_argument('-N', type=int, nargs='+', default=[10**4, 10**5, 10**6], help='signal lengths (samples)')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'N':>9} {'cdf [s]':>10} {'quantile [s]':>13} {'speed-up':>9}")
+    for N in args.N:
+        xm = np.abs(rng.standard_normal(N) + 1j*rng.standard_normal(N))
+        assert np.array_equal(cdf_test(xm, args.Kb), EnergyDetector(args.Kb).process(xm))
+        t_cdf = min(timeit.repeat(lambda: cdf_test(xm, args.Kb), number=1, repeat=args.repeat))
+        t_ppf = min(timeit.repeat(lambda: EnergyDetector(args.Kb).process(xm), number=1, repeat=args.repeat))
+        print(f"{N:>9} {t_cdf:>10.4f} {t_ppf:>13.4f} {t_cdf/t_ppf:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
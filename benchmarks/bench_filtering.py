@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the filtering backends: Time per sample of direct (SOS) and
+overlap-save (OLS) filtering for our bandpass and lowpass designs and for
+bandpass designs of increasing order, for several block sizes, together with
+the backend chosen by `filtering.make_filter()`:
+
+$ python3 benchmarks/bench_filtering.py
+
+The first lines calibrate the constants of the cost model in `filtering`; the
+last lines give the crossover, the smallest filter (in sections) for which
+overlap-save is measured faster, per block size.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+from scipy import fft, signal
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import filtering
+from filters import design, design_bandpass, design_lowpass
+from parameters import fs
+
+
+def time_per_sample(filt, x, blocksize):
+    def run():
+        filt.reset()
+        for n in range(0, x.shape[0], blocksize):
+            filt.process(x[n:n+blocksize])
+    return 1e9*min(timeit.repeat(run, number=1, repeat=3))/x.shape[0]
+
+
+def calibrate(N):
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(N)
+    sos = np.tile(design_bandpass()[:1], (16, 1))
+    t_sos = 1e9*min(timeit.repeat(lambda: signal.sosfilt(sos, x), number=1, repeat=3))/(N*16)
+
+    n = 8192
+    X = rng.standard_normal((N//n, n))
+    H = fft.rfft(rng.standard_normal(n))
+    t_fft = 1e9*min(timeit.repeat(lambda: fft.irfft(fft.rfft(X)*H, n), number=1, repeat=3))/(X.shape[0]*n*np.log2(n))
+    return t_sos, t_fft
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-N', type=int, default=2**20, help='signal length (samples)')
+    parser.add_argument('-b', '--blocksize', type=int, nargs='+', default=[256, 2048, 16384, 2**20])
+    args = parser.parse_args()
+
+    t_sos, t_fft = calibrate(args.N)
+    print(f"sos_cost = {t_sos:.2f} ns per sample and section (model: {filtering.sos_cost})")
+    print(f"fft_cost = {t_fft:.2f} ns per nfft*log2(nfft) (model: {filtering.fft_cost})")
+    print()
+
+    filters = [('bandpass', design_bandpass()), ('lowpass', design_lowpass())]
+    for gstop in [60, 80, 100, 120]:
+        filters.append((f'bandpass {gstop} dB', design(wp=(2425, 2575), ws=(2300, 2700), gpass=1, gstop=gstop, fs=fs)))
+
+    x = np.random.default_rng(1).standard_normal(args.N)
+    crossover = {}
+    print(f"{'filter':>18} {'sections':>9} {'L':>6} {'block':>8} {'sos [ns]':>9} {'ols [ns]':>9} {'faster':>7} {'chosen':>7}")
+    for name, sos in filters:
+        h = filtering.impulse_response(sos)
+        L = '-' if h is None else h.shape[0]
+        for blocksize in args.blocksize:
+            t_direct = time_per_sample(filtering.SOSFilter(sos), x, blocksize)
+            chosen = filtering.make_filter(sos, blocksize)
+            if h is not None:
+                backend, nfft = filtering.select_backend(sos.shape[0], h.shape[0], blocksize)
+                ols = filtering.OverlapSaveFilter(h, nfft)
+                t_ols = time_per_sample(ols, x, blocksize)
+            else:
+                t_ols = np.inf
+            faster = 'sos' if t_direct <= t_ols else 'ols'
+            if faster == 'ols' and blocksize not in crossover:
+                crossover[blocksize] = (name, sos.shape[0], L)
+            print(f"{name:>18} {sos.shape[0]:>9} {L:>6} {blocksize:>8} {t_direct:>9.1f} {t_ols:>9.1f} {faster:>7} {chosen.backend:>7}")
+
+    print()
+    for blocksize in args.blocksize:
+        if blocksize in crossover:
+            name, nsections, L = crossover[blocksize]
+            print(f"block {blocksize}: ols faster from {name} ({nsections} sections, L={L})")
+        else:
+            print(f"block {blocksize}: sos faster for all filters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import-time benchmark: measures the time it takes to import each module (with
+`python -X importtime`, in a fresh interpreter) and optionally writes the
+results to a JSON file so that they can be tracked over time:
+
+$ python3 benchmarks/bench_import.py --json import_times.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODULES = ['wcslib', 'filters', 'transmitter', 'receiver']
+
+
+def import_time(module: str) -> float:
+    """
+    Returns the cumulative import time of `module` in milliseconds.
+    """
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    for line in out.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1])/1000
+    raise RuntimeError(f'no import time reported for {module}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'module':<12} {'import [ms]':>12}")
+    for module in args.modules:
+        results[module] = min(import_time(module) for _ in range(args.repeat))
+        print(f"{module:<12} {results[module]:>12.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
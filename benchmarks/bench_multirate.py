@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the multirate receiver: Time to decimate and decode a baseband
+signal as a function of the decimation factor q, and the bit error rate of the
+full receiver chain (Monte Carlo simulation) for the same factors:
+
+$ python3 benchmarks/bench_multirate.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+import montecarlo as mc
+from multirate import decimate
+from parameters import Tb, fs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-q', type=int, nargs='+', default=[1, 2, 5, 10, 20])
+    parser.add_argument('-N', type=int, default=10**6, help='signal length (samples)')
+    parser.add_argument('-n', '--trials', type=int, default=128, help='Monte Carlo trials per factor')
+    parser.add_argument('-a', '--amplitude', type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    yb = rng.standard_normal(args.N) + 1j*rng.standard_normal(args.N)
+    b = wcs.encode_string("Hello World!")
+
+    print(f"{'q':>4} {'decode [s]':>11} {'speed-up':>9} {'BER':>8}")
+    t1 = None
+    for q in args.q:
+        t = min(timeit.repeat(
+            lambda: wcs.decode_baseband_signal(decimate(yb, q), Tb, fs/q, q),
+            number=1, repeat=3
+        ))
+        t1 = t if t1 is None else t1
+        result = mc.run_trials(b, args.trials, Ac=args.amplitude, decimation=q, rng=np.random.default_rng(1))
+        print(f"{q:>4} {t:>11.4f} {t1/t:>8.1f}x {result.ber():>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
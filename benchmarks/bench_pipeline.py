@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the transmitter and receiver pipelines: Messages per second when
+every message is encoded and decoded from scratch (designing the filters,
+building the carrier, as `transmitter.main()` and `receiver.main()` did) and
+with a `TxPipeline`/`RxPipeline` built once, for increasing message lengths:
+
+$ python3 benchmarks/bench_pipeline.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+from scipy import signal
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from nco import NCO
+from parameters import Tb, fc, fs
+from pipeline import PipelineConfig, RxPipeline, TxPipeline
+
+
+def design():
+    sos_bp = signal.iirdesign(wp=[2425, 2575], ws=[2300, 2700], gpass=1, gstop=40, output='sos', fs=fs)
+    sos_lp = signal.iirdesign(wp=100, ws=500, gpass=1, gstop=40, output='sos', fs=fs)
+    return sos_bp, sos_lp
+
+
+def encode(msg):
+    sos_bp, _ = design()
+    xb = wcs.encode_baseband_signal(wcs.encode_string(msg), Tb, fs)
+    return signal.sosfilt(sos_bp, xb*NCO(fc, fs).sin(len(xb)))
+
+
+def decode(y):
+    sos_bp, sos_lp = design()
+    y = signal.sosfilt(sos_lp, NCO(fc, fs).mix(signal.sosfilt(sos_bp, y)))
+    return wcs.decode_baseband_signal(y, Tb, fs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--size', type=int, nargs='+', default=[1, 4, 16, 64], help='message lengths (characters)')
+    parser.add_argument('-r', '--repeat', type=int, default=20, help='messages per measurement')
+    args = parser.parse_args()
+
+    config = PipelineConfig(Ac=1.0)
+    tx, rx = TxPipeline(config), RxPipeline(config)
+    rng = np.random.default_rng(0)
+
+    print(f"{'chars':>6} {'enc msg/s':>10} {'pipe msg/s':>11} {'dec msg/s':>10} {'pipe msg/s':>11}")
+    for n in args.size:
+        msg = 'x'*n
+        y = np.concatenate((np.zeros(2000), tx.encode(msg), np.zeros(2000)))
+        y = y + 0.01*rng.standard_normal(len(y))
+        assert wcs.decode_string(rx.decode(y)) == wcs.decode_string(decode(y)) == msg
+        rates = [
+            args.repeat/min(timeit.repeat(lambda: f(x), number=args.repeat, repeat=3))
+            for f, x in [(encode, msg), (tx.encode, msg), (decode, y), (rx.decode, y)]
+        ]
+        print(f"{n:>6} {rates[0]:>10.0f} {rates[1]:>11.0f} {rates[2]:>10.0f} {rates[3]:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
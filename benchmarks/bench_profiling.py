@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the profiling overhead: Cost of a profiled stage when profiling
+is disabled and enabled, and the time of the receiver (`RxPipeline.decode()`
+of a whole message, and the streaming receiver block by block) with
+profiling disabled, enabled, and with allocation tracing:
+
+$ python3 benchmarks/bench_profiling.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import profiling
+from filters import design_bandpass, design_lowpass
+from parameters import Tb, fc, fs
+from pipeline import PipelineConfig, RxPipeline, TxPipeline
+from streaming import StreamingReceiver
+
+
+def stream(x, blocksize):
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs)
+    for i in range(0, x.shape[0], blocksize):
+        rx.receive(x[i:i+blocksize])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--blocksize', type=int, default=2048)
+    args = parser.parse_args()
+
+    def empty():
+        with profiling.stage('empty', 1):
+            pass
+
+    n = 100000
+    profiling.disable()
+    t_disabled = min(timeit.repeat(empty, number=n, repeat=args.repeat))/n
+    profiling.enable()
+    t_enabled = min(timeit.repeat(empty, number=n, repeat=args.repeat))/n
+    profiling.disable()
+    print(f"Stage overhead: {1e9*t_disabled:.0f} ns disabled, {1e9*t_enabled:.0f} ns enabled")
+
+    tx, rx = TxPipeline(PipelineConfig(Ac=0.5)), RxPipeline()
+    x = np.concatenate((np.zeros(20000), tx.encode('Hello World!'), np.zeros(20000)))
+    x = x + 0.01*np.random.default_rng(0).standard_normal(x.shape[0])
+    runs = [('decode', lambda: rx.decode(x)), ('stream', lambda: stream(x, args.blocksize))]
+
+    print(f"{'':>8} {'disabled [ms]':>14} {'enabled [ms]':>13} {'memory [ms]':>12}")
+    for name, f in runs:
+        times = []
+        for mode in [None, False, True]:
+            if mode is not None:
+                profiling.enable(trace_allocations=mode)
+            times.append(1e3*min(timeit.repeat(f, number=1, repeat=args.repeat)))
+            profiling.disable()
+        print(f"{name:>8} {times[0]:>14.2f} {times[1]:>13.2f} {times[2]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the M-PSK modulation modes: Bit error rate versus SNR through
+`wcslib.simulate_channel()` for BPSK, QPSK, and 8-PSK at the same symbol rate
+(that is, in the same channel bandwidth), together with the net bit rate:
+
+$ python3 benchmarks/bench_psk.py
+
+Bits that were not decoded (e.g., when the receiver did not synchronize) count
+as errors.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import filtering
+import wcslib as wcs
+from filters import design_bandpass, design_lowpass
+from nco import NCO
+from parameters import Tb, fc, fs
+
+
+def transmit(b, M, Ac, sos_bp):
+    xb = wcs.encode_baseband_signal(b, Tb, fs, M=M)
+    phasor = NCO(fc, fs).phasor(len(xb), 0)
+    return filtering.sosfilt(sos_bp, Ac*np.imag(np.conj(xb)*phasor))
+
+
+def receive(y, M, sos_bp, sos_lp):
+    y = filtering.sosfilt(sos_bp, y)
+    y = filtering.sosfilt(sos_lp, NCO(fc, fs).mix(y, 0))
+    return wcs.decode_baseband_signal(y, Tb, fs, M=M)
+
+
+def bit_errors(b, br):
+    L = min(len(b), len(br))
+    return int(np.sum(b[:L] != br[:L])) + max(len(b) - len(br), 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--snr', type=float, nargs='+', default=[10, 15, 20, 25, 30], help='SNR at the transmitter (dBm)')
+    parser.add_argument('-n', '--trials', type=int, default=20, help='number of trials per SNR')
+    parser.add_argument('-b', '--bits', type=int, default=240, help='number of bits per message')
+    parser.add_argument('-A', '--amplitude', type=float, default=0.5, help='carrier amplitude')
+    parser.add_argument('-c', '--channel', type=int, default=8, help='channel id')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    sos_bp, sos_lp = design_bandpass(), design_lowpass()
+    schemes = list(wcs.modulations.items())
+    print(f"{'SNR':>5} " + " ".join(f"{name + ' BER':>10}" for name, _ in schemes))
+    print(f"{'b/s':>5} " + " ".join(f"{wcs.bits_per_symbol(M)/Tb:>10.0f}" for _, M in schemes))
+    for snr in args.snr:
+        bers = []
+        for _, M in schemes:
+            rng = np.random.default_rng(args.seed)
+            errors = 0
+            for _ in range(args.trials):
+                b = rng.integers(0, 2, args.bits)
+                y = wcs.simulate_channel(transmit(b, M, args.amplitude, sos_bp), fs, args.channel, snr, rng=rng)
+                errors += bit_errors(b, receive(y, M, sos_bp, sos_lp))
+            bers.append(errors/(args.trials*args.bits))
+        print(f"{snr:>5.0f} " + " ".join(f"{ber:>10.2e}" for ber in bers))
+
+
+if __name__ == "__main__":
+    main()
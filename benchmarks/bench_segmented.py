@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the segmented decoding: Time to decode all transmissions in a
+long recording with `segmented.decode_segmented()` for increasing numbers of
+worker processes, compared to a single pass over the whole recording (filter
+chain and burst search at once):
+
+$ python3 benchmarks/bench_segmented.py
+
+The recording (one message every few seconds, in noise) is written to a
+temporary WAV file. The speed-up is limited by the number of CPUs.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import burstsync
+import fileio
+from pipeline import PipelineConfig, RxPipeline, TxPipeline
+from segmented import decode_segmented
+
+
+def write_recording(path, config, duration, rng):
+    tx = TxPipeline(config)
+    with fileio.CaptureWriter(path, config.fs, 'float32') as f:
+        n = 0
+        while n < duration*config.fs:
+            x = np.concatenate((np.zeros(int(rng.integers(10000, 40000))), tx.encode(f'message {n}')))
+            f.write(x + 0.01*rng.standard_normal(x.shape[0]))
+            n += x.shape[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-d', '--duration', type=float, default=1200.0, help='length of the recording (s)')
+    parser.add_argument('-s', '--segment', type=float, default=60.0, help='segment length (s)')
+    parser.add_argument('-j', '--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('-q', '--decimate', type=int, default=10)
+    args = parser.parse_args()
+
+    config = PipelineConfig(Ac=0.5, decimation=args.decimate)
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'recording.wav')
+        write_recording(path, config, args.duration, rng)
+        capture = fileio.open_capture(path)
+
+        t = time.perf_counter()
+        rx = RxPipeline(config)
+        yb = rx.baseband(fileio.read_frames(capture, 0, capture.nframes, dtype=np.float64))
+        nbursts = len(burstsync.find_bursts(yb, config.Tb, rx.fs_bb))
+        t_single = time.perf_counter() - t
+        print(f"{capture.nframes/config.fs:.0f} s, {nbursts} messages, CPUs: {os.cpu_count()}")
+        print(f"{'workers':>8} {'time [s]':>9} {'messages':>9} {'speed-up':>9}")
+        print(f"{'single':>8} {t_single:>9.2f} {nbursts:>9}")
+        for workers in args.workers:
+            t = time.perf_counter()
+            messages = decode_segmented(capture, config, args.segment, max_duration=10.0, workers=workers)
+            t_segmented = time.perf_counter() - t
+            print(f"{workers:>8} {t_segmented:>9.2f} {len(messages):>9} {t_single/t_segmented:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
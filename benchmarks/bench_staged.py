@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the thread-pipelined receiver: Real-time factor (seconds of
+signal decoded per second) of the streaming receiver with its stages run in
+sequence and in separate threads (`staged.StagedPipeline`), for increasing
+sampling frequencies:
+
+$ python3 benchmarks/bench_staged.py
+
+The pipelined receiver can only be faster on a host with several cores; the
+table of the last run shows the utilization of the stages.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from filters import design
+from parameters import Tb
+from staged import StagedPipeline, format_stats, receiver_stages
+from streaming import StreamingReceiver
+
+
+def receiver(fs, fc, blocksize):
+    sos_bp = design(wp=(fc - 75, fc + 75), ws=(fc - 200, fc + 200), gpass=1, gstop=40, fs=fs)
+    sos_lp = design(wp=100, ws=500, gpass=1, gstop=40, fs=fs)
+    return StreamingReceiver(sos_bp, sos_lp, fc, Tb, fs, blocksize=blocksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--fs', type=int, nargs='+', default=[20000, 48000, 96000], help='sampling frequencies (Hz)')
+    parser.add_argument('-d', '--duration', type=float, default=30.0, help='signal length (s)')
+    parser.add_argument('--blocksize', type=int, default=4096, help='samples per block')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'fs [Hz]':>8} {'sequential':>11} {'staged':>8} {'speed-up':>9}")
+    for fs in args.fs:
+        x = 0.01*rng.standard_normal(int(args.duration*fs))
+        blocks = [x[i:i+args.blocksize] for i in range(0, x.shape[0], args.blocksize)]
+
+        rx = receiver(fs, 2500, args.blocksize)
+        t = time.perf_counter()
+        for block in blocks:
+            rx.receive(block)
+        t_sequential = time.perf_counter() - t
+
+        pipeline = StagedPipeline(receiver_stages(receiver(fs, 2500, args.blocksize)))
+        t = time.perf_counter()
+        for _ in pipeline.run(blocks):
+            pass
+        t_staged = time.perf_counter() - t
+        print(f"{fs:>8} {args.duration/t_sequential:>10.0f}x {args.duration/t_staged:>7.0f}x {t_sequential/t_staged:>8.2f}x")
+
+    print(format_stats(pipeline.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the transmit synthesis: Time to generate the transmit signal of a
+payload block by block with the streaming transmitter (carrier and bandpass
+filter per sample) and with the template synthesizer (table lookup or
+overlap-add of precomputed symbol waveforms), for increasing payload sizes:
+
+$ python3 benchmarks/bench_synthesis.py
+
+At the default pulse width, 1 kB of payload is 8000 symbols or 8 million
+samples; the blocks are generated and discarded, so the memory use does not
+grow with the payload.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from filters import design_bandpass
+from parameters import Tb, fc, fs, Ac
+from streaming import StreamingTransmitter
+from synthesis import TemplateSynthesizer
+
+
+def run(tx, b, blocksize):
+    t = time.perf_counter()
+    N = 0
+    for x in tx.blocks(b, blocksize):
+        N += x.shape[0]
+    return time.perf_counter() - t, N
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--size', type=int, nargs='+', default=[10**3, 10**4, 10**5, 10**6], help='payload sizes (bytes)')
+    parser.add_argument('-m', '--modulation', choices=list(wcs.modulations), default='bpsk')
+    parser.add_argument('--blocksize', type=int, default=1 << 16, help='samples per block')
+    parser.add_argument('--float32', action='store_true', help='synthesize in single precision')
+    args = parser.parse_args()
+
+    M = wcs.modulations[args.modulation]
+    dtype = np.float32 if args.float32 else np.float64
+    sos_bp = design_bandpass()
+    t = time.perf_counter()
+    synth = TemplateSynthesizer(sos_bp, fc, Ac, Tb, fs, dtype, M)
+    setup = time.perf_counter() - t
+    print(f"Templates: {synth.J} pulse widths, {'table lookup' if synth.table is not None else 'overlap-add'}, setup {setup:.3f} s")
+
+    rng = np.random.default_rng(0)
+    print(f"{'bytes':>8} {'samples':>12} {'stream [s]':>11} {'template [s]':>13} {'MS/s':>7} {'speed-up':>9}")
+    for n in args.size:
+        b = wcs.encode_bytes(rng.integers(0, 256, n, dtype=np.uint8).tobytes())
+        t1, N = run(StreamingTransmitter(sos_bp, fc, Ac, Tb, fs, dtype, M=M), b, args.blocksize)
+        t2, N2 = run(synth, b, args.blocksize)
+        assert N == N2
+        print(f"{n:>8} {N:>12} {t1:>11.3f} {t2:>13.3f} {N/t2/1e6:>7.0f} {t1/t2:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-burst synchronization for the wireless communication system project in
+Signals and transforms.
+
+`wcslib.decode_baseband_signal()` synchronizes to the first transmission in a
+recording only. The functions here find every transmission (burst): The whole
+baseband signal is cross-correlated with the template of the synchronization
+sequence (the symbols [1, -1] of the bits [1, 0] prepended by
+`wcslib.encode_baseband_signal()`) by FFT correlation, which costs
+O(N log N) for a recording of N samples. A burst starts where the correlation
+is significant and the signal before it is (close to) silent, which rejects
+the [1, 0] bit pairs within the messages. The correlation at the start gives
+the amplitude and phase of the burst, which are used to decode its bits.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+from scipy import signal
+from scipy.ndimage import maximum_filter1d
+
+import wcslib as wcs
+import profiling
+from kernels import moving_sum
+
+
+class Burst(NamedTuple):
+    """
+    A burst found in a baseband signal.
+
+    start : int
+        Sample index of the start of the synchronization sequence.
+    nsymbols : int
+        Number of symbols of the burst, including the synchronization
+        sequence.
+    amplitude : float
+        Estimated amplitude of the symbols.
+    phase : float
+        Estimated phase of the symbol 1 (in radians).
+    score : float
+        Detection statistic (normalized correlation power).
+    """
+    start: int
+    nsymbols: int
+    amplitude: float
+    phase: float
+    score: float
+
+
+def sync_template(Kb: int, bits: np.array=(1, 0)) -> np.array:
+    """
+    Returns the baseband template of the synchronization sequence `bits` with
+    a pulse width of `Kb` samples.
+    """
+    return np.repeat(2*np.asarray(bits) - 1, Kb).astype(float)
+
+
+def find_bursts(yb: np.array, Tb: float, fs: float, template: np.array=None, snr: float=1.0, onset: float=0.25) -> list:
+    """
+    Finds all bursts in the complex-valued baseband signal `yb`.
+
+    The squared amplitude estimated by the correlation with the template is
+    compared to the noise power, which is estimated from the quietest 10 % of
+    the signal (the recording must contain some radio silence). The
+    correlation averages the (lowpass-filtered, hence correlated) noise over
+    the template, so the estimate is well below the noise power when there is
+    no signal.
+
+    Parameters
+    ----------
+    yb : numpy.array
+        The complex-valued baseband signal.
+    Tb : float
+        Pulse width in seconds.
+    fs : float
+        Sampling frequency in Hz.
+    template : numpy.array, optional
+        Template of the synchronization sequence (default:
+        `sync_template(Kb)`).
+    snr : float, default: 1.0
+        Detection threshold on the ratio of the squared amplitude of a burst
+        to the noise power.
+    onset : float, default: 0.25
+        Maximum power of the signal in the symbol before a burst, relative to
+        the power of the burst.
+
+    Returns
+    -------
+    bursts : list of Burst
+        The bursts, in order of time.
+    """
+
+    Kb = int(np.floor(Tb*fs))
+    if template is None:
+        template = sync_template(Kb)
+    L = template.shape[0]
+    N = yb.shape[0]
+    if N < L + Kb:
+        return []
+    watch = profiling.stopwatch(N)
+
+    # Correlation with the template (c[k] for the template starting at
+    # sample k), amplitude, and phase
+    c = signal.correlate(yb, template.astype(yb.dtype), mode='valid', method='fft')
+    a2 = np.abs(c)**2/np.sum(template**2)**2
+
+    # Noise power from the quietest windows, and power in the symbol before
+    # each possible start
+    p = moving_sum(np.abs(yb)**2, Kb)/Kb
+    sigma2 = max(np.percentile(p[Kb-1:], 10), np.finfo(float).tiny)
+    ppre = np.concatenate(([0], p[:c.shape[0]-1]))
+
+    # Candidates: Significant correlation and silence before
+    z = a2/sigma2
+    candidate = (z > snr) & (ppre - sigma2 < onset*a2)
+
+    # Non-maximum suppression: The strongest candidate within two symbols
+    zc = np.where(candidate, z, 0)
+    peaks = np.flatnonzero(candidate & (zc == maximum_filter1d(zc, 4*Kb + 1)))
+    starts = []
+    for k in peaks:
+        if not starts or k - starts[-1] >= 2*Kb:
+            starts.append(int(k))
+
+    # Symbol averages; a burst ends at the first two consecutive symbols with
+    # less than half its amplitude (or where the next burst starts); bursts
+    # without any symbols after the synchronization sequence are discarded
+    ys = moving_sum(yb, Kb)/Kb
+    nsync = L//Kb
+    bursts = []
+    for i, k in enumerate(starts):
+        end = starts[i+1] if i + 1 < len(starts) else N
+        a = np.sqrt(a2[k])
+        s = ys[k+Kb-1:end:Kb]
+        weak = np.append(np.abs(s[nsync:]) < a/2, True)
+        if weak.shape[0] < 2:
+            continue
+        nsymbols = nsync + np.argmax(weak[:-1] & weak[1:])
+        if nsymbols > nsync:
+            bursts.append(Burst(k, int(nsymbols), float(a), float(np.angle(c[k])), float(z[k])))
+    watch.stop('sync')
+
+    return bursts
+
+
+def decode_burst(yb: np.array, burst: Burst, Tb: float, fs: float, nsync: int=2, M: int=2) -> np.array:
+    """
+    Decodes the bits of a burst: Each symbol is averaged over the pulse width
+    and projected onto the phase of the symbol 1 (for M-PSK, the phase 
+    relative to the symbol 1 is decided by `wcslib.decode_symbols()`).
+
+    Parameters
+    ----------
+    yb : numpy.array
+        The complex-valued baseband signal.
+    burst : Burst
+        The burst (see `find_bursts()`).
+    Tb : float
+        Pulse width in seconds.
+    fs : float
+        Sampling frequency in Hz.
+    nsync : int, default: 2
+        Number of synchronization symbols at the start of the burst, which are
+        not returned.
+    M : int, default: 2
+        Number of symbols of the phase-shift keying (see
+        `wcslib.encode_baseband_signal()`).
+
+    Returns
+    -------
+    b : numpy.array
+        A binary array of 1s and 0s encoding a message.
+    """
+    Kb = int(np.floor(Tb*fs))
+    n = burst.start + burst.nsymbols*Kb
+    with profiling.stage('bits', n - burst.start):
+        symbols = yb[burst.start:n].reshape(-1, Kb).mean(axis=1)
+        if M != 2:
+            return wcs.decode_symbols(symbols[nsync:]*np.exp(-1j*burst.phase), M)
+        b = np.real(symbols*np.exp(-1j*burst.phase)) > 0
+        return b[nsync:].astype(int)
+
+
+def decode_bursts(yb: np.array, Tb: float, fs: float, M: int=2, **kwargs) -> list:
+    """
+    Finds and decodes all bursts of `M`-PSK symbols in the complex-valued
+    baseband signal `yb` (see `find_bursts()` for the optional arguments).
+
+    Returns
+    -------
+    bs : list of numpy.array
+        Binary arrays of the messages, in order of time.
+    """
+    return [decode_burst(yb, burst, Tb, fs, M=M) for burst in find_bursts(yb, Tb, fs, **kwargs)]
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Polyphase FFT channelizer for the wireless communication system project in
+Signals and transforms.
+
+All channel center frequencies of `wcslib._channels` are multiples of 100 Hz,
+so they are bins of an M-point DFT filter bank with a bin spacing of 100 Hz
+(M = 200 at fs = 20000 Hz). The filter bank mixes the signal to baseband at
+every bin, lowpass filters it with a common prototype filter, and decimates it,
+in a single pass: Each output frame weights the last `taps*M` input samples by
+the prototype filter, folds them into M polyphase branches, and takes one FFT.
+The work per input sample is `taps*M/decimation` multiplications for the
+filtering plus an M-point FFT every `decimation` samples, that is,
+O(M*(taps + log M)/decimation). It grows linearly with M (the number of
+bins) but does not depend on the number of channels, whereas separate
+per-channel bandpass, mixing, and lowpass filters cost O(number of channels)
+at the full sampling rate.
+"""
+
+import numpy as np
+from scipy import signal
+from numpy.lib.stride_tricks import sliding_window_view
+
+import wcslib as wcs
+from multirate import check_decimation
+from parameters import fs
+
+
+def all_channel_ids() -> list:
+    """
+    Returns the ids of all channels of `wcslib._channels`.
+    """
+    return list(range(1, wcs._channels.shape[1] - 1))
+
+
+def center_frequency(channel_id: int) -> float:
+    """
+    Returns the center frequency of the channel `channel_id`.
+    """
+    if channel_id not in all_channel_ids():
+        raise ValueError(f'channel_id must be between 1 and {wcs._channels.shape[1] - 2}, but {channel_id} given.')
+    fl, fu = wcs._channels[:2, channel_id]
+    return float(fl + fu)/2
+
+
+class Channelizer:
+    """
+    Streaming polyphase FFT channelizer: Splits the (real-valued) wideband
+    signal into the complex baseband signals of the given channels, one block
+    at a time. The filter history, decimation phase, and carrier phase are
+    carried between blocks, so the result does not depend on the block size.
+
+    The baseband signal of a channel is the same as mixing the signal with
+    exp(1j*2*pi*fc*n/fs) (the IQ demodulation `yI + 1j*yQ` of the receiver,
+    see `nco.NCO.mix()`), lowpass filtering it with the prototype filter, and
+    keeping every `decimation`-th sample.
+
+    Parameters
+    ----------
+    channel_ids : list of int, optional
+        The channels to demodulate (default: all channels).
+    fs : float
+        Sampling frequency in Hz (default: `parameters.fs`).
+    decimation : int, default: 50
+        Decimation factor; the baseband signals are sampled at
+        `fs/decimation`.
+    spacing : float, default: 100.0
+        Bin spacing of the filter bank in Hz. Must divide `fs` and the center
+        frequencies of the channels.
+    taps : int, default: 8
+        Length of the prototype filter per polyphase branch (the prototype
+        filter has `taps*fs/spacing` taps).
+    cutoff : float, default: 50.0
+        Cutoff frequency of the prototype lowpass filter in Hz.
+    dtype : numpy.dtype, default: numpy.float64
+        Precision of the computations (numpy.float32 or numpy.float64).
+    """
+
+    def __init__(self, channel_ids: list=None, fs: float=fs, decimation: int=50, spacing: float=100.0, taps: int=8, cutoff: float=50.0, dtype: np.dtype=np.float64):
+        if channel_ids is None:
+            channel_ids = all_channel_ids()
+        fcs = np.array([center_frequency(i) for i in channel_ids])
+
+        M = fs/spacing
+        bins = fcs/spacing
+        if M != np.round(M) or np.any(bins != np.round(bins)):
+            raise ValueError(f'the bin spacing of {spacing} Hz must divide the sampling frequency and the center frequencies of the channels.')
+        if decimation < 1 or int(decimation) != decimation:
+            raise ValueError(f'decimation factor must be a positive integer, but {decimation} given.')
+
+        self.channel_ids = list(channel_ids)
+        self.fcs = fcs
+        self.fs = fs
+        self.fs_bb = fs/decimation
+        self.decimation = decimation
+        self.M = int(M)
+        self.taps = taps
+        self.L = taps*self.M
+        self.bins = bins.astype(int)
+        self.dtype = np.dtype(dtype)
+
+        # Prototype filter (reversed, such that a frame of the signal is
+        # weighted by a single elementwise product)
+        h = signal.firwin(self.L, cutoff, window=('kaiser', 8.0), fs=fs)
+        self.h = h[::-1].astype(self.dtype)
+
+        # Carrier phase correction exp(-1j*2*pi*k*n/M), tabulated for n mod M
+        self.rotation = np.exp(-2j*np.pi*np.arange(self.M)/self.M).astype(np.result_type(self.dtype, np.complex64))
+
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the channelizer to its initial (all-zero) state.
+        """
+        self.history = np.zeros(self.L - 1, dtype=self.dtype)
+        self.phase = 0
+
+        # Sample index (mod M) of the first sample of the history
+        self.n = (1 - self.L) % self.M
+
+    def process(self, x: np.array, chunksize: int=1024) -> np.array:
+        """
+        Channelizes a block of the signal.
+
+        Parameters
+        ----------
+        x : numpy.array
+            Block of the (real-valued) signal.
+        chunksize : int, default: 1024
+            Number of output samples calculated at once (limits the memory
+            use).
+
+        Returns
+        -------
+        y : numpy.array
+            Blocks of the baseband signals, one row per channel.
+        """
+        xx = np.concatenate((self.history, np.asarray(x, dtype=self.dtype)))
+        frames = sliding_window_view(xx, self.L)
+        starts = np.arange(self.phase, frames.shape[0], self.decimation)
+
+        y = np.empty((len(self.channel_ids), starts.shape[0]), dtype=self.rotation.dtype)
+        for c in range(0, starts.shape[0], chunksize):
+            s = starts[c:c+chunksize]
+
+            # Weight and fold into M branches, then one FFT per frame
+            u = (frames[s]*self.h).reshape(-1, self.taps, self.M).sum(axis=1)
+            U = np.fft.rfft(u, axis=1)[:, self.bins]
+
+            # The frame starting at xx[s] ends at sample n+s+L-1, which
+            # gives the phase of the carrier (note that L is a multiple of M).
+            # The DFT mixes with exp(-1j*...); since the signal and the filter
+            # are real-valued, the conjugate is the mix with exp(1j*...).
+            k = ((self.n + s)[:, None]*self.bins) % self.M
+            y[:, c:c+chunksize] = np.conj(U*self.rotation[k]).T
+
+        # Keep the last L-1 samples and continue the decimation phase
+        consumed = xx.shape[0] - self.history.shape[0]
+        self.history = xx[consumed:]
+        self.phase = self.phase + starts.shape[0]*self.decimation - consumed
+        self.n = (self.n + consumed) % self.M
+        return y
+
+    def flush(self) -> np.array:
+        """
+        Pushes zeros the length of the prototype filter through the
+        channelizer, such that the output covers the end of the signal (e.g.,
+        the last symbol of a message at the end of a recording).
+
+        Returns
+        -------
+        y : numpy.array
+            The remaining baseband samples, one row per channel.
+        """
+        return self.process(np.zeros(self.L, dtype=self.dtype))
+
+
+def decode_channels(x: np.array, Tb: float, fs: float=fs, channel_ids: list=None, decimation: int=50) -> dict:
+    """
+    Decodes the messages on several channels of a wideband signal: Splits the
+    signal into the baseband signals of the channels in one pass (see
+    `Channelizer`) and decodes each with `wcslib.decode_baseband_signal()`.
+
+    Parameters
+    ----------
+    x : numpy.array
+        The received (real-valued) signal.
+    Tb : float
+        Symbol width in seconds.
+    fs : float
+        Sampling frequency in Hz (default: `parameters.fs`).
+    channel_ids : list of int, optional
+        The channels to decode (default: all channels).
+    decimation : int, default: 50
+        Decimation factor of the baseband signals. Must divide the pulse width
+        `Tb*fs`.
+
+    Returns
+    -------
+    b : dict
+        Binary array of the decoded message of each channel.
+    """
+    check_decimation(decimation, Tb, fs)
+    channelizer = Channelizer(channel_ids, fs, decimation)
+    y = channelizer.process(x)
+    return {
+        i: wcs.decode_baseband_signal(y[j], Tb, channelizer.fs_bb, decimation)
+        for j, i in enumerate(channelizer.channel_ids)
+    }
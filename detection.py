@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Signal detection for the wireless communication system project in Signals and
+transforms.
+
+The decoder detects a transmission by the energy of the magnitude of the
+baseband signal over one pulse width, normalized by the variance of the
+magnitude: In radio silence, the normalized energy of `Kb` samples is
+(approximately) chi-squared distributed with 2*Kb degrees of freedom, and a
+transmission is detected where it exceeds the 99 % quantile. Instead of
+evaluating the chi-squared CDF for every sample, the energy is compared to
+the quantile itself, which only depends on `Kb` and is calculated once.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from kernels import moving_sum
+
+
+@lru_cache(maxsize=None)
+def chi2_threshold(dof: int, p: float=0.99) -> float:
+    """
+    Returns the `p` quantile of the chi-squared distribution with `dof`
+    degrees of freedom, `scipy.stats.chi2.ppf(p, dof)`. The quantiles are
+    cached.
+    """
+    from scipy.stats import chi2
+    return float(chi2.ppf(p, dof))
+
+
+class EnergyDetector:
+    """
+    Incremental energy detector: Detects a signal where the energy of the
+    magnitude over `Kb` samples, normalized by the variance of the magnitude,
+    exceeds the `p` quantile of the chi-squared distribution with 2*Kb
+    degrees of freedom, which is the same as
+
+        chi2.cdf(energy/variance, 2*Kb) > p.
+
+    The signal is given block by block; the moving energy continues from one
+    block to the next, and the variance is the running variance of all
+    samples so far (including the current block). For a single block, the
+    detection is identical to the batch detector of
+    `wcslib.decode_baseband_signal()`.
+
+    Parameters
+    ----------
+    Kb : int
+        Pulse width in samples.
+    decimation : int, default: 1
+        Factor by which the signal has been decimated. The threshold is
+        calculated for the Kb*decimation samples at the original sampling
+        frequency (see `wcslib.decode_baseband_signal()`).
+    p : float, default: 0.99
+        Detection probability quantile.
+    threshold : float, optional
+        Precomputed quantile, `chi2_threshold(2*decimation*Kb, p)` (default:
+        calculated from `p`).
+    """
+
+    def __init__(self, Kb: int, decimation: int=1, p: float=0.99, threshold: float=None):
+        self.Kb = Kb
+        self.decimation = decimation
+        self.threshold = chi2_threshold(2*decimation*Kb, p) if threshold is None else threshold
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the moving energy and the variance estimate.
+        """
+        self.tail = np.zeros(self.Kb - 1)
+        self.nsamples = 0
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+    def update(self, xm: np.array):
+        """
+        Updates the running mean and variance with a block of the magnitude.
+        """
+        n = xm.shape[0]
+        if n == 0:
+            return
+        mean = np.mean(xm, dtype=np.float64)
+        variance = np.var(xm, dtype=np.float64)
+        if self.count == 0:
+            self.count, self.mean, self.variance = n, mean, variance
+            return
+
+        # Combine the mean and variance of the blocks (Chan et al.)
+        count = self.count + n
+        delta = mean - self.mean
+        self.variance = (self.count*self.variance + n*variance + delta**2*self.count*n/count)/count
+        self.mean += delta*n/count
+        self.count = count
+
+    def energy(self, xm: np.array) -> np.array:
+        """
+        Returns the energy of the magnitude `xm` over the last `Kb` samples,
+        continued from the previous block.
+        """
+        if self.nsamples == 0:
+            xm2 = moving_sum(xm**2, self.Kb)
+        else:
+            xx = np.concatenate((self.tail.astype(xm.dtype), xm))
+            xm2 = moving_sum(xx**2, self.Kb)[self.tail.shape[0]:]
+        self.tail = np.concatenate((self.tail, xm))[xm.shape[0]:]
+        self.nsamples += xm.shape[0]
+        return xm2
+
+    def detect(self, xm2: np.array, variance: float) -> np.array:
+        """
+        Compares the energy `xm2` normalized by `variance` to the threshold.
+        """
+        return self.decimation*xm2/variance > self.threshold
+
+    def process(self, xm: np.array) -> np.array:
+        """
+        Runs the detector on a block of the magnitude of the signal.
+
+        Parameters
+        ----------
+        xm : numpy.array
+            Block of the magnitude of the (baseband) signal.
+
+        Returns
+        -------
+        d : numpy.array
+            Whether a signal is detected at each sample.
+        """
+        self.update(xm)
+        return self.detect(self.energy(xm), self.variance)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Signal file input and output for the wireless communication system project in
+Signals and transforms.
+
+Captures are read from WAV files (16-bit PCM or 32-bit float) or from raw files
+of int16 or float32 samples (native little-endian, interleaved channels). The
+file is memory-mapped and read block by block, so arbitrarily long captures can
+be processed without loading them into memory; int16 samples are converted to
+floating point one block at a time.
+"""
+
+import os
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+# Sample formats and their (little-endian) sample types
+sample_formats = {
+    'int16': np.dtype('<i2'),
+    'float32': np.dtype('<f4'),
+}
+
+# WAV format tags
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Largest data chunk of a WAV file in bytes: the RIFF and data chunk sizes are
+# 32-bit fields, and 0xFFFFFFFF marks a recording that was not closed
+max_wav_bytes = 0xFFFFFFFF - 37
+
+
+class Capture(NamedTuple):
+    """
+    Description of a signal file.
+
+    path : str
+        Path of the file.
+    offset : int
+        Offset of the first sample in bytes.
+    sample_format : str
+        Sample format, 'int16' or 'float32'.
+    channels : int
+        Number of (interleaved) channels.
+    fs : float
+        Sampling frequency in Hz.
+    nframes : int
+        Number of samples per channel.
+    """
+    path: str
+    offset: int
+    sample_format: str
+    channels: int
+    fs: float
+    nframes: int
+
+
+def is_wav(path: str) -> bool:
+    """
+    Returns whether `path` names a WAV file (by its extension).
+    """
+    return os.path.splitext(path)[1].lower() in ('.wav', '.wave')
+
+
+def open_capture(path: str, fs: float=None, sample_format: str='int16', channels: int=1) -> Capture:
+    """
+    Opens a signal file for reading.
+
+    For WAV files, the sampling frequency, sample format, and number of
+    channels are read from the header. Raw files have no header, so these must
+    be given.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+    fs : float, optional
+        Sampling frequency of a raw file in Hz.
+    sample_format : str, default: 'int16'
+        Sample format of a raw file, 'int16' or 'float32'.
+    channels : int, default: 1
+        Number of channels of a raw file.
+
+    Returns
+    -------
+    capture : Capture
+        Description of the file.
+    """
+    if is_wav(path):
+        return _parse_wav(path)
+
+    if sample_format not in sample_formats:
+        raise ValueError(f'unsupported sample format \'{sample_format}\'.')
+    size = os.path.getsize(path)
+    nframes = size//(sample_formats[sample_format].itemsize*channels)
+    return Capture(path, 0, sample_format, channels, fs, nframes)
+
+
+def read_blocks(capture: Capture, blocksize: int=2048, channel: int=0, dtype: np.dtype=np.float32):
+    """
+    Reads one channel of a signal file block by block.
+
+    The file is memory-mapped, so only the block being processed is read into
+    memory. int16 samples are scaled to [-1, 1).
+
+    Parameters
+    ----------
+    capture : Capture
+        The file (see `open_capture()`).
+    blocksize : int, default: 2048
+        Number of samples per block. The last block may be shorter.
+    channel : int, default: 0
+        The channel to read.
+    dtype : numpy.dtype, default: numpy.float32
+        Data type of the blocks.
+
+    Yields
+    ------
+    x : numpy.array
+        Block of the signal.
+    """
+    if capture.nframes == 0:
+        return
+
+    x = _map(capture)
+    for n in range(0, capture.nframes, blocksize):
+        yield _convert(x[n:n+blocksize, channel], capture, dtype)
+
+
+def read_frames(capture: Capture, start: int, stop: int, channel: int=0, dtype: np.dtype=np.float32) -> np.array:
+    """
+    Reads the samples `start` to `stop` (exclusive) of one channel of a signal
+    file (clipped to the length of the file). Only these samples are read into
+    memory; int16 samples are scaled to [-1, 1).
+    """
+    if capture.nframes == 0:
+        return np.zeros(0, dtype=dtype)
+    return _convert(_map(capture)[start:stop, channel], capture, dtype)
+
+
+def _map(capture):
+    return np.memmap(
+        capture.path, dtype=sample_formats[capture.sample_format], mode='r',
+        offset=capture.offset, shape=(capture.nframes, capture.channels)
+    )
+
+
+def _convert(x, capture, dtype):
+    x = x.astype(dtype)
+    if capture.sample_format == 'int16':
+        x *= 1/32768
+    return x
+
+
+class CaptureWriter:
+    """
+    Writes a signal to a WAV or raw file block by block.
+
+    Floating-point samples are written as they are ('float32') or clipped to
+    [-1, 1] and scaled to 16 bit ('int16'). For WAV files, the header is
+    completed when the file is closed. Can be used as a context manager.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file. Files ending in .wav are written as WAV files, all
+        others as raw files.
+    fs : float
+        Sampling frequency in Hz.
+    sample_format : str, default: 'int16'
+        Sample format, 'int16' or 'float32'.
+    channels : int, default: 1
+        Number of channels.
+
+    Raises
+    ------
+    ValueError
+        When a block would make a WAV file longer than its header can
+        describe (`max_wav_bytes` of samples, about 4 GiB); the block is not
+        written. Raw files have no such limit.
+    """
+
+    def __init__(self, path: str, fs: float, sample_format: str='int16', channels: int=1):
+        if sample_format not in sample_formats:
+            raise ValueError(f'unsupported sample format \'{sample_format}\'.')
+        self.path = path
+        self.fs = fs
+        self.sample_format = sample_format
+        self.channels = channels
+        self.wav = is_wav(path)
+        self.nframes = 0
+        self.file = open(path, 'wb')
+        if self.wav:
+            self.file.write(self._wav_header())
+
+    def write(self, x: np.array):
+        """
+        Writes a block of samples (1-D for a single channel, or one row per
+        sample and one column per channel).
+        """
+        x = np.asarray(x)
+        if self.sample_format == 'int16' and x.dtype.kind == 'f':
+            x = np.round(np.clip(x, -1, 1 - 1/32768)*32768)
+        x = x.astype(sample_formats[self.sample_format]).reshape(-1, self.channels)
+        if self.wav:
+            self._check_size(self.nframes + x.shape[0])
+        self.file.write(x.tobytes())
+        self.nframes += x.shape[0]
+
+    def close(self):
+        """
+        Completes the header (WAV files) and closes the file.
+        """
+        if self.file.closed:
+            return
+        try:
+            if self.wav:
+                header = self._wav_header()
+                nbytes = self.nframes*self.channels*sample_formats[self.sample_format].itemsize
+                if nbytes % 2:
+                    self.file.write(b'\0')
+                self.file.seek(0)
+                self.file.write(header)
+        finally:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _check_size(self, nframes: int):
+        nbytes = nframes*self.channels*sample_formats[self.sample_format].itemsize
+        if nbytes > max_wav_bytes:
+            raise ValueError(f'{nframes} frames ({nbytes} bytes) exceed the size limit of WAV files ({max_wav_bytes} bytes); write a raw file instead.')
+
+    def _wav_header(self) -> bytes:
+        itemsize = sample_formats[self.sample_format].itemsize
+        tag = _WAVE_FORMAT_PCM if self.sample_format == 'int16' else _WAVE_FORMAT_IEEE_FLOAT
+        self._check_size(self.nframes)
+        nbytes = self.nframes*self.channels*itemsize
+        return struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + nbytes + nbytes % 2, b'WAVE',
+            b'fmt ', 16, tag, self.channels, int(self.fs),
+            int(self.fs)*self.channels*itemsize, self.channels*itemsize, 8*itemsize,
+            b'data', nbytes
+        )
+
+
+def _parse_wav(path: str) -> Capture:
+    """
+    Reads the header of a WAV file and locates its sample data.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError(f'\'{path}\' is not a WAV file.')
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f'\'{path}\' has no data chunk.')
+            chunk, nbytes = struct.unpack('<4sI', header)
+            if chunk == b'fmt ':
+                data = f.read(nbytes + nbytes % 2)
+                tag, channels, fs, _, _, bits = struct.unpack('<HHIIHH', data[:16])
+                if tag == _WAVE_FORMAT_EXTENSIBLE and nbytes >= 26:
+                    tag, = struct.unpack('<H', data[24:26])
+                fmt = tag, channels, fs, bits
+            elif chunk == b'data':
+                offset = f.tell()
+                break
+            else:
+                f.seek(nbytes + nbytes % 2, 1)
+
+    if fmt is None:
+        raise ValueError(f'\'{path}\' has no format chunk.')
+    tag, channels, fs, bits = fmt
+    if (tag, bits) == (_WAVE_FORMAT_PCM, 16):
+        sample_format = 'int16'
+    elif (tag, bits) == (_WAVE_FORMAT_IEEE_FLOAT, 32):
+        sample_format = 'float32'
+    else:
+        raise ValueError(f'\'{path}\' has an unsupported sample format (format {tag}, {bits} bits).')
+
+    # The data size in the header is 0 (or 0xFFFFFFFF) for recordings that
+    # were not closed properly, in which case the data extend to the end of
+    # the file; never read beyond the end of the file
+    if nbytes in (0, 0xFFFFFFFF):
+        nbytes = size - offset
+    nbytes = min(nbytes, size - offset)
+    nframes = nbytes//(sample_formats[sample_format].itemsize*channels)
+    return Capture(path, offset, sample_format, channels, fs, nframes)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filtering backends for the wireless communication system project in Signals
+and transforms.
+
+A filter given as second-order sections can be applied directly
+(`scipy.signal.sosfilt()`, cost proportional to the number of sections per
+sample), or, after truncating its impulse response to its effective length
+`L`, by overlap-save FFT convolution (cost proportional to
+`nfft*log(nfft)/(nfft - L + 1)` per sample). The direct form wins for
+low-order filters and short blocks, FFT convolution for high-order filters and
+long signals. `make_filter()` picks the cheaper backend from a simple cost
+model; the constants of the model are measured by
+`benchmarks/bench_filtering.py`.
+
+For the filters of the system itself (bandpass: 6 sections, L = 2081;
+lowpass: 2 sections, L = 1007) direct filtering is always cheaper, so the
+automatic selection keeps them on 'sos'. The benchmark, which also prints the
+crossover, measures overlap-save as faster only for the sharper bandpass
+designs of at least about 13 sections (100 dB stopband attenuation, L = 4776)
+filtered in long blocks (a whole signal of 2^18 samples); for blocks of 2048
+samples direct filtering wins for all of them.
+
+Both backends carry their state between blocks, so a signal can be filtered
+block by block with the same result as filtering it at once.
+"""
+
+import numpy as np
+from scipy import fft, signal
+
+# Cost model (in ns): per sample and section for direct filtering, and per
+# nfft*log2(nfft) for one FFT convolution step (forward and inverse real FFT
+# and the product of the spectra)
+sos_cost = 2.5
+fft_cost = 1.4
+
+# Relative energy of the truncated tail of an impulse response
+default_tol = 1e-12
+
+# Longest impulse response considered for FFT convolution
+max_length = 1 << 16
+
+# Longest FIR filter that fir_filter() applies by direct convolution
+max_direct_length = 64
+
+# Truncated impulse responses by filter and tolerance
+_responses = {}
+
+
+def impulse_response(sos: np.array, tol: float=default_tol) -> np.array:
+    """
+    Calculates the impulse response of the filter `sos`, truncated to its
+    effective length, that is, such that the energy of the truncated tail is
+    at most `tol` times the total energy.
+
+    Returns None if the impulse response has not decayed within `max_length`
+    samples. The responses are cached.
+    """
+    key = (np.asarray(sos, dtype=np.float64).tobytes(), tol)
+    if key not in _responses:
+        _responses[key] = _truncated_response(sos, tol)
+    return _responses[key]
+
+
+def _truncated_response(sos, tol):
+    impulse = np.zeros(max_length)
+    impulse[0] = 1
+    h = signal.sosfilt(sos, impulse)
+    tail = np.cumsum(h[::-1]**2)[::-1]
+    if tail[-1] > tol*tail[0]:
+        return None
+    L = int(np.argmax(tail <= tol*tail[0]))
+    return h[:max(L, 1)]
+
+
+def ols_cost(L: int, nfft: int, blocksize: int=None) -> float:
+    """
+    Cost per sample of overlap-save filtering with an FIR filter of length `L`
+    and FFTs of length `nfft`, for blocks of `blocksize` samples (default: one
+    long signal).
+    """
+    step = nfft - L + 1
+    if step < 1:
+        return np.inf
+    nsteps = 1/step if blocksize is None else np.ceil(blocksize/step)/blocksize
+    return fft_cost*nfft*np.log2(nfft)*nsteps
+
+
+def select_backend(nsections: int, L: int, blocksize: int=None) -> tuple:
+    """
+    Selects the cheaper backend for a filter with `nsections` second-order
+    sections and an effective impulse response length `L` (None if the
+    response does not decay), for blocks of `blocksize` samples (default: one
+    long signal).
+
+    Returns
+    -------
+    backend : str
+        'sos' (direct) or 'ols' (overlap-save).
+    nfft : int
+        FFT length for overlap-save, None for direct filtering.
+    """
+    if L is None:
+        return 'sos', None
+
+    # Best FFT length: powers of two from the shortest possible one up to the
+    # one that processes a whole block in one step
+    nmax = max(4*L, L + (blocksize or 0))
+    nffts = 2**np.arange(int(np.ceil(np.log2(2*L))), int(np.ceil(np.log2(nmax))) + 1)
+    costs = [ols_cost(L, int(n), blocksize) for n in nffts]
+    i = int(np.argmin(costs))
+    if costs[i] < sos_cost*nsections:
+        return 'ols', int(nffts[i])
+    return 'sos', None
+
+
+class SOSFilter:
+    """
+    Direct filtering with second-order sections (`scipy.signal.sosfilt()`),
+    one block at a time. Filters along the last axis.
+    """
+
+    backend = 'sos'
+
+    def __init__(self, sos: np.array):
+        self.sos = sos
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the filter state.
+        """
+        self.zi = None
+
+    def process(self, x: np.array) -> np.array:
+        """
+        Filters a block of the signal.
+        """
+        if self.zi is None:
+            self.zi = np.zeros((self.sos.shape[0],) + x.shape[:-1] + (2,), dtype=np.result_type(x.dtype, np.float64))
+        y, self.zi = signal.sosfilt(self.sos, x, zi=self.zi)
+        return y
+
+
+class OverlapSaveFilter:
+    """
+    FIR filtering by overlap-save FFT convolution, one block at a time. Filters
+    along the last axis; real and complex signals are supported.
+
+    Parameters
+    ----------
+    h : numpy.array
+        Impulse response of the filter.
+    nfft : int, optional
+        FFT length (default: the power of two at least four times the length
+        of `h`).
+    """
+
+    backend = 'ols'
+
+    def __init__(self, h: np.array, nfft: int=None):
+        L = h.shape[0]
+        if nfft is None:
+            nfft = 1 << int(np.ceil(np.log2(4*L)))
+        if nfft < L:
+            raise ValueError(f'FFT length {nfft} is shorter than the filter length {L}.')
+        self.h = h
+        self.nfft = nfft
+        self.step = nfft - L + 1
+        self.H = fft.rfft(h, nfft)
+        self.Hc = None
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the filter state.
+        """
+        self.history = None
+
+    def process(self, x: np.array) -> np.array:
+        """
+        Filters a block of the signal.
+        """
+        L = self.h.shape[0]
+        if self.history is None:
+            self.history = np.zeros(x.shape[:-1] + (L - 1,), dtype=np.result_type(x.dtype, np.float64))
+        xx = np.concatenate((self.history, x), axis=-1)
+        N = x.shape[-1]
+
+        complex_input = np.iscomplexobj(xx)
+        if complex_input and self.Hc is None:
+            self.Hc = fft.fft(self.h, self.nfft)
+
+        y = np.empty(xx.shape[:-1] + (N,), dtype=xx.dtype)
+        for n in range(0, N, self.step):
+            # Segment of nfft samples (the last one zero-padded); the first
+            # L-1 outputs are affected by circular wrap-around and discarded
+            m = min(self.step, N - n)
+            segment = xx[..., n:n+m+L-1]
+            if complex_input:
+                ys = fft.ifft(fft.fft(segment, self.nfft)*self.Hc)
+            else:
+                ys = fft.irfft(fft.rfft(segment, self.nfft)*self.H, self.nfft)
+            y[..., n:n+m] = ys[..., L-1:L-1+m]
+
+        self.history = xx[..., xx.shape[-1]-(L-1):]
+        return y
+
+
+def make_filter(sos: np.array, blocksize: int=None, backend: str=None, tol: float=default_tol):
+    """
+    Creates a block filter for the filter `sos`, using the backend that is
+    cheaper for blocks of `blocksize` samples (see `select_backend()`).
+
+    Parameters
+    ----------
+    sos : numpy.array
+        Second-order sections of the filter.
+    blocksize : int, optional
+        Typical number of samples per block (default: one long signal).
+    backend : str, optional
+        Force the backend, 'sos' or 'ols' (default: automatic).
+    tol : float
+        Relative energy of the truncated tail of the impulse response for
+        overlap-save filtering (see `impulse_response()`).
+
+    Returns
+    -------
+    filt : SOSFilter or OverlapSaveFilter
+        The filter; `filt.process(x)` filters the next block `x`.
+    """
+    if backend not in (None, 'sos', 'ols'):
+        raise ValueError(f'unknown filter backend \'{backend}\'.')
+    if backend == 'sos':
+        return SOSFilter(sos)
+
+    h = impulse_response(sos, tol)
+    if backend == 'ols':
+        if h is None:
+            raise ValueError('the impulse response of the filter does not decay.')
+        return OverlapSaveFilter(h)
+
+    choice, nfft = select_backend(sos.shape[0], None if h is None else h.shape[0], blocksize)
+    if choice == 'ols':
+        return OverlapSaveFilter(h, nfft)
+    return SOSFilter(sos)
+
+
+def sosfilt(sos: np.array, x: np.array, backend: str=None) -> np.array:
+    """
+    Filters the signal `x` along its last axis with the filter `sos`, using the
+    cheaper backend for its length. Replaces `scipy.signal.sosfilt(sos, x)`.
+    """
+    return make_filter(sos, x.shape[-1], backend).process(x)
+
+
+def fir_filter(h: np.array, x: np.array) -> np.array:
+    """
+    Filters the signal `x` along its last axis with the FIR filter `h`, by
+    direct convolution for short filters and by FFT convolution for long ones.
+    Replaces `scipy.signal.lfilter(h, 1, x)`.
+    """
+    N = x.shape[-1]
+    if h.shape[0] <= max_direct_length:
+        return signal.lfilter(h, 1, x)
+    return signal.oaconvolve(x, h.reshape((1,)*(x.ndim - 1) + (-1,)), axes=-1)[..., :N]
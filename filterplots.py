@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plots the magnitude responses of the bandpass and lowpass filters in filters.py
+(requires matplotlib):
+
+$ python3 filterplots.py
+"""
+
+import numpy as np
+from scipy import signal
+import matplotlib.pyplot as plt
+
+import filters
+
+
+def plot_response(sos, passband, stopband, title, fs=filters.fs):
+    """
+    Plots the magnitude response of the filter `sos` together with its
+    passband (red, dashed) and stopband (black, dotted) edges.
+    """
+    w, h = signal.sosfreqz(sos, worN=4096, fs=fs)
+
+    plt.figure()
+    plt.plot(w, 20*np.log10(np.maximum(np.abs(h), 1e-12)))
+    for f in np.atleast_1d(passband):
+        plt.axvline(f, color='r', linestyle='--')
+    for f in np.atleast_1d(stopband):
+        plt.axvline(f, color='k', linestyle=':')
+    plt.title(f"{title} (SOS sections {sos.shape[0]})")
+    plt.xlabel("Frequency [Hz]")
+    plt.ylabel("Magnitude [dB]")
+    plt.grid(True)
+
+
+def main():
+    sos_bp = filters.sos_bp
+    print("Bandpass SOS sections:", sos_bp.shape[0])
+    plot_response(sos_bp, filters.fp_bp, filters.fs_bp, "Bandpass magnitude response")
+    plt.show()
+
+    sos_lp = filters.sos_lp
+    print("Lowpass SOS sections:", sos_lp.shape[0])
+    plot_response(sos_lp, filters.fp_lp, filters.fs_lp, "Lowpass magnitude response")
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -12,35 +12,139 @@
 #   Passband ripple: <= 1 dB
 #   Stopband attenuation: >= 40 dB
 
+import hashlib
+import os
+
 import numpy as np
-from scipy import signal
-import matplotlib.pyplot as plt
+
+import wcslib as wcs
 
 fs = 20000
 
-#jag la till de två funtioner för att testa i test_filters.py
-def design_bandpass():
-    return signal.iirdesign(
-        wp=[2425, 2575],
-        ws=[2300, 2700],
-        gpass=1,
-        gstop=40,
-        ftype="butter",
-        output="sos",
-        fs=fs
+# Filter registry: Designed filters are cached in memory (and optionally on
+# disk, in the directory given by the environment variable
+# SIGTRANS_FILTER_CACHE or set_cache_dir()), keyed by their specs
+_cache = {}
+_cache_dir = os.environ.get('SIGTRANS_FILTER_CACHE')
+_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0}
+
+
+def design(wp, ws, gpass, gstop, ftype="butter", fs=fs):
+    """
+    Designs an IIR filter with `scipy.signal.iirdesign()` and returns its
+    second-order sections. The filter is only designed the first time it is
+    requested; later requests with the same specs are served from the cache.
+
+    The cached arrays are read-only. Since `scipy.signal.sosfilt()` does not
+    accept read-only arrays, a (cheap) copy of the cached array is returned,
+    so callers can never modify the cache.
+
+    Parameters
+    ----------
+    wp, ws : float or sequence of float
+        Passband and stopband edge frequencies in Hz.
+    gpass : float
+        Maximum loss in the passband (dB).
+    gstop : float
+        Minimum attenuation in the stopband (dB).
+    ftype : str, default: "butter"
+        Type of IIR filter.
+    fs : float
+        Sampling frequency in Hz.
+
+    Returns
+    -------
+    sos : numpy.array
+        Second-order sections of the filter.
+    """
+    key = (
+        tuple(float(w) for w in np.atleast_1d(wp)),
+        tuple(float(w) for w in np.atleast_1d(ws)),
+        float(gpass), float(gstop), ftype, float(fs)
     )
+    sos = _cache.get(key)
+    if sos is not None:
+        _stats['hits'] += 1
+        return sos.copy()
+
+    from scipy import signal
+
+    path = None
+    if _cache_dir is not None:
+        name = hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+        path = os.path.join(_cache_dir, f'sos-{name}.npy')
+    if path is not None and os.path.exists(path):
+        sos = np.load(path)
+        _stats['disk_hits'] += 1
+    else:
+        sos = signal.iirdesign(
+            wp=list(key[0]) if len(key[0]) > 1 else key[0][0],
+            ws=list(key[1]) if len(key[1]) > 1 else key[1][0],
+            gpass=gpass,
+            gstop=gstop,
+            ftype=ftype,
+            output="sos",
+            fs=fs
+        )
+        _stats['misses'] += 1
+        if path is not None:
+            os.makedirs(_cache_dir, exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.tmp.npy'
+            np.save(tmp, sos)
+            os.replace(tmp, path)
+
+    sos.setflags(write=False)
+    _cache[key] = sos
+    return sos.copy()
+
+
+def cache_info():
+    """
+    Returns the number of cache hits (in memory and on disk) and misses (filter
+    designs) of the filter registry.
+    """
+    return dict(_stats, size=len(_cache))
+
+
+def clear_cache():
+    """
+    Clears the in-memory filter cache and resets the counters. The on-disk
+    cache is kept.
+    """
+    _cache.clear()
+    for k in _stats:
+        _stats[k] = 0
+
+
+def set_cache_dir(path):
+    """
+    Sets the directory of the on-disk filter cache (None disables it).
+    """
+    global _cache_dir
+    _cache_dir = path
+
+
+#jag la till de två funtioner för att testa i test_filters.py
+def design_bandpass(wp=(2425, 2575), ws=(2300, 2700)):
+    return design(wp=wp, ws=ws, gpass=1, gstop=40, ftype="butter", fs=fs)
 
 
 def design_lowpass():
-    return signal.iirdesign(
-        wp=100,
-        ws=500,
-        gpass=1,
-        gstop=40,
-        ftype="butter",
-        output="sos",
-        fs=fs
-    )
+    return design(wp=100, ws=500, gpass=1, gstop=40, ftype="butter", fs=fs)
+
+def channel_band(channel_id):
+    """
+    Returns the carrier frequency and the bandpass specs (passband and stopband
+    edges) for the channel `channel_id` of wcslib. The specs scale those of
+    our channel (2400-2600 Hz): The passband covers the middle 75 % of the
+    channel, the stopband starts 100 Hz outside of it.
+    """
+    fl, fu = (float(f) for f in wcs._channels[:2, channel_id])
+    fc = (fl + fu)/2
+    B = fu - fl
+    wp = (fc - 0.375*B, fc + 0.375*B)
+    ws = (fl - 100, fu + 100)
+    return fc, wp, ws
 
 #Bandpass specs
 fp_bp = [2425, 2575]   # passband (Hz)
@@ -48,58 +152,17 @@ fs_bp = [2300, 2700]   # stopband (Hz)
 gpass_bp = 1           # dB
 gstop_bp = 40          # dB
 
-sos_bp = signal.iirdesign(
-    wp=fp_bp,
-    ws=fs_bp,
-    gpass=gpass_bp,
-    gstop=gstop_bp,
-    ftype="butter",
-    output="sos",
-    fs=fs
-)
-
-print("Bandpass SOS sections:", sos_bp.shape[0])
-
-w, h = signal.sosfreqz(sos_bp, worN=4096, fs=fs)
-
-plt.figure()
-plt.plot(w, 20*np.log10(np.maximum(np.abs(h), 1e-12)))
-plt.axvline(2425, color='r', linestyle='--')
-plt.axvline(2575, color='r', linestyle='--')
-plt.axvline(2300, color='k', linestyle=':')
-plt.axvline(2700, color='k', linestyle=':')
-plt.title(f"Bandpass magnitude response (SOS sections {sos_bp.shape[0]})")
-plt.xlabel("Frequency [Hz]")
-plt.ylabel("Magnitude [dB]")
-plt.grid(True)
-plt.show()
-
 #Lowpass specs 
 fp_lp = 100     # passband edge 
 fs_lp = 500     # stopband edge 
 gpass_lp = 1
 gstop_lp = 40
 
-sos_lp = signal.iirdesign(
-    wp=fp_lp,
-    ws=fs_lp,
-    gpass=gpass_lp,
-    gstop=gstop_lp,
-    ftype="butter",
-    output="sos",
-    fs=fs
-)
-
-print("Lowpass SOS sections:", sos_lp.shape[0])
-
-w, h = signal.sosfreqz(sos_lp, worN=4096, fs=fs)
-
-plt.figure()
-plt.plot(w, 20*np.log10(np.maximum(np.abs(h), 1e-12)))
-plt.axvline(100, color='r', linestyle='--')
-plt.axvline(500, color='k', linestyle=':')
-plt.title(f"Lowpass magnitude response (SOS sections {sos_lp.shape[0]})")
-plt.xlabel("Frequency [Hz]")
-plt.ylabel("Magnitude [dB]")
-plt.grid(True)
-plt.show()
+
+def __getattr__(name):
+    # The filters for the specs above are only designed when first used
+    if name == "sos_bp":
+        return design(wp=fp_bp, ws=fs_bp, gpass=gpass_bp, gstop=gstop_bp, ftype="butter", fs=fs)
+    if name == "sos_lp":
+        return design(wp=fp_lp, ws=fs_lp, gpass=gpass_lp, gstop=gstop_lp, ftype="butter", fs=fs)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
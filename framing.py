@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Packet framing for the wireless communication system project in Signals and
+transforms.
+
+Long messages are split into packets that are sent as separate bursts, each
+with its own synchronization (see `wcslib.encode_baseband_signal()`), so the
+receiver resynchronizes on every packet and only ever holds one packet in
+memory. A packet consists of (most significant bit first)
+
+    preamble (13 bits) | sequence number (16 bits) | payload length (16 bits)
+        | payload (8 bits per byte) | CRC (16 or 32 bits)
+
+The preamble is the Barker code of length 13, which is used to find the start
+of a packet in the decoded bit stream. The CRC (CRC-16/CCITT or CRC-32) covers
+the sequence number, length, and payload; packets with a wrong CRC are
+dropped.
+"""
+
+import binascii
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import wcslib as wcs
+
+# Barker code of length 13
+preamble = np.array([1, 1, 1, 1, 1, 0, 0, 1, 1, 0, 1, 0, 1], dtype=np.uint8)
+
+# Header: sequence number and payload length (bytes)
+header_size = 4
+
+# Largest possible payload (bytes)
+max_payload_size = 0xFFFF
+
+
+class Packet(NamedTuple):
+    """
+    A received packet.
+
+    seq : int
+        Sequence number (counts the packets of a message modulo 2^16).
+    payload : bytes
+        Payload of the packet.
+    """
+    seq: int
+    payload: bytes
+
+
+def crc(data: bytes, nbits: int=16) -> bytes:
+    """
+    Calculates the CRC-16/CCITT (`nbits` = 16) or CRC-32 (`nbits` = 32) of
+    `data`.
+    """
+    if nbits == 16:
+        return binascii.crc_hqx(data, 0xFFFF).to_bytes(2, 'big')
+    if nbits == 32:
+        return zlib.crc32(data).to_bytes(4, 'big')
+    raise ValueError(f'CRC must have 16 or 32 bits, but {nbits} given.')
+
+
+def packet_bits(payload_size: int, crc_bits: int=16) -> int:
+    """
+    Returns the length in bits of a packet with `payload_size` bytes of
+    payload.
+    """
+    return preamble.shape[0] + 8*(header_size + payload_size) + crc_bits
+
+
+def encode_packets(data: bytes, payload_size: int=64, crc_bits: int=16) -> list:
+    """
+    Splits `data` into packets.
+
+    Parameters
+    ----------
+    data : bytes
+        The message.
+    payload_size : int, default: 64
+        Maximum payload per packet in bytes.
+    crc_bits : int, default: 16
+        Length of the CRC, 16 or 32 bits.
+
+    Returns
+    -------
+    packets : list of numpy.array
+        Binary arrays of the packets, to be transmitted as separate bursts.
+    """
+    if not 0 < payload_size <= max_payload_size:
+        raise ValueError(f'payload size must be between 1 and {max_payload_size} bytes, but {payload_size} given.')
+
+    packets = []
+    for seq, n in enumerate(range(0, max(len(data), 1), payload_size)):
+        payload = bytes(data[n:n+payload_size])
+        body = (seq & 0xFFFF).to_bytes(2, 'big') + len(payload).to_bytes(2, 'big') + payload
+        packets.append(np.concatenate((preamble, wcs.encode_bytes(body + crc(body, crc_bits)))))
+    return packets
+
+
+class PacketDecoder:
+    """
+    Incremental packet decoder: Takes the decoded bit stream in pieces of any
+    size (e.g., one burst at a time) and returns the packets as soon as they
+    are complete.
+
+    The decoder searches the preamble, reads the header, and checks the CRC.
+    If the header or CRC is wrong (a corrupted packet or a false preamble
+    match), the packet is dropped and the search continues one bit after the
+    false preamble. Only the bits of the packet being received are kept, so the
+    memory is bounded by the maximum packet size.
+
+    Parameters
+    ----------
+    crc_bits : int, default: 16
+        Length of the CRC, 16 or 32 bits.
+    max_payload : int, default: max_payload_size
+        Largest accepted payload in bytes; longer packets are dropped.
+    max_errors : int, default: 1
+        Number of bit errors tolerated in the preamble.
+    """
+
+    def __init__(self, crc_bits: int=16, max_payload: int=max_payload_size, max_errors: int=1):
+        crc(b'', crc_bits)
+        self.crc_bits = crc_bits
+        self.max_payload = max_payload
+        self.max_errors = max_errors
+        self.dropped = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Discards the bits received so far.
+        """
+        self.buffer = np.zeros(0, dtype=np.uint8)
+
+    def feed(self, bits: np.array) -> list:
+        """
+        Decodes the next piece of the bit stream.
+
+        Parameters
+        ----------
+        bits : numpy.array
+            Binary array of the next bits.
+
+        Returns
+        -------
+        packets : list of Packet
+            The packets completed by these bits.
+        """
+        self.buffer = np.concatenate((self.buffer, np.asarray(bits, dtype=np.uint8)))
+        P = preamble.shape[0]
+        packets = []
+        while True:
+            # Find the next preamble; keep the last P-1 bits if there is none
+            k = self._find_preamble()
+            if k is None:
+                self.buffer = self.buffer[max(self.buffer.shape[0] - (P - 1), 0):]
+                break
+
+            # Header
+            start = k + P
+            if self.buffer.shape[0] < start + 8*header_size:
+                self.buffer = self.buffer[k:]
+                break
+            header = wcs.decode_bytes(self.buffer[start:start+8*header_size])
+            seq = int.from_bytes(header[:2], 'big')
+            n = int.from_bytes(header[2:], 'big')
+            if n > self.max_payload:
+                self._drop(k)
+                continue
+
+            # Payload and CRC
+            end = start + 8*(header_size + n) + self.crc_bits
+            if self.buffer.shape[0] < end:
+                self.buffer = self.buffer[k:]
+                break
+            body = wcs.decode_bytes(self.buffer[start:end])
+            if crc(body[:header_size+n], self.crc_bits) != body[header_size+n:]:
+                self._drop(k)
+                continue
+
+            packets.append(Packet(seq, body[header_size:header_size+n]))
+            self.buffer = self.buffer[end:]
+
+        return packets
+
+    def flush(self) -> int:
+        """
+        Ends the bit stream (e.g., at the end of a burst): Drops an incomplete
+        packet, if any.
+
+        Returns
+        -------
+        dropped : int
+            1 if an incomplete packet was dropped, 0 otherwise.
+        """
+        pending = self._find_preamble() is not None
+        self.reset()
+        self.dropped += pending
+        return int(pending)
+
+    def _find_preamble(self):
+        P = preamble.shape[0]
+        if self.buffer.shape[0] < P:
+            return None
+        errors = np.sum(sliding_window_view(self.buffer, P) != preamble, axis=1)
+        k = np.argmax(errors <= self.max_errors)
+        if errors[k] > self.max_errors:
+            return None
+        return int(k)
+
+    def _drop(self, k):
+        self.dropped += 1
+        self.buffer = self.buffer[k+1:]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Signal processing kernels for the wireless communication system project in
+Signals and transforms.
+"""
+
+import numpy as np
+
+
+def moving_sum(x: np.array, K: int, segment: int=65536) -> np.array:
+    """
+    Calculates the sum over a sliding window of `K` samples along the last axis
+    of `x`, that is,
+
+        y[k] = x[k] + x[k-1] + ... + x[k-K+1],
+
+    where samples before the beginning of the signal are zero. This is the
+    same as `scipy.signal.lfilter(np.ones(K), 1, x)` but costs O(1) instead of
+    O(K) operations per sample.
+
+    The sum is calculated as the difference of two cumulative sums. To avoid
+    that the round-off error grows with the length of the signal, the
+    cumulative sum is restarted every `segment` samples (drift control), so
+    the error is bounded by the error of a sum over `segment + K` samples.
+
+    The sums are always accumulated in double precision. Single-precision
+    (float32 or complex64) inputs give an output of the same precision,
+    integer inputs give a float64 output.
+
+    Parameters
+    ----------
+    x : numpy.array
+        Input signal (real or complex). Multi-dimensional arrays are filtered
+        along the last axis.
+    K : int
+        Window length in samples.
+    segment : int, default: 65536
+        Length of the segments after which the cumulative sum is restarted.
+
+    Returns
+    -------
+    y : numpy.array
+        Moving sum of `x`, of the same shape as `x`.
+    """
+
+    x = np.asarray(x)
+    dtype = np.result_type(x.dtype, np.float64)
+    if x.dtype.kind in 'fc':
+        y = np.empty(x.shape, dtype=x.dtype)
+    else:
+        y = np.empty(x.shape, dtype=dtype)
+    N = x.shape[-1]
+    segment = max(segment, K)
+    for s in range(0, N, segment):
+        e = min(s + segment, N)
+
+        # Segment including the K samples before it (zero before the start of
+        # the signal)
+        if s < K:
+            pad = np.zeros(x.shape[:-1] + (K - s,), dtype=dtype)
+            xs = np.concatenate((pad, x[..., :e]), axis=-1)
+        else:
+            xs = x[..., s-K:e]
+
+        # Cumulative sum with a leading zero, P[i] = xs[0] + ... + xs[i-1]
+        P = np.zeros(x.shape[:-1] + (e - s + K + 1,), dtype=dtype)
+        np.cumsum(xs, axis=-1, out=P[..., 1:])
+        y[..., s:e] = P[..., K+1:] - P[..., 1:e-s+1]
+
+    return y
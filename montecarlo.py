@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized Monte Carlo simulation of the wireless communication system project
+in Signals and transforms.
+
+Simulates and decodes many realizations of the channel at once: Each row of a
+2-D array is one realization with its own random distance (attenuation and
+delay), noise, and interference, drawn from the channel model of
+`wcslib.simulate_channel()`. The receiver chain (bandpass, IQ demodulation,
+lowpass, decoding) is applied to all rows at once.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import wcslib as wcs
+import filtering
+from filters import design_bandpass, design_lowpass
+from multirate import check_decimation, decimate
+from nco import NCO
+from parameters import Tb, fc, Ac, fs
+
+
+class TrialResult(NamedTuple):
+    """
+    Result of a batch of Monte Carlo trials.
+
+    errors : numpy.array
+        Number of bit errors per trial. Bits that were not decoded count as
+        errors.
+    sync : numpy.array
+        Whether the receiver synchronized to the transmission in each trial,
+        that is, detected it and decoded (at least) as many bits as were sent.
+    nbits : int
+        Number of transmitted bits per trial.
+    """
+    errors: np.array
+    sync: np.array
+    nbits: int
+
+    def ber(self) -> float:
+        """
+        Bit error rate over all trials.
+        """
+        return np.sum(self.errors)/(self.errors.shape[0]*self.nbits)
+
+
+def simulate_channel_batch(x: np.array, fs: float, channel_id: int, ntrials: int, SNR: float=20.0, eta: float=0.25, dmax: float=5.0, rng: np.random.Generator=None) -> np.array:
+    """
+    Simulates `ntrials` independent transmissions of the modulated signal `x`
+    through the channel. Each row of the result is one realization of the
+    channel model of `wcslib.simulate_channel()` (see there for details).
+
+    Parameters
+    ----------
+    x : numpy.array
+        The modulated signal to be transmitted.
+    fs : float
+        Sampling frequency.
+    channel_id : int
+        The id of the communication channel.
+    ntrials : int
+        Number of realizations.
+    SNR : float, default 20.0
+        The signal-to-noise ratio at the transmitter (in dBm).
+    eta : float, default 0.25
+        Fading coefficient.
+    dmax : float, default 5.0
+        The maximum transmission distance.
+    rng : numpy.random.Generator, optional
+        Random number generator (default: a new, randomly seeded generator).
+
+    Returns
+    -------
+    y : numpy.array
+        The signals received by the receiver, one per row. All rows have the
+        length of the longest possible delay.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+    sigma2, fis = wcs._channel_model(channel_id, SNR, fs)
+
+    # Distance, attenuation, and delay per trial
+    c = 340
+    d = dmax*rng.random(ntrials)
+    m = np.round(d/c*fs).astype(int)
+    mmax = int(np.round(dmax/c*fs))
+
+    # Delayed signals (as in simulate_channel(), with a buffer of 0.5 s): Row i
+    # is a window of the zero-padded signal, starting m[i] samples before it
+    Nbuf = int(np.round(0.5*fs))
+    Nx = x.shape[0] + mmax + Nbuf
+    xpad = np.concatenate((np.zeros(mmax), x, np.zeros(mmax + Nbuf)))
+    y = sliding_window_view(xpad, Nx)[mmax - m]
+    y = np.exp(-eta*d)[:, None]*y
+
+    # Noise and out-of-band interference
+    y += np.sqrt(sigma2)*rng.standard_normal((ntrials, Nx))
+    fi = fis[rng.integers(0, fis.shape[0], ntrials)]
+    Ai = 1 + 0.2*rng.random(ntrials)
+    k = np.arange(0, Nx)
+    y += Ai[:, None]*np.sin(2*np.pi*fi[:, None]*k/fs)
+
+    return y
+
+
+def run_trials(b: np.array, ntrials: int, channel_id: int=8, SNR: float=20.0, Tb: float=Tb, fc: float=fc, Ac: float=Ac, sos_bp: np.array=None, sos_lp: np.array=None, decimation: int=1, batch_size: int=64, rng: np.random.Generator=None) -> TrialResult:
+    """
+    Transmits the binary sequence `b` through `ntrials` realizations of the
+    channel and decodes it, counting the bit errors.
+
+    The trials are processed in batches of `batch_size` realizations; each
+    batch is simulated and decoded as a 2-D array in one vectorized pass.
+
+    Parameters
+    ----------
+    b : numpy.array
+        A binary array of 1s and 0s encoding a message.
+    ntrials : int
+        Number of trials.
+    channel_id : int, default: 8
+        The id of the communication channel.
+    SNR : float, default 20.0
+        The signal-to-noise ratio at the transmitter (in dBm).
+    Tb : float
+        Symbol width in seconds (default: `parameters.Tb`).
+    fc : float
+        Carrier frequency in Hz (default: `parameters.fc`). Must lie in the
+        channel.
+    Ac : float
+        Carrier amplitude (default: `parameters.Ac`).
+    sos_bp : numpy.array, optional
+        Bandpass filter (default: `filters.design_bandpass()`). Must match the
+        channel.
+    sos_lp : numpy.array, optional
+        Lowpass filter (default: `filters.design_lowpass()`).
+    decimation : int, default: 1
+        Decimation factor of the baseband signal before decoding.
+    batch_size : int, default: 64
+        Number of trials per batch (limits the memory use).
+    rng : numpy.random.Generator, optional
+        Random number generator (default: a new, randomly seeded generator).
+
+    Returns
+    -------
+    result : TrialResult
+        Bit errors and synchronization per trial.
+    """
+
+    check_decimation(decimation, Tb, fs)
+    if rng is None:
+        rng = np.random.default_rng()
+    if sos_bp is None:
+        sos_bp = design_bandpass()
+    if sos_lp is None:
+        sos_lp = design_lowpass()
+    b = np.asarray(b)
+    nbits = b.shape[0]
+
+    # Transmitter (the same for all trials)
+    nco = NCO(fc, fs)
+    xb = wcs.encode_baseband_signal(b.copy(), Tb, fs)
+    xt = filtering.sosfilt(sos_bp, xb*Ac*nco.sin(len(xb), 0))
+
+    errors = np.zeros(ntrials, dtype=int)
+    sync = np.zeros(ntrials, dtype=bool)
+    for i in range(0, ntrials, batch_size):
+        n = min(batch_size, ntrials - i)
+
+        # Channel
+        yr = simulate_channel_batch(xt, fs, channel_id, n, SNR, rng=rng)
+
+        # Receiver
+        y = filtering.sosfilt(sos_bp, yr)
+        y = nco.mix(y, 0)
+        y = filtering.sosfilt(sos_lp, y)
+        y = decimate(y, decimation, axis=1)
+        br, nr = wcs.decode_baseband_batch(y, Tb, fs/decimation, decimation)
+
+        # Count errors among the decoded bits and the missing bits
+        L = min(nbits, br.shape[1])
+        decoded = np.arange(L) < nr[:, None]
+        errors[i:i+n] = np.sum((br[:, :L] != b[:L]) & decoded, axis=1) + np.maximum(nbits - nr, 0)
+        sync[i:i+n] = nr >= nbits
+
+    return TrialResult(errors, sync, nbits)
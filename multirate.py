@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multirate processing for the wireless communication system project in Signals
+and transforms.
+
+After the lowpass filter, the baseband signal occupies less than 500 Hz but is
+still sampled at the full sampling frequency. Decimating it by a factor `q`
+before detection and decoding reduces the work per sample by the same factor.
+The decoder is then run at the sampling frequency `fs/q`, which also scales the
+pulse width `Kb` and the synchronization accordingly.
+"""
+
+import numpy as np
+from scipy import signal
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def check_decimation(q: int, Tb: float, fs: float):
+    """
+    Checks that the decimation factor `q` is valid for the pulse width `Tb` at
+    the sampling frequency `fs`, that is, that a pulse is an integer number of
+    samples long after decimation.
+    """
+    if q < 1 or int(q) != q:
+        raise ValueError(f'decimation factor must be a positive integer, but {q} given.')
+    if q == 1:
+        return
+    Kb = Tb*fs
+    if abs(Kb/q - np.round(Kb/q)) > 1e-9 or np.round(Kb/q) < 2:
+        raise ValueError(f'decimation factor {q} must divide the pulse width of {Kb:g} samples.')
+
+
+def decimate(x: np.array, q: int, axis: int=-1) -> np.array:
+    """
+    Decimates the signal `x` by the factor `q` using polyphase filtering with a
+    (zero-phase) anti-aliasing FIR filter (`scipy.signal.resample_poly()`).
+
+    Parameters
+    ----------
+    x : numpy.array
+        Signal (real or complex).
+    q : int
+        Decimation factor.
+    axis : int, default: -1
+        Axis along which to decimate.
+
+    Returns
+    -------
+    y : numpy.array
+        Decimated signal.
+    """
+    if q == 1:
+        return x
+    return signal.resample_poly(x, 1, q, axis=axis)
+
+
+class Decimator:
+    """
+    Streaming polyphase decimator: Filters the signal with a causal
+    anti-aliasing FIR filter and keeps every `q`-th sample, processing one
+    block at a time. Only the outputs that are kept are calculated, and the
+    filter history and the decimation phase are carried between blocks, so the
+    result does not depend on the block size.
+
+    Parameters
+    ----------
+    q : int
+        Decimation factor.
+    h : numpy.array, optional
+        Anti-aliasing FIR filter (default: the Kaiser-windowed filter used by
+        `scipy.signal.resample_poly()`).
+    dtype : numpy.dtype, default: numpy.float64
+        Precision of the filter coefficients and the filter history 
+        (numpy.float32 or numpy.float64).
+    """
+
+    def __init__(self, q: int, h: np.array=None, dtype: np.dtype=np.float64):
+        if q == 1:
+            h = np.ones(1)
+        elif h is None:
+            h = signal.firwin(20*q + 1, 1/q, window=('kaiser', 5.0))
+        self.q = q
+        self.h = h[::-1].astype(dtype)
+        self.history = np.zeros(h.shape[0] - 1, dtype=dtype)
+        self.phase = 0
+
+    def process(self, x: np.array) -> np.array:
+        """
+        Decimates a block of the signal.
+
+        Parameters
+        ----------
+        x : numpy.array
+            Block of the signal (real or complex).
+
+        Returns
+        -------
+        y : numpy.array
+            Block of the decimated signal.
+        """
+        if self.q == 1:
+            return x
+
+        # Frame i ends at sample x[i]; only every q-th frame is filtered
+        xx = np.concatenate((self.history, x))
+        frames = sliding_window_view(xx, self.h.shape[0])[self.phase::self.q]
+        y = frames @ self.h
+
+        self.history = xx[xx.shape[0] - self.history.shape[0]:]
+        self.phase = (self.phase - x.shape[0]) % self.q
+        return y
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Numerically controlled oscillator (NCO) for the wireless communication system
+project in Signals and transforms.
+
+For a rational ratio fc/fs = p/P (in lowest terms), the carrier
+
+    exp(1j*2*pi*fc*n/fs)
+
+is periodic in P samples (e.g., P = 8 for fc = 2500 Hz and fs = 20000 Hz). The
+NCO calculates one period of the carrier once and generates the carrier for any
+number of samples by tiling the table, without evaluating any trigonometric
+functions.
+"""
+
+from fractions import Fraction
+
+import numpy as np
+
+# Maximum period (in samples) for which the carrier is tabulated
+max_period = 1 << 20
+
+
+class NCO:
+    """
+    Numerically controlled oscillator with a cached carrier table.
+
+    The oscillator keeps track of its phase (sample counter), so consecutive
+    calls continue the carrier where the previous call ended, which is what
+    block-based (streaming) processing needs. Alternatively, the start sample
+    can be given explicitly.
+
+    Parameters
+    ----------
+    fc : float
+        Carrier frequency in Hz.
+    fs : float
+        Sampling frequency in Hz.
+    dtype : numpy.dtype, default: numpy.float64
+        Precision of the carrier (numpy.float32 or numpy.float64); the 
+        complex carrier has the corresponding complex type. The carrier is
+        always calculated in double precision and then rounded.
+    """
+
+    def __init__(self, fc: float, fs: float, dtype: np.dtype=np.float64):
+        self.fc = fc
+        self.fs = fs
+        self.n = 0
+        self.dtype = np.dtype(dtype)
+        self.complex_dtype = np.result_type(self.dtype, np.complex64)
+
+        # Period of the carrier (in samples), using the exact decimal values
+        # of fc and fs
+        ratio = Fraction(str(fc))/Fraction(str(fs))
+        P = ratio.denominator
+        if P <= max_period:
+            # Phase index p*n mod P is exact, so the table has no phase error
+            k = (ratio.numerator*np.arange(P)) % P
+            self.period = P
+            table = np.exp(1j*2*np.pi*k/P)
+            self.table = table.astype(self.complex_dtype)
+            self.cos_table = table.real.astype(self.dtype)
+            self.sin_table = table.imag.astype(self.dtype)
+            self.mix_table = (2*table).astype(self.complex_dtype)
+        else:
+            self.period = None
+
+    def phasor(self, N: int, n0: int=None) -> np.array:
+        """
+        Returns the complex carrier exp(1j*2*pi*fc*n/fs) for the `N` samples
+        n = n0, ..., n0+N-1 (default: continue from the previous call).
+        """
+        return self._generate(N, n0, 'table', lambda phi: np.exp(1j*phi).astype(self.complex_dtype))
+
+    def cos(self, N: int, n0: int=None) -> np.array:
+        """
+        Returns the carrier cos(2*pi*fc*n/fs) for `N` samples (see `phasor()`).
+        """
+        return self._generate(N, n0, 'cos_table', lambda phi: np.cos(phi).astype(self.dtype))
+
+    def sin(self, N: int, n0: int=None) -> np.array:
+        """
+        Returns the carrier sin(2*pi*fc*n/fs) for `N` samples (see `phasor()`).
+        """
+        return self._generate(N, n0, 'sin_table', lambda phi: np.sin(phi).astype(self.dtype))
+
+    def mix(self, x: np.array, n0: int=None) -> np.array:
+        """
+        IQ demodulates the real-valued signal `x` in a single pass, that is,
+        returns the complex-valued signal
+
+            yI + 1j*yQ = 2*x*cos(2*pi*fc*n/fs) + 1j*2*x*sin(2*pi*fc*n/fs),
+
+        which can then be lowpass filtered with one complex filter. If `x` is
+        a 2-D array, each row is mixed with the same carrier.
+        """
+        return x*self._generate(x.shape[-1], n0, 'mix_table', lambda phi: (2*np.exp(1j*phi)).astype(self.complex_dtype))
+
+    def reset(self):
+        """
+        Resets the phase of the oscillator to sample 0.
+        """
+        self.n = 0
+
+    def _generate(self, N, n0, table, f):
+        if n0 is None:
+            n0 = self.n
+            self.n += N
+            if self.period is not None:
+                self.n %= self.period
+        if self.period is None:
+            return f(2*np.pi*self.fc/self.fs*(n0 + np.arange(N)))
+
+        # Rotate the table to start at n0 and repeat it
+        t = getattr(self, table)
+        return np.resize(np.roll(t, -(n0 % self.period)), N)
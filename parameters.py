@@ -7,3 +7,4 @@ Ac = 0.2
 fs = 20000
 dt = 1.0 / fs
 
+blocksize = 2048
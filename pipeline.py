@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reusable transmitter and receiver pipelines for the wireless communication
+system project in Signals and transforms.
+
+`transmitter.main()` and `receiver.main()` design the filters and compute the
+carrier every time they are run. A service that sends or receives many
+messages builds a `TxPipeline` or `RxPipeline` once from a (frozen)
+`PipelineConfig` instead: The filters, the filtering backend, the carrier
+tables, and the pulse width are calculated when the pipeline is created, and
+the work arrays for modulation and demodulation are allocated once and grown
+only when a longer message arrives. Each message is then processed
+independently (the filters are reset between messages).
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+import wcslib as wcs
+from detection import chi2_threshold
+import filters
+from filtering import make_filter
+from multirate import check_decimation, decimate
+from nco import NCO
+import parameters
+import profiling
+
+
+class PipelineConfig(NamedTuple):
+    """
+    Configuration of a transmitter or receiver pipeline (immutable).
+
+    fc : float
+        Carrier frequency in Hz.
+    Tb : float
+        Symbol width in seconds.
+    fs : float
+        Sampling frequency in Hz.
+    Ac : float
+        Carrier amplitude (transmitter).
+    M : int
+        Number of symbols of the phase-shift keying (2 for BPSK, 4 for QPSK,
+        see `wcslib.encode_baseband_signal()`).
+    decimation : int
+        Decimation factor of the baseband signal before decoding (receiver).
+    dtype : numpy.dtype
+        Precision of the signals (numpy.float32 or numpy.float64).
+    wp_bp, ws_bp : tuple of float
+        Passband and stopband edges of the channel bandpass filter in Hz.
+    wp_lp, ws_lp : float
+        Passband and stopband edges of the baseband lowpass filter in Hz.
+    gpass, gstop : float
+        Maximum passband loss and minimum stopband attenuation of the filters
+        in dB.
+    """
+    fc: float = parameters.fc
+    Tb: float = parameters.Tb
+    fs: float = parameters.fs
+    Ac: float = parameters.Ac
+    M: int = 2
+    decimation: int = 1
+    dtype: np.dtype = np.float64
+    wp_bp: tuple = tuple(filters.fp_bp)
+    ws_bp: tuple = tuple(filters.fs_bp)
+    wp_lp: float = filters.fp_lp
+    ws_lp: float = filters.fs_lp
+    gpass: float = filters.gpass_bp
+    gstop: float = filters.gstop_bp
+
+    @classmethod
+    def for_channel(cls, channel_id: int, **kwargs):
+        """
+        Returns the configuration for the channel `channel_id` of wcslib (the
+        carrier frequency and the bandpass filter of `filters.channel_band()`);
+        the other fields are given as keyword arguments.
+        """
+        fc, wp, ws = filters.channel_band(channel_id)
+        return cls(fc=fc, wp_bp=wp, ws_bp=ws, **kwargs)
+
+    @property
+    def Kb(self) -> int:
+        """
+        Pulse width in samples.
+        """
+        return int(np.floor(self.Tb*self.fs))
+
+
+def _grow(work: np.array, N: int) -> np.array:
+    """
+    Returns a work array of at least `N` elements: `work` itself if it is long
+    enough, otherwise a new array of twice the size.
+    """
+    if work.shape[0] >= N:
+        return work
+    return np.empty(max(N, 2*work.shape[0]), dtype=work.dtype)
+
+
+class TxPipeline:
+    """
+    Transmitter pipeline: baseband encoding, modulation, and bandpass
+    filtering of one message at a time.
+
+    `encode(msg)` returns the same signal as encoding the message with
+    `wcslib.encode_baseband_signal()`, modulating it with the carrier (see
+    `streaming.StreamingTransmitter`), and filtering it with the bandpass
+    filter.
+
+    Parameters
+    ----------
+    config : PipelineConfig, optional
+        Configuration (default: `PipelineConfig()`).
+    backend : str, optional
+        Force the filtering backend, 'sos' or 'ols' (default: automatic, see
+        `filtering.make_filter()`).
+    """
+
+    def __init__(self, config: PipelineConfig=None, backend: str=None):
+        if config is None:
+            config = PipelineConfig()
+        wcs.bits_per_symbol(config.M)
+        self.config = config
+        self.Kb = config.Kb
+        self.dtype = np.dtype(config.dtype)
+        with profiling.stage('design'):
+            self.sos_bp = filters.design(wp=config.wp_bp, ws=config.ws_bp, gpass=config.gpass, gstop=config.gstop, fs=config.fs)
+            self.filter = make_filter(self.sos_bp, backend=backend)
+            self.nco = NCO(config.fc, config.fs, self.dtype)
+
+        # Work arrays: the baseband signal and the carrier (multiplied by the
+        # carrier amplitude, negated and conjugated for M-PSK) from sample 0
+        if config.M == 2:
+            self.xb = np.empty(0, dtype=self.dtype)
+        else:
+            self.xb = np.empty(0, dtype=self.nco.complex_dtype)
+        self.carrier = np.empty(0, dtype=self.xb.dtype)
+
+    def symbols(self, msg) -> np.array:
+        """
+        Returns the symbols of a message, including the synchronization
+        sequence. `msg` is a string (sent as UTF-8), bytes, or a binary array.
+        """
+        if isinstance(msg, str):
+            b = wcs.encode_string(msg)
+        elif isinstance(msg, (bytes, bytearray, memoryview)):
+            b = wcs.encode_bytes(msg)
+        else:
+            b = np.asarray(msg)
+        if self.config.M == 2:
+            return np.concatenate(([1, -1], 2*b.astype(np.int8) - 1))
+        return np.concatenate(([1, -1], wcs.encode_symbols(b, self.config.M)))
+
+    def encode(self, msg) -> np.array:
+        """
+        Generates the transmit signal of a message.
+
+        Parameters
+        ----------
+        msg : str, bytes, or numpy.array
+            The message: a string (sent as UTF-8), bytes, or a binary array of
+            1s and 0s.
+
+        Returns
+        -------
+        xt : numpy.array
+            The transmit signal.
+        """
+        with profiling.stage('encode'):
+            s = self.symbols(msg)
+        N = s.shape[0]*self.Kb
+
+        # Baseband (each symbol held for Kb samples) and modulation, in the
+        # work array
+        with profiling.stage('modulate', N):
+            self._carrier(N)
+            self.xb = _grow(self.xb, N)
+            xb = self.xb[:N]
+            xb.reshape(-1, self.Kb)[:] = s[:, None]
+            np.multiply(xb, self.carrier[:N], out=xb)
+            xm = xb if self.config.M == 2 else xb.imag
+
+        with profiling.stage('bandpass', N):
+            self.filter.reset()
+            return self.filter.process(xm).astype(self.dtype, copy=False)
+
+    def _carrier(self, N: int):
+        if self.carrier.shape[0] >= N:
+            return
+        N = max(N, 2*self.carrier.shape[0])
+        Ac = self.dtype.type(self.config.Ac)
+        if self.config.M == 2:
+            self.carrier = Ac*self.nco.sin(N, 0)
+        else:
+            # Ac*Im(conj(xb)*exp(1j*w*n)) = Im(xb*(-Ac)*exp(-1j*w*n))
+            self.carrier = -Ac*np.conj(self.nco.phasor(N, 0))
+
+
+class RxPipeline:
+    """
+    Receiver pipeline: bandpass filter, IQ demodulation, lowpass filter,
+    decimation, and decoding of one received signal at a time.
+
+    `decode(samples)` returns the same bits as the batch receiver of
+    `receiver.main()`.
+
+    Parameters
+    ----------
+    config : PipelineConfig, optional
+        Configuration (default: `PipelineConfig()`).
+    backend : str, optional
+        Force the filtering backend, 'sos' or 'ols' (default: automatic, see
+        `filtering.make_filter()`).
+    """
+
+    def __init__(self, config: PipelineConfig=None, backend: str=None):
+        if config is None:
+            config = PipelineConfig()
+        wcs.bits_per_symbol(config.M)
+        check_decimation(config.decimation, config.Tb, config.fs)
+        self.config = config
+        self.Kb = config.Kb
+        self.fs_bb = config.fs/config.decimation
+        self.dtype = np.dtype(config.dtype)
+        with profiling.stage('design'):
+            self.sos_bp = filters.design(wp=config.wp_bp, ws=config.ws_bp, gpass=config.gpass, gstop=config.gstop, fs=config.fs)
+            self.sos_lp = filters.design(wp=config.wp_lp, ws=config.ws_lp, gpass=config.gpass, gstop=config.gstop, fs=config.fs)
+            self.filter_bp = make_filter(self.sos_bp, backend=backend)
+            self.filter_lp = make_filter(self.sos_lp, backend=backend)
+            self.nco = NCO(config.fc, config.fs, self.dtype)
+
+            # Decoder: the signal detection threshold and the matched filter
+            # of the synchronization sequence at the baseband rate
+            Kb_bb = int(np.floor(config.Tb*self.fs_bb))
+            self.threshold = chi2_threshold(2*config.decimation*Kb_bb)
+            self.template = wcs.sync_template(Kb_bb, self.dtype)
+
+        # Work arrays: the mixed signal and the mixing carrier
+        # 2*exp(1j*w*n) from sample 0
+        self.y = np.empty(0, dtype=self.nco.complex_dtype)
+        self.carrier = np.empty(0, dtype=self.nco.complex_dtype)
+
+    def baseband(self, samples: np.array) -> np.array:
+        """
+        Demodulates a received signal: Returns its complex-valued baseband
+        signal, decimated by `config.decimation`.
+        """
+        N = samples.shape[0]
+        self.filter_bp.reset()
+        self.filter_lp.reset()
+        with profiling.stage('bandpass', N):
+            y = self.filter_bp.process(samples).astype(self.dtype, copy=False)
+        with profiling.stage('mix', N):
+            if self.carrier.shape[0] < N:
+                self.carrier = self.nco.mix(np.ones(max(N, 2*self.carrier.shape[0]), dtype=self.dtype), 0)
+            self.y = _grow(self.y, N)
+            np.multiply(y, self.carrier[:N], out=self.y[:N])
+        with profiling.stage('lowpass', N):
+            y = self.filter_lp.process(self.y[:N]).astype(self.nco.complex_dtype, copy=False)
+        with profiling.stage('decimate', N):
+            return decimate(y, self.config.decimation).astype(self.nco.complex_dtype, copy=False)
+
+    def decode(self, samples: np.array) -> np.array:
+        """
+        Decodes a received signal.
+
+        Parameters
+        ----------
+        samples : numpy.array
+            The received signal.
+
+        Returns
+        -------
+        b : numpy.array
+            A binary array of 1s and 0s encoding the message (see
+            `wcslib.decode_string()` and `wcslib.decode_bytes()`).
+        """
+        yb = self.baseband(samples)
+        return wcs.decode_baseband_signal(yb, self.config.Tb, self.fs_bb, self.config.decimation, self.config.M, self.threshold, self.template)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-stage profiling for the wireless communication system project in Signals
+and transforms.
+
+The transmitter, the receiver, and the channel simulation mark their
+processing stages (filter design, bandpass filter, mixing, lowpass filter,
+detection, synchronization, bit recovery, ...) with
+
+    with profiling.stage('bandpass', x.shape[-1]):
+        ...
+
+When profiling is enabled (`enable()`, or `--profile` of the transmitter and
+the receiver), every stage accumulates its number of calls, time, and number
+of samples, and optionally the memory it allocates and the number of memory
+blocks it leaves allocated (with `tracemalloc`). The
+results are exported as JSON or in the Prometheus text format. When profiling
+is disabled (the default), `stage()` returns a shared no-op context manager,
+so the instrumentation costs a function call per stage and can stay in place.
+"""
+
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import NamedTuple
+
+# Active profiler (None: profiling is disabled) and the no-op context
+_active = None
+_disabled = nullcontext()
+
+# Prefix of the Prometheus metric names
+metric_prefix = 'wcs_stage'
+
+
+class StageProfile(NamedTuple):
+    """
+    Accumulated profile of a stage.
+
+    name : str
+        Name of the stage.
+    calls : int
+        Number of times the stage was run.
+    seconds : float
+        Total (wall-clock) time spent in the stage in seconds, including
+        nested stages.
+    samples : int
+        Total number of samples processed.
+    peak_bytes : int
+        Largest amount of memory allocated while the stage was running (above
+        the memory in use when it started), in bytes; 0 if allocations are
+        not traced.
+    allocations : int
+        Total number of memory blocks allocated by the stage that were still
+        allocated when it ended (from `tracemalloc` snapshots taken when it
+        starts and ends; temporaries freed within the stage are not counted),
+        0 if allocations are not traced.
+    """
+    name: str
+    calls: int
+    seconds: float
+    samples: int
+    peak_bytes: int
+    allocations: int
+
+
+class Profiler:
+    """
+    Collects the profiles of the stages.
+
+    Parameters
+    ----------
+    trace_allocations : bool, default: False
+        Also trace the memory allocated by each stage with `tracemalloc`
+        (which slows down allocations considerably, and takes two snapshots
+        of all traced memory per stage). `tracemalloc` traces the
+        whole process, so stages that run concurrently in several threads see
+        each other's allocations.
+    """
+
+    def __init__(self, trace_allocations: bool=False):
+        self.trace_allocations = trace_allocations
+        self.tracing = False
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def stage(self, name: str, samples: int=0):
+        """
+        Returns a context manager that profiles the stage `name`, which
+        processes `samples` samples.
+        """
+        return _Stage(self, name, samples)
+
+    def record(self, name: str, seconds: float, samples: int=0, peak_bytes: int=0, allocations: int=0):
+        """
+        Adds a run of the stage `name` to its profile.
+        """
+        with self.lock:
+            calls, total, nsamples, peak, nallocations = self.stages.get(name, (0, 0.0, 0, 0, 0))
+            self.stages[name] = (calls + 1, total + seconds, nsamples + samples, max(peak, peak_bytes), nallocations + allocations)
+
+    def profiles(self) -> list:
+        """
+        Returns the profiles of the stages in the order they were first run.
+        """
+        with self.lock:
+            return [StageProfile(name, *values) for name, values in self.stages.items()]
+
+    def to_json(self) -> str:
+        """
+        Returns the profiles as a JSON document, `{"stages": [{"name": ...,
+        "calls": ..., "seconds": ..., "samples": ..., "peak_bytes": ...,
+        "allocations": ...}]}`.
+        """
+        return json.dumps({'stages': [p._asdict() for p in self.profiles()]}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the profiles in the Prometheus text exposition format, one
+        metric per field with the stage as label, e.g.
+
+            wcs_stage_seconds_total{stage="bandpass"} 0.0123
+        """
+        metrics = [
+            ('calls_total', 'counter', 'Number of runs of the stage.', 'calls'),
+            ('seconds_total', 'counter', 'Time spent in the stage in seconds.', 'seconds'),
+            ('samples_total', 'counter', 'Number of samples processed by the stage.', 'samples'),
+            ('peak_bytes', 'gauge', 'Largest memory allocation of the stage in bytes.', 'peak_bytes'),
+            ('allocations_total', 'counter', 'Number of memory blocks left allocated by the stage.', 'allocations'),
+        ]
+        profiles = self.profiles()
+        lines = []
+        for suffix, kind, description, field in metrics:
+            name = f'{metric_prefix}_{suffix}'
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for p in profiles:
+                lines.append(f'{name}{{stage="{p.name}"}} {getattr(p, field)!r}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, format: str='json') -> str:
+        """
+        Returns the profiles as 'json' or 'prometheus' text.
+        """
+        if format == 'json':
+            return self.to_json()
+        if format == 'prometheus':
+            return self.to_prometheus()
+        raise ValueError(f'unknown profile format \'{format}\'.')
+
+
+class _Stage:
+    """
+    Context manager that profiles one run of a stage.
+    """
+
+    def __init__(self, profiler, name, samples):
+        self.profiler = profiler
+        self.name = name
+        self.samples = samples
+
+    def __enter__(self):
+        if self.profiler.trace_allocations:
+            self._enter_allocations()
+        self.t = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        seconds = time.perf_counter() - self.t
+        peak_bytes, allocations = self._exit_allocations() if self.profiler.trace_allocations else (0, 0)
+        self.profiler.record(self.name, seconds, self.samples, peak_bytes, allocations)
+
+    # The peak of tracemalloc is reset when a stage starts; the stages that
+    # are running (nested) keep the largest peak seen so far on a stack,
+    # together with the snapshot taken when they started. The snapshots are
+    # taken outside of the measured peaks
+    def _enter_allocations(self):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.profiler.tracing = True
+            # Fill the caches of the snapshots and their filters, which would
+            # count as allocations of the first stage
+            _snapshot()
+            _snapshot()
+        stack = self.profiler.local.__dict__.setdefault('stack', [])
+        if stack:
+            stack[-1][1] = max(stack[-1][1], tracemalloc.get_traced_memory()[1])
+        snapshot = _snapshot()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        stack.append([current, current, snapshot])
+
+    def _exit_allocations(self):
+        import tracemalloc
+        stack = self.profiler.local.stack
+        start, peak, snapshot = stack.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        allocations = sum(max(stat.count_diff, 0) for stat in _snapshot().compare_to(snapshot, 'lineno'))
+        del snapshot
+        tracemalloc.reset_peak()
+        return peak - start, allocations
+
+
+def _snapshot():
+    """
+    Takes a `tracemalloc` snapshot without the memory of the profiler itself.
+    """
+    import tracemalloc
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+
+
+class _Stopwatch:
+    """
+    Profiles consecutive stages of a function without nesting them in
+    `with` blocks: `lap(name)` ends the current stage (started by the
+    previous lap or when the stopwatch was created) as stage `name` and
+    starts the next one; `stop(name)` ends the last one.
+    """
+
+    def __init__(self, profiler, samples):
+        self.profiler = profiler
+        self.samples = samples
+        self.stage = _Stage(profiler, None, samples).__enter__()
+
+    def lap(self, name: str):
+        self.stop(name)
+        self.stage = _Stage(self.profiler, None, self.samples).__enter__()
+
+    def stop(self, name: str):
+        self.stage.name = name
+        self.stage.__exit__()
+
+
+class _NullStopwatch:
+    """
+    Stopwatch of disabled profiling (does nothing).
+    """
+
+    def lap(self, name: str):
+        pass
+
+    def stop(self, name: str):
+        pass
+
+
+_null_stopwatch = _NullStopwatch()
+
+
+def enable(trace_allocations: bool=False) -> Profiler:
+    """
+    Enables profiling: Returns a new profiler that collects the profiles of
+    all stages from now on.
+    """
+    global _active
+    _active = Profiler(trace_allocations)
+    return _active
+
+
+def disable():
+    """
+    Disables profiling (and stops tracing the allocations if the profiler
+    started it).
+    """
+    global _active
+    if _active is not None and _active.tracing:
+        import tracemalloc
+        tracemalloc.stop()
+    _active = None
+
+
+def active() -> Profiler:
+    """
+    Returns the active profiler, or None if profiling is disabled.
+    """
+    return _active
+
+
+def stage(name: str, samples: int=0):
+    """
+    Returns a context manager that profiles the stage `name`, which processes
+    `samples` samples, if profiling is enabled, and does nothing otherwise.
+    """
+    if _active is None:
+        return _disabled
+    return _active.stage(name, samples)
+
+
+def stopwatch(samples: int=0):
+    """
+    Returns a stopwatch that profiles consecutive stages processing `samples`
+    samples each, e.g.
+
+        watch = profiling.stopwatch(N)
+        ...
+        watch.lap('detect')
+        ...
+        watch.stop('sync')
+
+    if profiling is enabled, and one that does nothing otherwise.
+    """
+    if _active is None:
+        return _null_stopwatch
+    return _Stopwatch(_active, samples)
+
+
+@contextmanager
+def session(format: str=None, output: str=None, trace_allocations: bool=False):
+    """
+    Profiles the code in the `with` block and writes the profiles in the
+    `format` 'json' or 'prometheus' to the file `output` (default: standard
+    error) at its end. Does nothing if `format` is None (as for the
+    `--profile` option of the transmitter and the receiver when it is not
+    given).
+    """
+    if format is None:
+        yield None
+        return
+
+    profiler = enable(trace_allocations)
+    try:
+        yield profiler
+    finally:
+        disable()
+        text = profiler.export(format).rstrip('\n') + '\n'
+        if output is None:
+            sys.stderr.write(text)
+        else:
+            with open(output, 'w') as f:
+                f.write(text)
@@ -8,14 +8,28 @@ transforms
 """
 
 import argparse
+import json
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+
 import numpy as np
-from scipy import signal
-import sounddevice as sd
 
 import wcslib as wcs
+import fileio
+import profiling
+import framing
+import burstsync
 
 # TODO: Add relevant parameters to parameters.py
-from parameters import Tb, dt, fc
+from parameters import Tb, dt, fc, blocksize
+from streaming import StreamingDetector, StreamingReceiver
+from multirate import check_decimation
+from pipeline import PipelineConfig, RxPipeline
+from segmented import decode_segmented
+from staged import StagedPipeline, format_stats, receiver_stages
+from channelizer import Channelizer, all_channel_ids
 
 def main():
     parser = argparse.ArgumentParser(
@@ -29,92 +43,539 @@ def main():
         type=float,
         default=10
     )
+    parser.add_argument(
+        '-s',
+        '--stream',
+        help='process the signal block by block while recording and decode '
+             'messages as they arrive (duration 0 runs until interrupted)',
+        action='store_true'
+    )
+    parser.add_argument(
+        '-q',
+        '--decimate',
+        help='decimate the baseband signal by this factor before decoding '
+             '(default: 1, or 50 with -c)',
+        type=int
+    )
+    parser.add_argument(
+        '-i',
+        '--input',
+        help='read the received signal from a WAV or raw file instead of '
+             'recording it (processed block by block)'
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='save the recorded signal to a WAV or raw file'
+    )
+    parser.add_argument(
+        '-f',
+        '--format',
+        help='sample format of raw input files and of output files',
+        choices=list(fileio.sample_formats),
+        default='int16'
+    )
+    parser.add_argument(
+        '-c',
+        '--channels',
+        help='decode several channels at once with the FFT channelizer: '
+             'comma-separated channel ids, or "all"'
+    )
+    parser.add_argument(
+        '-p',
+        '--packets',
+        help='the message is sent in packets (see transmitter.py '
+             '--packet-size); decode and check each packet',
+        action='store_true'
+    )
+    parser.add_argument(
+        '-a',
+        '--all-bursts',
+        help='decode every transmission in the recording, not only the first '
+             '(with -i, searches the file in segments, see --segment)',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--float32',
+        help='process the signal in single precision (float32/complex64)',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--daemon',
+        help='run continuously (until interrupted) and print every decoded '
+             'message as a JSON line with timestamps; with -i, replay a file',
+        action='store_true'
+    )
+    parser.add_argument(
+        '-m',
+        '--modulation',
+        help='phase-shift keying scheme of the transmitter',
+        choices=list(wcs.modulations),
+        default='bpsk'
+    )
+    parser.add_argument(
+        '--segment',
+        help='decode every transmission in the input file (-i) in segments of '
+             'this length (in seconds), in parallel',
+        type=float
+    )
+    parser.add_argument(
+        '-j',
+        '--workers',
+        help='number of worker processes for --segment (default: number of '
+             'CPUs)',
+        type=int
+    )
+    parser.add_argument(
+        '-t',
+        '--threads',
+        help='run the receiver stages in separate threads connected by '
+             'bounded queues (with -i or -s), and report the utilization and '
+             'queue depth of each stage',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--profile',
+        help='profile the processing stages and print the profile in this '
+             'format to standard error (or --profile-output) at the end',
+        choices=['json', 'prometheus']
+    )
+    parser.add_argument(
+        '--profile-output',
+        help='write the profile to this file'
+    )
+    parser.add_argument(
+        '--profile-memory',
+        help='also trace the memory allocated by each stage (slow)',
+        action='store_true'
+    )
     args = parser.parse_args()
+    if args.segment is not None and args.input is None:
+        parser.error('--segment requires an input file (-i)')
+    if args.all_bursts and (args.stream or args.daemon or args.channels is not None or args.packets):
+        parser.error('-a/--all-bursts cannot be combined with -s, --daemon, -c, or -p')
+
+    with profiling.session(args.profile, args.profile_output, args.profile_memory):
+        run(args)
 
+
+def run(args):
+    """
+    Runs the receiver with the parsed command-line arguments (see `main()`).
+    """
     # Set parameters
     T = args.duration
+    fs = int(1/dt)
+    q = args.decimate
+    if q is None:
+        # The channelizer's baseband signals are narrowband
+        q = 50 if args.channels is not None else 1
+    check_decimation(q, Tb, fs)
+    dtype = np.float32 if args.float32 else np.float64
+    M = wcs.modulations[args.modulation]
+
+    # Rx bandpass filter (isolate our signal from noise) and baseband lowpass
+    # filter, see PipelineConfig for the specs; designed once together with
+    # the carrier
+    config = PipelineConfig(fc=fc, Tb=Tb, fs=fs, M=M, decimation=q, dtype=dtype)
+    pipeline = RxPipeline(config)
+    sos_bp, sos_lp = pipeline.sos_bp, pipeline.sos_lp
+
+    on_message = packet_printer() if args.packets else print_message
+    if not args.packets and 8 % wcs.bits_per_symbol(M):
+        # Drop the padding of the last symbol (an incomplete byte)
+        on_message = whole_bytes(on_message)
+
+    if args.channels is not None:
+        channel_ids = all_channel_ids() if args.channels == 'all' else [int(i) for i in args.channels.split(',')]
+    if args.input is not None and args.channels is not None:
+        capture = fileio.open_capture(args.input, fs, args.format)
+        if capture.fs != fs:
+            raise ValueError(f'\'{args.input}\' is sampled at {capture.fs} Hz, but {fs} Hz is required.')
+        receive_channels(fileio.read_blocks(capture, blocksize, dtype=dtype), channel_ids, fs, q, dtype, M, on_message)
+        return
+
+    if args.daemon:
+        rx = StreamingReceiver(sos_bp, sos_lp, fc, Tb, fs, decimation=q, dtype=dtype, M=M)
+        events = EventWriter(rx.fs_bb, args.packets, M)
+        if args.input is not None:
+            blocks = fileio.read_blocks(fileio.open_capture(args.input, fs, args.format), blocksize, dtype=dtype)
+        else:
+            blocks = record_blocks(fs, on_overrun=events.overrun)
+        try:
+            receive_daemon(blocks, rx, events.message)
+        except KeyboardInterrupt:
+            pass
+        return
 
-    # Receive signal
+    if args.segment is not None or (args.all_bursts and args.input is not None):
+        segment = args.segment if args.segment is not None else 600.0
+        receive_segmented(args.input, config, segment, args.workers, args.format, on_message)
+        return
+
+    if args.input is not None:
+        receive_file(args.input, sos_bp, sos_lp, fs, q, dtype, args.format, on_message, M, args.threads)
+        return
+
+    if args.stream:
+        receive_stream(sos_bp, sos_lp, T, fs, q, dtype, args.output, args.format, on_message, M, args.threads)
+        return
+
+    # Receive signal (sounddevice is only needed, and imported, when recording)
+    import sounddevice as sd
     print(f'Receiving for {T} s.')
-    yr = sd.rec(int(T/dt), samplerate=1/dt, channels=1, blocking=True)
+    yr = sd.rec(int(T/dt), samplerate=1/dt, channels=1, dtype='float32', blocking=True)
     yr = yr[:, 0]           # Remove second channel
+    if args.output is not None:
+        with fileio.CaptureWriter(args.output, fs, args.format) as f:
+            f.write(yr)
+
+    if args.channels is not None:
+        receive_channels([yr], channel_ids, fs, q, dtype, M, on_message)
+        return
+
+    if args.packets:
+        # One burst per packet: detect and decode the bursts one by one
+        rx = StreamingReceiver(sos_bp, sos_lp, fc, Tb, fs, decimation=q, dtype=dtype, M=M)
+        for br in rx.process(yr) + rx.flush():
+            on_message(br)
+        return
 
     # TODO: Implement demodulation, etc. here
-    fs = int(1/dt)
-    t = np.arange(len(yr)) * dt
 
-    #Rx bandpass filter. Isolate our signal from noise
-    fp_bp = [2425, 2575]   
-    fs_bp = [2300, 2700]   
-    gpass_bp = 1           
-    gstop_bp = 40         
+    # Bandpass filter, IQ demodulation (yI + 1j*yQ in a single pass using the
+    # tabulated carrier), complex lowpass filter, and decimation of the
+    # baseband signal
+    print(f"[Rx] fs={fs} Hz, BPF sections={sos_bp.shape[0]}, LPF sections={sos_lp.shape[0]}")
+    y_complex = pipeline.baseband(yr)
 
-    sos_bp = signal.iirdesign(
-        wp=fp_bp,         
-        ws=fs_bp,          
-        gpass=gpass_bp,    
-        gstop=gstop_bp,   
-        ftype="butter",
-        output="sos",
-        fs=fs
-    )
+    if args.all_bursts:
+        # Find every burst by FFT correlation with the synchronization sequence
+        for burst in burstsync.find_bursts(y_complex, Tb, 1/dt/q):
+            br = burstsync.decode_burst(y_complex, burst, Tb, 1/dt/q, M=M)
+            print(f'[Rx] Burst at {burst.start*q*dt:.2f} s, phase {np.degrees(burst.phase):.0f} deg:')
+            on_message(br)
+        return
 
-    #Apply filter
-    y_ch = signal.sosfilt(sos_bp, yr)
+    # Symbol decoding
+    # TODO: Adjust fs (lab 2 only, leave untouched for lab 1 unless you know what you are doing)
+    br = wcs.decode_baseband_signal(y_complex, Tb, 1/dt/q, q, M)
+    on_message(br)
 
 
-    # --- IQ demodulation ---
-    yI = 2 * y_ch * np.cos(2 * np.pi * fc * t)
-    yQ = 2 * y_ch * np.sin(2 * np.pi * fc * t)
+def print_message(br):
+    """
+    Prints a decoded message.
+    """
+    data_rx = wcs.decode_string(br)
+    print(f'Received: {data_rx} (no of bits: {len(br)}).')
 
-    #Lowpass filters (baseband)
-    fp_lp = 100     # passband
-    fs_lp = 500     # stopband
-    gpass_lp = 1
-    gstop_lp = 40
 
-    sos_lp = signal.iirdesign(
-        wp=fp_lp,         
-        ws=fs_lp,         
-        gpass=gpass_lp,   
-        gstop=gstop_lp,   
-        ftype="butter",
-        output="sos",
-        fs=fs
-    )
+def whole_bytes(on_message):
+    """
+    Returns a function that passes the whole bytes of a decoded message to
+    `on_message`, dropping an incomplete last byte (the zero padding of the
+    last symbol for 8-PSK).
+    """
+    def on_whole_bytes(br):
+        on_message(br[:br.shape[0] - br.shape[0] % 8])
 
-    yI_bb = signal.sosfilt(sos_lp, yI)
-    yQ_bb = signal.sosfilt(sos_lp, yQ)
+    return on_whole_bytes
 
 
-    #Phase alignment 
-    y_complex = yI_bb + 1j * yQ_bb
-    
-    # win_sec = 6.0
-    # win = int(win_sec * fs)
-    # y_complex = y_complex[:win]
-    
-    # mag = np.abs(y_complex)
-    # threshold = 0.1 * np.max(mag)          # threshold (20% of max)
-    # start = np.argmax(mag > threshold)     # first index above threshold
-    # y_complex = y_complex[start:]          # trim everything before start
+def packet_printer():
+    """
+    Returns a function that decodes the packets in a decoded burst and prints
+    them, as well as the number of dropped (corrupted) packets so far.
+    """
+    decoder = framing.PacketDecoder()
 
+    def on_message(br):
+        for packet in decoder.feed(br):
+            data_rx = packet.payload.decode('utf-8', 'replace')
+            print(f'Received packet {packet.seq}: {data_rx} ({len(packet.payload)} bytes).')
+        if decoder.flush():
+            print(f'[Rx] Dropped a corrupted packet ({decoder.dropped} so far).')
 
-    # Estimate average phase 
-    phi = 0.5 * np.angle(np.mean(y_complex**2))
-    y_aligned = y_complex * np.exp(-1j * phi)
+    return on_message
 
-    # Real-valued baseband waveform 
-    yb = np.real(y_aligned)
 
+def receive_file(path, sos_bp, sos_lp, fs, q=1, dtype=np.float64, sample_format='int16', on_message=print_message, M=2, threaded=False):
+    """
+    Reads the received signal from a WAV or raw file block by block and decodes
+    the messages in it. The file is memory-mapped, so its length is not
+    limited by the available memory. If `threaded` is True, the receiver
+    stages run in separate threads (see `staged.StagedPipeline`).
+    """
+    capture = fileio.open_capture(path, fs, sample_format)
+    if capture.fs != fs:
+        raise ValueError(f'\'{path}\' is sampled at {capture.fs} Hz, but {fs} Hz is required.')
 
-    print(f"[Rx] fs={fs} Hz, BPF sections={sos_bp.shape[0]}, LPF sections={sos_lp.shape[0]}")
+    rx = StreamingReceiver(sos_bp, sos_lp, fc, Tb, fs, decimation=q, dtype=dtype, M=M)
+    print(f'Reading {capture.nframes/fs:.1f} s from {path}.')
+    blocks = fileio.read_blocks(capture, blocksize, dtype=dtype)
+    if threaded:
+        pipeline = StagedPipeline(receiver_stages(rx))
+        for messages in pipeline.run(blocks):
+            for message in messages:
+                on_message(message.bits)
+        print(format_stats(pipeline.stats()))
+    else:
+        for x in blocks:
+            for br in rx.process(x):
+                on_message(br)
+    for br in rx.flush():
+        on_message(br)
 
-    # Symbol decoding
-    # TODO: Adjust fs (lab 2 only, leave untouched for lab 1 unless you know what you are doing)
-    br = wcs.decode_baseband_signal(y_complex, Tb, 1/dt)
-    data_rx = wcs.decode_string(br)
-    print(f'Received: {data_rx} (no of bits: {len(br)}).')
+
+def receive_segmented(path, config, segment=600.0, workers=None, sample_format='int16', on_message=print_message):
+    """
+    Decodes every transmission in a WAV or raw file, split into segments of
+    `segment` seconds that are decoded in parallel by `workers` processes (see
+    `segmented.decode_segmented()`).
+    """
+    capture = fileio.open_capture(path, config.fs, sample_format)
+    print(f'Reading {capture.nframes/config.fs:.1f} s from {path} in segments of {segment:g} s.')
+    for message in decode_segmented(capture, config, segment, workers=workers):
+        print(f'[Rx] Burst at {message.start*config.decimation/config.fs:.2f} s:')
+        on_message(message.bits)
+
+
+def receive_channels(blocks, channel_ids, fs, q=50, dtype=np.float64, M=2, on_message=print_message):
+    """
+    Splits the received signal (given block by block) into the baseband 
+    signals of the channels `channel_ids` in a single pass, decimated by `q`,
+    and decodes the (`M`-PSK) messages on each channel as they arrive (see
+    `streaming.StreamingDetector`).
+    """
+    check_decimation(q, Tb, fs)
+    channelizer = Channelizer(channel_ids, fs, q, dtype=dtype)
+    detectors = [StreamingDetector(Tb, fs, decimation=q, dtype=dtype, M=M) for _ in channel_ids]
+
+    def detect(yb, drain=False):
+        for channel_id, detector, y in zip(channel_ids, detectors, yb):
+            for message in detector.detect_messages(y) + (detector.drain() if drain else []):
+                print(f'[Rx] Channel {channel_id}:')
+                on_message(message.bits)
+
+    for x in blocks:
+        detect(channelizer.process(x))
+    detect(channelizer.flush(), drain=True)
+
+
+def receive_stream(sos_bp, sos_lp, T, fs, q=1, dtype=np.float64, output=None, sample_format='int16', on_message=print_message, M=2, threaded=False):
+    """
+    Records the signal block by block and decodes messages as soon as they have
+    been received. Runs for `T` seconds, or until interrupted if `T` is 0. If
+    `output` is given, the recording is also saved to that file. If `threaded`
+    is True, the receiver stages run in separate threads (see
+    `receive_staged()`).
+    """
+    import sounddevice as sd
+
+    rx = StreamingReceiver(sos_bp, sos_lp, fc, Tb, fs, decimation=q, dtype=dtype, M=M)
+    if threaded:
+        receive_staged(sd, rx, T, fs, output, sample_format, on_message)
+        return
+    blocks = queue.Queue()
+
+    def callback(indata, frames, time, status):
+        if status:
+            print(f'[Rx] {status}')
+        blocks.put(indata[:, 0].copy())
+
+    nblocks = int(np.ceil(T*fs/blocksize)) if T > 0 else None
+    print(f'Receiving for {T} s (streaming).' if T > 0 else 'Receiving (streaming), press Ctrl+C to stop.')
+    writer = fileio.CaptureWriter(output, fs, sample_format) if output is not None else None
+    try:
+        with sd.InputStream(samplerate=fs, blocksize=blocksize, channels=1, dtype='float32', callback=callback):
+            n = 0
+            while nblocks is None or n < nblocks:
+                x = blocks.get()
+                if writer is not None:
+                    writer.write(x)
+                for br in rx.process(x):
+                    on_message(br)
+                n += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if writer is not None:
+            writer.close()
+
+    # Decode the transmission in progress at the end
+    for br in rx.flush():
+        on_message(br)
+
+
+def receive_staged(sd, rx, T, fs, output=None, sample_format='int16', on_message=print_message):
+    """
+    Records the signal block by block and decodes it with the stages of the
+    streaming receiver `rx` running in separate threads. The audio callback
+    feeds the blocks directly into the bounded input queue of the first stage;
+    if the pipeline falls behind, blocks are dropped (and counted) instead of
+    blocking the audio stream. The saving of the recording (`output`) is a
+    stage of its own.
+    """
+    stages = receiver_stages(rx)
+    writer = fileio.CaptureWriter(output, fs, sample_format) if output is not None else None
+    if writer is not None:
+        def record(x):
+            writer.write(x)
+            return x
+        stages.insert(0, ('record', record))
+    pipeline = StagedPipeline(stages)
+    nblocks = int(np.ceil(T*fs/blocksize)) if T > 0 else None
+    nreceived = [0]
+
+    def callback(indata, frames, time, status):
+        if status:
+            print(f'[Rx] {status}')
+        if nblocks is not None and nreceived[0] >= nblocks:
+            return
+        pipeline.put(indata[:, 0].copy(), block=False)
+        nreceived[0] += 1
+        if nreceived[0] == nblocks:
+            pipeline.close(block=False)
+
+    print(f'Receiving for {T} s (streaming, staged).' if T > 0 else 'Receiving (streaming, staged), press Ctrl+C to stop.')
+    pipeline.start()
+    try:
+        with sd.InputStream(samplerate=fs, blocksize=blocksize, channels=1, dtype='float32', callback=callback):
+            for messages in pipeline.results():
+                for message in messages:
+                    on_message(message.bits)
+    except KeyboardInterrupt:
+        # The audio stream has stopped; finish the blocks in the queues
+        pipeline.close()
+        for messages in pipeline.results():
+            for message in messages:
+                on_message(message.bits)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    # Decode the transmission in progress at the end
+    for message in rx.drain():
+        on_message(message.bits)
+    print(format_stats(pipeline.stats()))
+    if pipeline.dropped > 0:
+        print(f'[Rx] Dropped {pipeline.dropped} blocks.')
+
+
+class EventWriter:
+    """
+    Writes the messages decoded by the streaming receiver as JSON-lines events
+    (one JSON object per line, flushed immediately), for example:
+
+        {"event": "message", "time": "2024-05-01T12:00:03.250+00:00",
+         "start": 3.25, "end": 6.3, "nbits": 96, "text": "Hello World!"}
+
+    `start` and `end` are the times of the message in the received signal in
+    seconds (counted from the first sample), `time` is the wall-clock time of
+    its start. In packet mode, there is one "packet" event per packet (with
+    `seq`, `nbytes`, and `text`) and a "dropped" event for every corrupted
+    packet; lost audio blocks are reported as "overrun" events.
+
+    Parameters
+    ----------
+    fs_bb : float
+        Baseband sampling frequency of the receiver (`StreamingReceiver.fs_bb`).
+    packets : bool, default: False
+        Whether the messages are sent in packets (see `framing`).
+    M : int, default: 2
+        Number of symbols of the phase-shift keying.
+    out : file, optional
+        Output stream (default: standard output).
+    t0 : float, optional
+        Wall-clock time (seconds since the epoch) of the first sample (default:
+        the time the writer is created).
+    """
+
+    def __init__(self, fs_bb, packets=False, M=2, out=None, t0=None):
+        self.fs_bb = fs_bb
+        self.decoder = framing.PacketDecoder() if packets else None
+        self.whole_bytes = 8 % wcs.bits_per_symbol(M) != 0
+        self.out = out
+        self.t0 = time.time() if t0 is None else t0
+
+    def write(self, event, **fields):
+        """
+        Writes an event.
+        """
+        print(json.dumps(dict(event=event, **fields)), file=self.out or sys.stdout, flush=True)
+
+    def message(self, message):
+        """
+        Writes the event(s) of a decoded message (`streaming.Message`).
+        """
+        start = message.start/self.fs_bb
+        span = dict(
+            time=datetime.fromtimestamp(self.t0 + start, timezone.utc).isoformat(timespec='milliseconds'),
+            start=round(start, 3),
+            end=round(message.end/self.fs_bb, 3)
+        )
+        if self.decoder is None:
+            br = message.bits
+            if self.whole_bytes:
+                br = br[:br.shape[0] - br.shape[0] % 8]
+            self.write('message', **span, nbits=int(br.shape[0]), text=wcs.decode_string(br))
+            return
+
+        for packet in self.decoder.feed(message.bits):
+            self.write('packet', **span, seq=packet.seq, nbytes=len(packet.payload), text=packet.payload.decode('utf-8', 'replace'))
+        if self.decoder.flush():
+            self.write('dropped', **span, dropped=self.decoder.dropped)
+
+    def overrun(self, nblocks):
+        """
+        Writes an event for `nblocks` lost blocks of audio.
+        """
+        self.write('overrun', time=datetime.now(timezone.utc).isoformat(timespec='milliseconds'), blocks=nblocks)
+
+
+def record_blocks(fs, maxsize=64, on_overrun=None):
+    """
+    Records the signal block by block, indefinitely. The recorded blocks are
+    passed on through a queue of at most `maxsize` blocks, so the memory is
+    bounded even if the processing falls behind; blocks that do not fit are
+    dropped and reported to `on_overrun(nblocks)`.
+    """
+    import sounddevice as sd
+
+    blocks = queue.Queue(maxsize)
+    overruns = [0]
+
+    def callback(indata, frames, time, status):
+        try:
+            blocks.put_nowait(indata[:, 0].copy())
+        except queue.Full:
+            overruns[0] += 1
+
+    with sd.InputStream(samplerate=fs, blocksize=blocksize, channels=1, dtype='float32', callback=callback):
+        while True:
+            x = blocks.get()
+            if overruns[0] > 0 and on_overrun is not None:
+                n, overruns[0] = overruns[0], 0
+                on_overrun(n)
+            yield x
+
+
+def receive_daemon(blocks, rx, on_message):
+    """
+    Decodes the messages in a continuous signal, given block by block (e.g.,
+    from `record_blocks()`, which never ends). Each decoded message is passed
+    to `on_message` (a `streaming.Message`) as soon as it has been received.
+
+    The streaming receiver carries its filter states, detector, and message
+    buffer from one block to the next, so a message that spans several blocks
+    is decoded exactly once, and its memory does not grow with time.
+    """
+    for x in blocks:
+        for message in rx.receive(x):
+            on_message(message)
+    for message in rx.drain():
+        on_message(message)
 
 
 if __name__ == "__main__":    
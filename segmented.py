@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel segmented decoding of long recordings for the wireless communication
+system project in Signals and transforms.
+
+A long capture with many transmissions is split into segments that are
+decoded independently in a pool of worker processes. Each worker reads its
+part of the (memory-mapped) file, runs the filter chain of `RxPipeline`, and
+finds and decodes the bursts with `burstsync`. To make the segments
+independent, each one is read with
+
+* a warm-up before its start, as long as the settling time of the filters, so
+  that the filter states have settled when the segment starts, and
+* an overlap after its end of one maximum message length (plus the settling
+  time), so that every message that starts within the segment also ends
+  within what has been read.
+
+A segment reports the bursts that start within it (with a small slack at the
+end for bursts that straddle the seam, see `decode_segment()`); a burst that
+is found by two neighbouring segments is reported once.
+
+Since the segments share nothing but the file, the decoding time scales with
+the number of worker processes, up to the number of CPUs.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+import burstsync
+import fileio
+from filtering import impulse_response
+from pipeline import PipelineConfig, RxPipeline
+from streaming import Message
+
+# Relative energy of the filter transients that is considered settled
+settling_tol = 1e-12
+
+# RxPipeline by configuration (one per worker process)
+_pipelines = {}
+
+
+class Segment(NamedTuple):
+    """
+    A segment of a recording (sample indices at the sampling frequency of the
+    recording).
+
+    start : int
+        First sample of the segment.
+    stop : int
+        One past the last sample of the segment.
+    begin : int
+        First sample read, including the warm-up of the filters.
+    end : int
+        One past the last sample read, including the overlap with the next
+        segment.
+    """
+    start: int
+    stop: int
+    begin: int
+    end: int
+
+
+def settling_samples(config: PipelineConfig, tol: float=settling_tol) -> int:
+    """
+    Returns the settling time of the filter chain of `RxPipeline` in samples:
+    The effective lengths of the impulse responses of the bandpass and
+    lowpass filters (see `filtering.impulse_response()`), plus the half-length
+    of the anti-aliasing filter of the decimation.
+    """
+    pipeline = _pipeline(config)
+    n = 0
+    for sos in [pipeline.sos_bp, pipeline.sos_lp]:
+        h = impulse_response(sos, tol)
+        if h is None:
+            raise ValueError('the impulse response of the filter does not decay.')
+        n += h.shape[0]
+    if config.decimation > 1:
+        n += 10*config.decimation
+    return n
+
+
+def plan_segments(nframes: int, length: int, warmup: int, overlap: int, q: int=1) -> list:
+    """
+    Splits a recording of `nframes` samples into segments of `length` samples,
+    each read with `warmup` samples before and `overlap` samples after it
+    (clipped to the recording). All boundaries are multiples of the
+    decimation factor `q`, so the decimated segments line up with the
+    decimated recording.
+
+    Returns
+    -------
+    segments : list of Segment
+        The segments, in order of time.
+    """
+    length = max(q, length - length % q)
+    warmup = -(-warmup//q)*q
+    segments = []
+    for start in range(0, nframes, length):
+        stop = min(start + length, nframes)
+        segments.append(Segment(start, stop, max(start - warmup, 0), min(stop + overlap, nframes)))
+    return segments
+
+
+def decode_segment(capture: fileio.Capture, segment: Segment, config: PipelineConfig) -> list:
+    """
+    Decodes the bursts in one segment of a recording.
+
+    The segment is read including its warm-up and overlap and demodulated.
+    Bursts are reported if they start within the segment, or at most one pulse
+    width after its end: the start of a burst at the seam may be estimated a
+    few samples apart by the two segments, and the slack makes sure that it
+    is found by at least one of them (`merge()` removes the duplicates).
+
+    Parameters
+    ----------
+    capture : fileio.Capture
+        The recording.
+    segment : Segment
+        The segment (see `plan_segments()`).
+    config : PipelineConfig
+        Configuration of the receiver.
+
+    Returns
+    -------
+    messages : list of Message
+        The decoded messages, with their position in the whole recording at
+        the baseband sampling frequency.
+    """
+    pipeline = _pipeline(config)
+    q = config.decimation
+    x = fileio.read_frames(capture, segment.begin, segment.end, dtype=pipeline.dtype)
+    yb = pipeline.baseband(x)
+
+    # Bounds of the segment in the decimated signal
+    Kb = int(np.floor(config.Tb*pipeline.fs_bb))
+    offset = segment.begin//q
+    start = segment.start//q - offset
+    stop = -(-segment.stop//q) - offset + Kb
+
+    messages = []
+    for burst in burstsync.find_bursts(yb, config.Tb, pipeline.fs_bb):
+        if start <= burst.start < stop:
+            b = burstsync.decode_burst(yb, burst, config.Tb, pipeline.fs_bb, M=config.M)
+            messages.append(Message(b, offset + burst.start, offset + burst.start + burst.nsymbols*Kb))
+    return messages
+
+
+def merge(messages: list) -> list:
+    """
+    Merges the messages of several segments: sorts them by time and drops
+    every message that overlaps an earlier one (the same burst found by two
+    segments).
+    """
+    merged = []
+    for message in sorted(messages, key=lambda m: m.start):
+        if merged and message.start < merged[-1].end:
+            continue
+        merged.append(message)
+    return merged
+
+
+def decode_segmented(capture: fileio.Capture, config: PipelineConfig=None, segment: float=600.0, max_duration: float=60.0, workers: int=None) -> list:
+    """
+    Decodes all transmissions in a recording, segment by segment in parallel.
+
+    Parameters
+    ----------
+    capture : fileio.Capture
+        The recording (see `fileio.open_capture()`).
+    config : PipelineConfig, optional
+        Configuration of the receiver (default: `PipelineConfig()`).
+    segment : float, default: 600.0
+        Length of the segments in seconds.
+    max_duration : float, default: 60.0
+        Maximum duration of a transmission in seconds. Longer transmissions
+        that cross the end of a segment are truncated.
+    workers : int, optional
+        Number of worker processes (default: number of CPUs). With 1 worker,
+        the segments are decoded in the calling process.
+
+    Returns
+    -------
+    messages : list of Message
+        The decoded messages in order of time, with their position in the
+        recording at the baseband sampling frequency `config.fs/decimation`.
+    """
+    if config is None:
+        config = PipelineConfig()
+    if capture.fs is not None and capture.fs != config.fs:
+        raise ValueError(f'\'{capture.path}\' is sampled at {capture.fs} Hz, but {config.fs} Hz is required.')
+
+    warmup = settling_samples(config)
+    overlap = warmup + int(np.ceil(max_duration*config.fs)) + 2*config.Kb
+    segments = plan_segments(capture.nframes, int(segment*config.fs), warmup, overlap, config.decimation)
+
+    if workers == 1 or len(segments) == 1:
+        results = [decode_segment(capture, s, config) for s in segments]
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(decode_segment, [capture]*len(segments), segments, [config]*len(segments)))
+    return merge([message for messages in results for message in messages])
+
+
+def _pipeline(config):
+    if config not in _pipelines:
+        _pipelines[config] = RxPipeline(config)
+    return _pipelines[config]
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Thread-pipelined processing stages for the wireless communication system
+project in Signals and transforms.
+
+The stages of the streaming receiver (bandpass filter, IQ mixing, lowpass
+filter, decimation, detection and decoding) process one block after the
+other. Most of the work is done by numpy and scipy (`sosfilt()`, FFTs, array
+arithmetic), which release the GIL, so the stages can run concurrently on
+several cores: `StagedPipeline` runs each stage in its own worker thread,
+connected by bounded queues. Stage i works on block n while stage i+1 works on
+block n-1; every stage still sees the blocks in order, so a stage may carry
+its state from one block to the next, and the output is the same as running
+the stages in sequence. The bounded queues keep the memory constant; a full
+input queue means that the pipeline cannot keep up with real time.
+
+The throughput is limited by the slowest stage. `StagedPipeline.stats()`
+reports the utilization and the queue depth of every stage to find it.
+"""
+
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+# Marks the end of the stream in the queues
+_END = object()
+
+
+class StageStats(NamedTuple):
+    """
+    Statistics of a pipeline stage.
+
+    name : str
+        Name of the stage.
+    blocks : int
+        Number of blocks processed.
+    samples : int
+        Number of samples processed (the length of the input blocks).
+    busy : float
+        Time spent processing blocks in seconds.
+    utilization : float
+        Fraction of the time since the pipeline was started that the stage
+        was busy. A stage close to 1 is the bottleneck.
+    depth : int
+        Current number of blocks waiting in the input queue of the stage.
+    max_depth : int
+        Largest number of blocks that were waiting in the input queue.
+    """
+    name: str
+    blocks: int
+    samples: int
+    busy: float
+    utilization: float
+    depth: int
+    max_depth: int
+
+
+class StagedPipeline:
+    """
+    Pipeline of processing stages, each running in its own thread and
+    connected by bounded queues.
+
+    Blocks are fed with `put()` (e.g., from an audio callback) and the outputs
+    of the last stage, one per block, are read with `results()`; or `run()`
+    feeds the blocks from an iterable (e.g., a file reader) in a separate
+    thread. If a stage raises an exception, the pipeline stops and the
+    exception is raised again by `results()`.
+
+    Parameters
+    ----------
+    stages : list of (str, callable)
+        The names and functions of the stages. Each function is called with
+        the output of the previous stage, one block at a time.
+    maxsize : int, default: 8
+        Maximum number of blocks waiting in front of each stage.
+    """
+
+    def __init__(self, stages: list, maxsize: int=8):
+        self.names = [name for name, _ in stages]
+        self.functions = [f for _, f in stages]
+        self.queues = [queue.Queue(maxsize) for _ in range(len(stages) + 1)]
+        self.threads = []
+        self.dropped = 0
+        self.closed = False
+        self.error = None
+        self.t0 = None
+        self._blocks = [0]*len(stages)
+        self._samples = [0]*len(stages)
+        self._busy = [0.0]*len(stages)
+        self._max_depth = [0]*len(stages)
+
+    def start(self):
+        """
+        Starts the worker threads.
+        """
+        self.t0 = time.perf_counter()
+        for i in range(len(self.functions)):
+            thread = threading.Thread(target=self._work, args=(i,), name=f'stage-{self.names[i]}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, x: np.array, block: bool=True) -> bool:
+        """
+        Feeds a block to the first stage. If the input queue is full, waits
+        for a free slot, or, if `block` is False (as in an audio callback),
+        drops the block.
+
+        Returns
+        -------
+        ok : bool
+            False if the block was dropped.
+        """
+        try:
+            self.queues[0].put(x, block)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def close(self, block: bool=True):
+        """
+        Marks the end of the input; the stages finish the blocks in the
+        queues and stop. If the input queue is full and `block` is False (as
+        in an audio callback), returns at once and the end is marked by a
+        helper thread as soon as there is a free slot.
+        """
+        if not self.closed:
+            self.closed = True
+            try:
+                self.queues[0].put(_END, block)
+            except queue.Full:
+                threading.Thread(target=self.queues[0].put, args=(_END,), name='stage-close', daemon=True).start()
+
+    def results(self):
+        """
+        Yields the output of the last stage for every block, in order, until
+        the pipeline is closed.
+        """
+        while True:
+            y = self.queues[-1].get()
+            if y is _END:
+                break
+            yield y
+        for thread in self.threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self, blocks):
+        """
+        Starts the pipeline, feeds the blocks from the iterable `blocks` in a
+        separate thread, and yields the outputs of the last stage.
+        """
+        def feed():
+            try:
+                for x in blocks:
+                    if self.error is not None:
+                        break
+                    self.put(x)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.close()
+
+        self.start()
+        feeder = threading.Thread(target=feed, name='stage-feed', daemon=True)
+        feeder.start()
+        yield from self.results()
+        feeder.join()
+
+    def stats(self) -> list:
+        """
+        Returns the statistics of the stages (see `StageStats`).
+        """
+        elapsed = time.perf_counter() - self.t0 if self.t0 is not None else 0.0
+        return [
+            StageStats(
+                name, self._blocks[i], self._samples[i], self._busy[i],
+                self._busy[i]/elapsed if elapsed > 0 else 0.0,
+                self.queues[i].qsize(), self._max_depth[i]
+            )
+            for i, name in enumerate(self.names)
+        ]
+
+    def _work(self, i):
+        q_in, q_out = self.queues[i], self.queues[i+1]
+        f = self.functions[i]
+        while True:
+            self._max_depth[i] = max(self._max_depth[i], q_in.qsize())
+            x = q_in.get()
+            if x is _END:
+                q_out.put(_END)
+                return
+            if self.error is not None:
+                continue
+            t = time.perf_counter()
+            try:
+                y = f(x)
+            except Exception as e:
+                self.error = e
+                continue
+            self._busy[i] += time.perf_counter() - t
+            self._blocks[i] += 1
+            self._samples[i] += np.shape(x)[-1] if np.ndim(x) > 0 else 0
+            q_out.put(y)
+
+
+def receiver_stages(rx) -> list:
+    """
+    Returns the stages of the streaming receiver `rx`
+    (`streaming.StreamingReceiver`) for a `StagedPipeline`. The last stage
+    returns the messages decoded in each block (see
+    `StreamingReceiver.receive()`); the message in progress at the end of the
+    signal is returned by `rx.drain()` once the pipeline has finished.
+    """
+    return [
+        ('bandpass', rx.bandpass),
+        ('mix', rx.mix),
+        ('lowpass', rx.lowpass),
+        ('decimate', rx.decimate),
+        ('detect', rx.detect_messages),
+    ]
+
+
+def format_stats(stats: list) -> str:
+    """
+    Formats the statistics of the stages (see `StagedPipeline.stats()`) as a
+    table.
+    """
+    lines = [f"{'stage':>10} {'blocks':>8} {'busy [s]':>9} {'util':>6} {'depth':>6} {'max':>4}"]
+    for s in stats:
+        lines.append(f"{s.name:>10} {s.blocks:>8} {s.busy:>9.3f} {100*s.utilization:>5.1f}% {s.depth:>6} {s.max_depth:>4}")
+    return '\n'.join(lines)
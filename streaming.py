@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Block-based (streaming) receiver and transmitter for the wireless communication
+system project in Signals and transforms.
+
+The receiver and transmitter process the signal in fixed-size blocks instead of
+one long recording or message. All filters carry their state (`zi`) from one
+block to the next, so the concatenated output is identical to filtering the
+whole signal at once, while memory stays constant no matter how long the
+signal is.
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import wcslib as wcs
+import profiling
+from detection import chi2_threshold
+from filtering import make_filter
+from kernels import moving_sum
+from multirate import Decimator, check_decimation
+from nco import NCO
+
+
+class Message(NamedTuple):
+    """
+    A message decoded by the streaming receiver.
+
+    bits : numpy.array
+        Binary array of the message.
+    start : int
+        Index of the first baseband sample of the message (including the
+        samples kept before the onset), counted from the start of the
+        reception at the baseband sampling frequency.
+    end : int
+        Index one past the last baseband sample of the message.
+    """
+    bits: np.array
+    start: int
+    end: int
+
+
+class StreamingDetector:
+    """
+    Streaming signal detection and decoding of a complex baseband signal, one
+    block at a time (the last stages of `StreamingReceiver`, which can also
+    be fed by another front end such as `channelizer.Channelizer`).
+
+    Messages are detected using the energy of the baseband signal over a
+    sliding window of one symbol (`Tb`), compared to a threshold relative to a
+    running estimate of the noise floor. The baseband signal of a detected
+    transmission is buffered (together with some noise before and after it)
+    and decoded with `wcslib.decode_baseband_signal()` as soon as the energy
+    drops below the threshold again, that is, as soon as the last symbol has
+    arrived.
+
+    The noise floor is calibrated as the mean power of the baseband signal
+    over a window of two symbols: The first window that is not digital
+    silence is used, unless the reception turns out to have started within a
+    transmission (e.g., a file written by the transmitter), that is, a later
+    window is quieter by more than the detection threshold. Then the quiet
+    window is the noise floor, and the signal since the start of the
+    reception, which is kept until the calibration is confirmed by a
+    detection or after `max_duration`, is decoded. A reception that ends
+    before that is decoded if it starts with the synchronization sequence.
+
+    Parameters
+    ----------
+    Tb : float
+        Symbol width in seconds.
+    fs : float
+        Sampling frequency in Hz (before decimation).
+    max_duration : float, default: 60.0
+        Maximum duration of a transmission in seconds. Determines the size of
+        the (preallocated) message buffer.
+    margin : float, default: 6.0
+        Detection margin in dB on top of the 99 % chi-squared threshold.
+    decimation : int, default: 1
+        Decimation factor of the baseband signal. Detection and decoding run
+        at the sampling frequency `fs/decimation`.
+    dtype : numpy.dtype, default: numpy.float64
+        Precision of the signals (numpy.float32 or numpy.float64). The energy
+        sums are kept in double precision.
+    M : int, default: 2
+        Number of symbols of the phase-shift keying (2 for BPSK, 4 for QPSK,
+        see `wcslib.encode_baseband_signal()`).
+    """
+
+    def __init__(self, Tb: float, fs: float, max_duration: float=60.0, margin: float=6.0, decimation: int=1, dtype: np.dtype=np.float64, M: int=2):
+        check_decimation(decimation, Tb, fs)
+        wcs.bits_per_symbol(M)
+        self.M = M
+        self.Tb = Tb
+        self.dtype = np.dtype(dtype)
+        self.complex_dtype = np.result_type(self.dtype, np.complex64)
+
+        # Baseband sampling frequency and pulse width after decimation
+        self.decimation = decimation
+        self.fs_bb = fs/decimation
+        self.Kb = int(np.floor(Tb*self.fs_bb))
+
+        # Detector: Threshold on the energy over Kb samples, relative to the
+        # noise power (the energy of Kb complex Gaussian samples normalized by
+        # the variance of each component is chi-squared with 2*Kb degrees of
+        # freedom). The threshold is calculated for the Kb*decimation samples 
+        # at the original sampling frequency.
+        self.threshold = chi2_threshold(2*self.Kb*decimation)/(2*decimation)*10**(margin/10)
+        self.noise_power = None
+        self.alpha = 0.05
+        self.tail = np.zeros(self.Kb)
+
+        # Number of samples to keep before and after a detected transmission
+        # such that the decoder sees the signal onset and offset
+        self.npre = 2*self.Kb
+        self.npost = 2*self.Kb
+
+        # Buffers: History of the most recent baseband samples (pre-roll) and
+        # preallocated buffer for the current transmission
+        self.history = np.zeros(0, dtype=self.complex_dtype)
+        self.buffer = np.zeros(int(max_duration*self.fs_bb) + self.npre + self.npost, dtype=self.complex_dtype)
+        self.nbuffer = 0
+        self.active = False
+        self.nquiet = 0
+
+        # Calibration of the noise floor: Length of the windows, power of the
+        # first window, sum and number of samples of the current window; the
+        # signal since the start of the reception is kept in the message
+        # buffer while calibrating
+        self.ncal = 2*self.Kb
+        self.calibrating = True
+        self.p0 = None
+        self.cal_sum = 0.0
+        self.cal_count = 0
+
+        # Number of baseband samples received before the current block, and
+        # index of the first sample in the message buffer
+        self.nsamples = 0
+        self.start = 0
+
+    def detect(self, yb: np.array) -> list:
+        """
+        Runs the signal detection on a block of the baseband signal and decodes
+        all transmissions that end within the block.
+
+        Parameters
+        ----------
+        yb : numpy.array
+            Block of the complex-valued baseband signal.
+
+        Returns
+        -------
+        messages : list of numpy.array
+            Binary arrays of the messages decoded in this block.
+        """
+        return [message.bits for message in self.detect_messages(yb)]
+
+    def detect_messages(self, yb: np.array) -> list:
+        """
+        Same as `detect()`, but returns the decoded messages together with
+        their position in the baseband signal.
+
+        Returns
+        -------
+        messages : list of Message
+            The messages decoded in this block.
+        """
+
+        # Energy over a sliding window of Kb samples, continued from the
+        # previous block
+        watch = profiling.stopwatch(yb.shape[0])
+        x2 = np.concatenate((self.tail, np.abs(yb).astype(np.float64)**2))
+        c = np.cumsum(x2)
+        e = c[self.Kb:] - c[:-self.Kb]
+        self.tail = x2[-self.Kb:]
+
+        messages = []
+        skip = 0
+        if self.calibrating:
+            messages, skip = self._calibrate(yb, x2[self.Kb:])
+        if self.noise_power is None:
+            d = np.zeros(e.shape[0], dtype=bool)
+        else:
+            d = e > self.threshold*self.noise_power
+            d[:skip] = False
+        if self.calibrating and (np.any(d) or self.nbuffer == self.buffer.shape[0]):
+            # Calibration confirmed
+            self.calibrating = False
+            self.nbuffer = 0
+        watch.stop('energy')
+
+        start = 0
+        N = yb.shape[0]
+        while start < N:
+            if not self.active:
+                # Look for the onset of a transmission
+                k = np.argmax(d[start:]) + start
+                if not d[k]:
+                    # Radio silence: update the noise floor and the history
+                    self._update_noise(e[start:])
+                    self._update_history(yb[start:])
+                    break
+
+                self._update_history(yb[start:k])
+                self.start = self.nsamples + k - self.history.shape[0]
+                self.nbuffer = 0
+                self._append(self.history)
+                self.active = True
+                self.nquiet = 0
+                start = k
+            else:
+                # Look for the end of the transmission
+                k = np.argmin(d[start:]) + start
+                if k > start:
+                    self.nquiet = 0
+                if d[k]:
+                    self._append(yb[start:])
+                    if self.nbuffer == self.buffer.shape[0]:
+                        messages.append(self._finish())
+                    break
+
+                # Count quiet samples after the end of the transmission
+                n = min(N - k, self.npost - self.nquiet)
+                quiet = ~d[k:k+n]
+                if np.all(quiet):
+                    self._append(yb[start:k+n])
+                    self.nquiet += n
+                    start = k + n
+                    if self.nquiet >= self.npost:
+                        messages.append(self._finish())
+                else:
+                    # Energy rises again before the end; keep collecting
+                    k2 = k + np.argmin(quiet)
+                    self._append(yb[start:k2])
+                    self.nquiet = 0
+                    start = k2
+
+        self.nsamples += N
+        return messages
+
+    def flush(self) -> list:
+        """
+        Decodes the transmission in progress, if any, for example at the end of
+        a recording.
+
+        Returns
+        -------
+        messages : list of numpy.array
+            Binary array of the message, if there was a transmission in 
+            progress.
+        """
+        return [message.bits for message in self.drain()]
+
+    def drain(self) -> list:
+        """
+        Same as `flush()`, but returns the message together with its position
+        in the baseband signal (see `Message`).
+        """
+        if self.calibrating:
+            # The reception ended before the calibration was confirmed
+            y = self.buffer[:self.nbuffer]
+            messages = [self._decode(0, self.nbuffer)] if self._starts_with_sync(y) else []
+            self.calibrating = False
+            self.nbuffer = 0
+            return messages
+        if self.active and self.nbuffer > 0:
+            return [self._finish()]
+        return []
+
+    def _append(self, x: np.array):
+        n = min(x.shape[0], self.buffer.shape[0] - self.nbuffer)
+        self.buffer[self.nbuffer:self.nbuffer+n] = x[:n]
+        self.nbuffer += n
+
+    def _finish(self) -> Message:
+        self.active = False
+        self.nquiet = 0
+        self.history = np.zeros(0, dtype=self.complex_dtype)
+        return self._decode(self.start, self.nbuffer)
+
+    def _decode(self, start: int, n: int) -> Message:
+        b = wcs.decode_baseband_signal(self.buffer[:n].copy(), self.Tb, self.fs_bb, self.decimation, self.M)
+        return Message(b, start, start + n)
+
+    def _calibrate(self, yb: np.array, x2: np.array) -> tuple:
+        # Keep the signal, and compare the power of every calibration window
+        # completed in this block to the first window (digital silence, e.g.,
+        # before the first transmission in a file, has no noise to calibrate
+        # to)
+        base = self.nbuffer
+        self._append(yb)
+        k = 0
+        while k < x2.shape[0]:
+            n = min(self.ncal - self.cal_count, x2.shape[0] - k)
+            self.cal_sum += np.sum(x2[k:k+n])
+            self.cal_count += n
+            k += n
+            if self.cal_count < self.ncal:
+                break
+            p = self.cal_sum/self.ncal
+            self.cal_sum = 0.0
+            self.cal_count = 0
+            if p == 0:
+                continue
+            if self.p0 is None:
+                self.p0 = self.noise_power = p
+            elif p*self.threshold < self.p0*self.Kb:
+                # The first window was a transmission: Decode the signal up to
+                # the end of the quiet window (in this block), which is the
+                # noise floor (at least the round-off error of the energies)
+                message = self._decode(0, min(base + k, self.nbuffer))
+                self.noise_power = max(p, np.finfo(self.dtype).eps*self.p0)
+                self.calibrating = False
+                self.nbuffer = 0
+                return [message], k
+        return [], 0
+
+    def _starts_with_sync(self, y: np.array) -> bool:
+        # Normalized correlation of the symbol averages with the
+        # synchronization sequence [1, -1] at the first non-silent samples:
+        # close to 1 for a transmission, to 0 for noise
+        k0 = np.argmax(np.abs(y) > 0)
+        y = y[k0:k0+3*self.Kb]
+        if y.shape[0] < 3*self.Kb:
+            return False
+        ys = moving_sum(y, self.Kb)[self.Kb-1:]
+        p = moving_sum(np.abs(y)**2, 2*self.Kb)[2*self.Kb-1:]
+        c = np.abs(ys[:self.Kb+1] - ys[self.Kb:])**2/(2*self.Kb)
+        return np.max(c/np.maximum(p, np.finfo(float).tiny)) > 0.5
+
+    def _update_history(self, x: np.array):
+        self.history = np.concatenate((self.history, x))[-self.npre:]
+
+    def _update_noise(self, e: np.array):
+        if e.shape[0] > 0 and self.noise_power is not None:
+            self.noise_power = (1-self.alpha)*self.noise_power + self.alpha*np.mean(e)/self.Kb
+
+
+class StreamingReceiver(StreamingDetector):
+    """
+    Streaming receiver: bandpass filter, IQ demodulation, lowpass filter,
+    signal detection and decoding, one block at a time.
+
+    The detection and decoding are those of `StreamingDetector`.
+
+    Parameters
+    ----------
+    sos_bp : numpy.array
+        Second-order sections of the channel bandpass filter.
+    sos_lp : numpy.array
+        Second-order sections of the baseband lowpass filter.
+    fc : float
+        Carrier frequency in Hz.
+    Tb : float
+        Symbol width in seconds.
+    fs : float
+        Sampling frequency in Hz.
+    max_duration : float, default: 60.0
+        Maximum duration of a transmission in seconds. Determines the size of
+        the (preallocated) message buffer.
+    margin : float, default: 6.0
+        Detection margin in dB on top of the 99 % chi-squared threshold.
+    decimation : int, default: 1
+        Decimation factor of the baseband signal. Detection and decoding run
+        at the sampling frequency `fs/decimation`.
+    dtype : numpy.dtype, default: numpy.float64
+        Precision of the signals (numpy.float32 or numpy.float64). The filter
+        states and the energy sums are kept in double precision.
+    blocksize : int, default: 2048
+        Typical number of samples per block, used to select the filtering
+        backend (see `filtering.make_filter()`).
+    backend : str, optional
+        Force the filtering backend, 'sos' or 'ols' (default: automatic).
+    M : int, default: 2
+        Number of symbols of the phase-shift keying (2 for BPSK, 4 for QPSK,
+        see `wcslib.encode_baseband_signal()`).
+    """
+
+    def __init__(self, sos_bp: np.array, sos_lp: np.array, fc: float, Tb: float, fs: float, max_duration: float=60.0, margin: float=6.0, decimation: int=1, dtype: np.dtype=np.float64, blocksize: int=2048, backend: str=None, M: int=2):
+        super().__init__(Tb, fs, max_duration, margin, decimation, dtype, M)
+        self.sos_bp = sos_bp
+        self.sos_lp = sos_lp
+        self.fc = fc
+        self.fs = fs
+        self.decimator = Decimator(decimation, dtype=self.dtype)
+
+        # Filters (carry their states between blocks)
+        self.filter_bp = make_filter(sos_bp, blocksize, backend)
+        self.filter_lp = make_filter(sos_lp, blocksize, backend)
+
+        # Oscillator (keeps track of the carrier phase between blocks)
+        self.nco = NCO(fc, fs, self.dtype)
+
+    def bandpass(self, x: np.array) -> np.array:
+        """
+        Bandpass filters a block of the received signal.
+        """
+        with profiling.stage('bandpass', x.shape[0]):
+            y = self.filter_bp.process(x)
+            return y.astype(self.dtype, copy=False)
+
+    def mix(self, x: np.array) -> np.array:
+        """
+        IQ demodulates a block of the bandpass-filtered signal. Returns the
+        complex-valued signal `yI + 1j*yQ`.
+        """
+        with profiling.stage('mix', x.shape[0]):
+            return self.nco.mix(x)
+
+    def lowpass(self, x: np.array) -> np.array:
+        """
+        Lowpass filters a block of the (complex-valued) IQ-demodulated signal.
+        Filtering the complex signal filters the I and Q components
+        independently.
+        """
+        with profiling.stage('lowpass', x.shape[0]):
+            y = self.filter_lp.process(x)
+            return y.astype(self.complex_dtype, copy=False)
+
+    def decimate(self, x: np.array) -> np.array:
+        """
+        Decimates a block of the baseband signal.
+        """
+        with profiling.stage('decimate', x.shape[0]):
+            return self.decimator.process(x)
+
+    def process(self, x: np.array) -> list:
+        """
+        Processes a block of the received signal.
+
+        Parameters
+        ----------
+        x : numpy.array
+            Block of the received signal.
+
+        Returns
+        -------
+        messages : list of numpy.array
+            Binary arrays of the messages decoded in this block.
+        """
+        y = self.bandpass(x)
+        y = self.mix(y)
+        y = self.lowpass(y)
+        y = self.decimate(y)
+        return self.detect(y)
+
+    def receive(self, x: np.array) -> list:
+        """
+        Same as `process()`, but returns the decoded messages together with
+        their position in the baseband signal (see `Message`).
+        """
+        y = self.bandpass(x)
+        y = self.mix(y)
+        y = self.lowpass(y)
+        y = self.decimate(y)
+        return self.detect_messages(y)
+
+
+class StreamingTransmitter:
+    """
+    Streaming transmitter: baseband encoding, modulation and bandpass
+    filtering, one block at a time.
+
+    The generated signal is identical to encoding the whole message with
+    `wcslib.encode_baseband_signal()`, modulating it and filtering it at once,
+    but only one block of the signal is held in memory at any time.
+
+    Parameters
+    ----------
+    sos_bp : numpy.array
+        Second-order sections of the channel bandpass filter.
+    fc : float
+        Carrier frequency in Hz.
+    Ac : float
+        Carrier amplitude.
+    Tb : float
+        Symbol width in seconds.
+    fs : float
+        Sampling frequency in Hz.
+    dtype : numpy.dtype, default: numpy.float64
+        Precision of the generated signal (numpy.float32 or numpy.float64).
+    backend : str, optional
+        Force the filtering backend, 'sos' or 'ols' (default: automatic, see 
+        `filtering.make_filter()`).
+    M : int, default: 2
+        Number of symbols of the phase-shift keying (2 for BPSK, 4 for QPSK,
+        see `wcslib.encode_baseband_signal()`). The in-phase part of the 
+        symbols modulates the sine carrier, the quadrature part the (negative)
+        cosine carrier, such that the receiver's IQ demodulation recovers the
+        symbols (up to a common phase).
+    """
+
+    def __init__(self, sos_bp: np.array, fc: float, Ac: float, Tb: float, fs: float, dtype: np.dtype=np.float64, backend: str=None, M: int=2):
+        wcs.bits_per_symbol(M)
+        self.M = M
+        self.sos_bp = sos_bp
+        self.fc = fc
+        self.Ac = Ac
+        self.fs = fs
+        self.Kb = int(np.floor(Tb*fs))
+        self.dtype = np.dtype(dtype)
+        self.backend = backend
+
+    def blocks(self, b: np.array, blocksize: int=2048):
+        """
+        Generates the transmit signal for the binary sequence `b` block by
+        block.
+
+        Parameters
+        ----------
+        b : numpy.array
+            A binary array of 1s and 0s encoding a message.
+        blocksize : int, default: 2048
+            Number of samples per block. The last block may be shorter.
+
+        Yields
+        ------
+        xt : numpy.array
+            Block of the transmit signal.
+        """
+        return self.bursts([b], blocksize)
+
+    def bursts(self, bs: list, blocksize: int=2048, gap: float=0.0):
+        """
+        Generates the transmit signal for several binary sequences (e.g., 
+        packets) block by block. Each sequence is sent as a separate burst with
+        its own synchronization sequence, and the bursts are separated by (at 
+        least) `gap` seconds of silence.
+
+        Parameters
+        ----------
+        bs : list of numpy.array
+            Binary arrays of 1s and 0s.
+        blocksize : int, default: 2048
+            Number of samples per block. The last block may be shorter.
+        gap : float, default: 0.0
+            Silence between the bursts in seconds (rounded up to whole 
+            symbols).
+
+        Yields
+        ------
+        xt : numpy.array
+            Block of the transmit signal.
+        """
+
+        # Prepend synchronization sequence (as in encode_baseband_signal())
+        # and encode bit values; silence is encoded as symbol 0
+        ngap = int(np.ceil(np.round(gap*self.fs)/self.Kb))
+        symbols = []
+        for i, b in enumerate(bs):
+            if i > 0:
+                symbols.append(np.zeros(ngap, dtype=np.int8))
+            if self.M == 2:
+                symbols.append(2*np.concatenate(([1, 0], b)).astype(np.int8) - 1)
+            else:
+                symbols.append(np.concatenate(([1, -1], wcs.encode_symbols(b, self.M))))
+        s = np.concatenate(symbols)
+        if self.M != 2:
+            s = s.astype(np.result_type(self.dtype, np.complex64))
+
+        filt = make_filter(self.sos_bp, blocksize, self.backend)
+        nco = NCO(self.fc, self.fs, self.dtype)
+        N = s.shape[0]*self.Kb
+        for n in range(0, N, blocksize):
+            # Baseband: Each bit is held for Kb samples
+            k = np.arange(n, min(n + blocksize, N))
+            xb = s[k//self.Kb]
+
+            # Modulate, Ac*Im(conj(xb)*exp(1j*2*pi*fc*n/fs)) for M-PSK, and
+            # filter
+            if self.M == 2:
+                xm = xb*self.dtype.type(self.Ac)*nco.sin(k.shape[0])
+            else:
+                xm = self.dtype.type(self.Ac)*np.imag(np.conj(xb)*nco.phasor(k.shape[0]))
+            xt = filt.process(xm)
+            yield xt.astype(self.dtype, copy=False)
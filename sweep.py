@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel bit error rate sweep over SNR, channel, and symbol width for the
+wireless communication system project in Signals and transforms.
+
+Every point of the grid SNR x channel_id x Tb is simulated with
+`montecarlo.run_trials()` in a pool of worker processes. Each grid point gets
+its own random number generator, spawned from one `numpy.random.SeedSequence`,
+so the results are reproducible regardless of the number of workers and the
+order in which the points finish. Results are appended to a CSV file as soon as
+they are available; running the same sweep again skips the points that are
+already in the file, so an interrupted sweep can be resumed.
+
+Example:
+$ python3 sweep.py --snr 0 5 10 15 20 --channel 8 --tb 0.05 -n 1000 -o ber.csv
+"""
+
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import wcslib as wcs
+import montecarlo as mc
+from filters import channel_band, design_bandpass, design_lowpass
+from parameters import Ac
+
+# Columns of the result table
+FIELDS = ['SNR', 'channel_id', 'Tb', 'ntrials', 'nbits', 'errors', 'nsync', 'ber']
+
+
+def run_point(SNR: float, channel_id: int, Tb: float, b: np.array, ntrials: int, seed: np.random.SeedSequence, Ac: float=Ac) -> dict:
+    """
+    Simulates one point of the sweep.
+
+    Parameters
+    ----------
+    SNR : float
+        The signal-to-noise ratio at the transmitter (in dBm).
+    channel_id : int
+        The id of the communication channel.
+    Tb : float
+        Symbol width in seconds.
+    b : numpy.array
+        A binary array of 1s and 0s encoding the message.
+    ntrials : int
+        Number of trials.
+    seed : numpy.random.SeedSequence
+        Seed of the random number generator for this point.
+    Ac : float
+        Carrier amplitude (default: `parameters.Ac`).
+
+    Returns
+    -------
+    row : dict
+        Row of the result table.
+    """
+    fc, wp, ws = channel_band(channel_id)
+    result = mc.run_trials(
+        b, ntrials, channel_id, SNR, Tb=Tb, fc=fc, Ac=Ac,
+        sos_bp=design_bandpass(wp, ws), sos_lp=design_lowpass(),
+        rng=np.random.default_rng(seed)
+    )
+    return {
+        'SNR': SNR,
+        'channel_id': channel_id,
+        'Tb': Tb,
+        'ntrials': ntrials,
+        'nbits': result.nbits,
+        'errors': int(np.sum(result.errors)),
+        'nsync': int(np.sum(result.sync)),
+        'ber': result.ber()
+    }
+
+
+def run_sweep(SNRs: list, channel_ids: list, Tbs: list, b: np.array, ntrials: int, output: str, seed: int=0, workers: int=None, Ac: float=Ac) -> list:
+    """
+    Runs the sweep over the grid `SNRs` x `channel_ids` x `Tbs` in parallel
+    and appends the results to the CSV file `output`. Grid points that are
+    already in `output` are skipped.
+
+    Parameters
+    ----------
+    SNRs : list of float
+        Signal-to-noise ratios (in dBm).
+    channel_ids : list of int
+        Channel ids.
+    Tbs : list of float
+        Symbol widths in seconds.
+    b : numpy.array
+        A binary array of 1s and 0s encoding the message.
+    ntrials : int
+        Number of trials per grid point.
+    output : str
+        Path of the CSV file to write the results to.
+    seed : int, default: 0
+        Seed of the sweep. The random number generators of the individual grid
+        points are spawned from it.
+    workers : int, optional
+        Number of worker processes (default: number of CPUs).
+    Ac : float
+        Carrier amplitude (default: `parameters.Ac`).
+
+    Returns
+    -------
+    rows : list of dict
+        The rows that were added to the table.
+    """
+
+    # One independent seed per grid point. The seeds only depend on the
+    # position in the grid, not on which points are still missing, so a sweep
+    # must be resumed with the same grid and seed.
+    grid = list(itertools.product(SNRs, channel_ids, Tbs))
+    seeds = np.random.SeedSequence(seed).spawn(len(grid))
+
+    # Skip the points that are already done
+    done = set()
+    if os.path.exists(output):
+        with open(output, newline='') as f:
+            for row in csv.DictReader(f):
+                done.add((float(row['SNR']), int(row['channel_id']), float(row['Tb'])))
+    todo = [(point, s) for point, s in zip(grid, seeds) if (float(point[0]), int(point[1]), float(point[2])) not in done]
+
+    rows = []
+    write_header = not os.path.exists(output) or os.path.getsize(output) == 0
+    with open(output, 'a', newline='') as f, ProcessPoolExecutor(workers) as executor:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if write_header:
+            writer.writeheader()
+            f.flush()
+
+        futures = [
+            executor.submit(run_point, SNR, channel_id, Tb, b, ntrials, s, Ac)
+            for (SNR, channel_id, Tb), s in todo
+        ]
+        for future in as_completed(futures):
+            row = future.result()
+            writer.writerow(row)
+            f.flush()
+            rows.append(row)
+            print(f"SNR={row['SNR']} channel={row['channel_id']} Tb={row['Tb']}: BER={row['ber']:.3g} ({row['nsync']}/{row['ntrials']} synchronized)")
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='sweep',
+        description='Acoustic wireless communication system -- parallel BER sweep.'
+    )
+    parser.add_argument('--snr', help='signal-to-noise ratios (in dBm)', type=float, nargs='+', default=[20.0])
+    parser.add_argument('--channel', help='channel ids', type=int, nargs='+', default=[8])
+    parser.add_argument('--tb', help='symbol widths (in s)', type=float, nargs='+', default=[0.05])
+    parser.add_argument('-n', '--trials', help='number of trials per point', type=int, default=100)
+    parser.add_argument('-m', '--message', help='message to transmit', default='Hello World!')
+    parser.add_argument('-a', '--amplitude', help='carrier amplitude', type=float, default=Ac)
+    parser.add_argument('-s', '--seed', help='seed of the sweep', type=int, default=0)
+    parser.add_argument('-j', '--workers', help='number of worker processes', type=int, default=None)
+    parser.add_argument('-o', '--output', help='CSV file to write (or resume)', default='sweep.csv')
+    args = parser.parse_args()
+
+    b = wcs.encode_string(args.message)
+    run_sweep(args.snr, args.channel, args.tb, b, args.trials, args.output, args.seed, args.workers, args.amplitude)
+
+
+if __name__ == "__main__":
+    main()
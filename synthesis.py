@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Template-based transmit synthesis for the wireless communication system project
+in Signals and transforms.
+
+The transmit signal is the bandpass-filtered sum of modulated rectangular
+pulses, one per symbol. Since the filter is linear and time-invariant, and the
+carrier has the same phase at the start of every symbol (if the pulse width
+`Kb` is a multiple of the carrier period, as for fc = 2500 Hz and fs = 20000
+Hz), every symbol contributes the same filtered waveform (template), scaled by
+the symbol value and delayed by `Kb` samples per symbol. The template consists
+of the pulse itself and the transient of the filter, which decays within a few
+pulse widths; cut into `J` pieces of `Kb` samples, each pulse width of the
+transmit signal is the sum of the pieces of the `J` most recent symbols.
+
+For small alphabets (BPSK and QPSK, with silence), all combinations of `J`
+symbols are tabulated, so that the transmit signal is assembled by copying one
+table row per symbol (a table lookup); otherwise, the `J` pieces are added
+(overlap-add). Either way, no filtering or carrier generation is left per
+message.
+"""
+
+from math import gcd
+
+import numpy as np
+from scipy import signal
+
+import wcslib as wcs
+import profiling
+from filtering import impulse_response
+from nco import NCO
+
+# Relative energy of the filter transient that is cut off the templates
+default_tol = 1e-16
+
+# Largest table of symbol combinations (samples)
+max_table_size = 1 << 21
+
+
+class TemplateSynthesizer:
+    """
+    Transmit synthesis from precomputed, filtered symbol waveforms. Generates
+    the same signal as `streaming.StreamingTransmitter` (up to the truncation
+    of the filter transient, see `tol`), block by block.
+
+    Parameters
+    ----------
+    sos_bp : numpy.array
+        Second-order sections of the channel bandpass filter.
+    fc : float
+        Carrier frequency in Hz.
+    Ac : float
+        Carrier amplitude.
+    Tb : float
+        Symbol width in seconds.
+    fs : float
+        Sampling frequency in Hz.
+    dtype : numpy.dtype, default: numpy.float64
+        Precision of the generated signal (numpy.float32 or numpy.float64).
+        The templates are calculated in double precision.
+    M : int, default: 2
+        Number of symbols of the phase-shift keying (2 for BPSK, 4 for QPSK,
+        see `wcslib.encode_baseband_signal()`).
+    tol : float, default: default_tol
+        Relative energy of the filter transient that is cut off (see
+        `filtering.impulse_response()`).
+    """
+
+    def __init__(self, sos_bp: np.array, fc: float, Ac: float, Tb: float, fs: float, dtype: np.dtype=np.float64, M: int=2, tol: float=default_tol):
+        wcs.bits_per_symbol(M)
+        watch = profiling.stopwatch()
+        self.fc = fc
+        self.fs = fs
+        self.Kb = int(np.floor(Tb*fs))
+        self.dtype = np.dtype(dtype)
+        self.M = M
+
+        # Carrier phases at the symbol starts: The carrier repeats every P
+        # samples, so symbol k starts at phase index k*Kb mod P
+        nco = NCO(fc, fs)
+        if nco.period is None:
+            raise ValueError(f'the carrier at {fc} Hz is not periodic at fs = {fs} Hz.')
+        self.period = nco.period
+        self.nphases = self.period//gcd(self.period, self.Kb)
+
+        # Number of pulse widths covered by a template
+        h = impulse_response(sos_bp, tol)
+        if h is None:
+            raise ValueError('the impulse response of the filter does not decay.')
+        self.J = int(np.ceil((self.Kb + h.shape[0] - 1)/self.Kb))
+
+        # Templates T[r, q, j]: Piece j of the filtered pulse that starts at
+        # phase index r*Kb, modulating the sine (q = 0) or the negative cosine
+        # (q = 1, quadrature part of M-PSK), see StreamingTransmitter
+        N = self.J*self.Kb
+        pulse = np.zeros(N)
+        pulse[:self.Kb] = Ac
+        T = np.empty((self.nphases, 2, self.J, self.Kb))
+        for r in range(self.nphases):
+            p = nco.phasor(N, r*self.Kb)
+            T[r, 0] = signal.sosfilt(sos_bp, pulse*p.imag).reshape(self.J, self.Kb)
+            T[r, 1] = signal.sosfilt(sos_bp, -pulse*p.real).reshape(self.J, self.Kb)
+        self.templates = T
+
+        # Alphabet: silence (index 0) and the M symbols; table of all
+        # combinations of J symbols if it is small enough
+        symbols = np.exp(2j*np.pi*np.arange(M)/M)
+        symbols = np.where(np.abs(symbols.imag) < 1e-12, symbols.real, symbols)
+        self.alphabet = np.concatenate(([0], symbols))
+        A = self.alphabet.shape[0]
+        self.table = None
+        if self.nphases*A**self.J*self.Kb <= max_table_size:
+            self.table = self._tabulate()
+        watch.stop('design')
+
+    def _tabulate(self) -> np.array:
+        """
+        Tabulates the pulse widths of all combinations of J symbols:
+        table[r, i] is the sum of the pieces j = 0, ..., J-1 of the symbols
+        with alphabet indices i_j (digit j of i in base A) that started j
+        pulse widths ago, for the phase index r*Kb of the current symbol.
+        """
+        A = self.alphabet.shape[0]
+        i = np.arange(A**self.J)
+        table = np.zeros((self.nphases, A**self.J, self.Kb))
+        for r in range(self.nphases):
+            for j in range(self.J):
+                s = self.alphabet[(i//A**j) % A]
+                rj = (r - j) % self.nphases
+                table[r] += np.outer(s.real, self.templates[rj, 0, j]) + np.outer(s.imag, self.templates[rj, 1, j])
+        return table.astype(self.dtype)
+
+    def symbol_indices(self, bs: list, gap: float=0.0) -> np.array:
+        """
+        Returns the alphabet indices of the symbols of several binary
+        sequences, each prepended by the synchronization sequence, separated
+        by (at least) `gap` seconds of silence (see
+        `streaming.StreamingTransmitter.bursts()`).
+        """
+        ngap = int(np.ceil(np.round(gap*self.fs)/self.Kb))
+        indices = []
+        for i, b in enumerate(bs):
+            if i > 0:
+                indices.append(np.zeros(ngap, dtype=np.intp))
+            if self.M == 2:
+                s = np.concatenate(([1, 0], b)).astype(np.intp)
+                indices.append(2 - s)
+            else:
+                m = np.round(np.angle(wcs.encode_symbols(b, self.M))/(2*np.pi/self.M)).astype(np.intp) % self.M
+                indices.append(np.concatenate(([1, 1 + self.M//2], 1 + m)))
+        return np.concatenate(indices)
+
+    def synthesize(self, a: np.array, k0: int=0, history: np.array=None) -> np.array:
+        """
+        Synthesizes the pulse widths of the symbols with the alphabet indices
+        `a`, the first of which is symbol number `k0` of the transmission.
+        `history` holds the alphabet indices of the J-1 preceding symbols
+        (default: silence).
+
+        Returns
+        -------
+        x : numpy.array
+            The transmit signal, one row per symbol.
+        """
+        if history is None:
+            history = np.zeros(self.J - 1, dtype=np.intp)
+        aa = np.concatenate((history, a))
+        n = a.shape[0]
+        r = (k0 + np.arange(n)) % self.nphases
+
+        if self.table is not None:
+            # Table lookup: the index of the J most recent symbols
+            A = self.alphabet.shape[0]
+            i = np.zeros(n, dtype=np.intp)
+            for j in range(self.J):
+                i += aa[self.J-1-j:self.J-1-j+n]*A**j
+            return self.table[r, i]
+
+        # Overlap-add of the J pieces
+        x = np.zeros((n, self.Kb), dtype=self.dtype)
+        for j in range(self.J):
+            s = self.alphabet[aa[self.J-1-j:self.J-1-j+n]]
+            rj = (r - j) % self.nphases
+            x += s.real[:, None]*self.templates[rj, 0, j] + s.imag[:, None]*self.templates[rj, 1, j]
+        return x
+
+    def blocks(self, b: np.array, blocksize: int=2048):
+        """
+        Generates the transmit signal for the binary sequence `b` block by
+        block (see `bursts()`).
+        """
+        return self.bursts([b], blocksize)
+
+    def bursts(self, bs: list, blocksize: int=2048, gap: float=0.0):
+        """
+        Generates the transmit signal for several binary sequences block by
+        block. Each sequence is sent as a separate burst with its own
+        synchronization sequence, and the bursts are separated by (at least)
+        `gap` seconds of silence.
+
+        Parameters
+        ----------
+        bs : list of numpy.array
+            Binary arrays of 1s and 0s.
+        blocksize : int, default: 2048
+            Number of samples per block. The last block may be shorter.
+        gap : float, default: 0.0
+            Silence between the bursts in seconds (rounded up to whole
+            symbols).
+
+        Yields
+        ------
+        xt : numpy.array
+            Block of the transmit signal.
+        """
+        a = self.symbol_indices(bs, gap)
+        history = np.zeros(self.J - 1, dtype=np.intp)
+
+        # Synthesize whole symbols covering at least one block at a time and
+        # cut them into blocks
+        nsymbols = max(1, int(np.ceil(blocksize/self.Kb)))
+        rest = np.zeros(0, dtype=self.dtype)
+        for k in range(0, a.shape[0], nsymbols):
+            with profiling.stage('synthesize', a[k:k+nsymbols].shape[0]*self.Kb):
+                x = self.synthesize(a[k:k+nsymbols], k, history).ravel()
+            history = np.concatenate((history, a[k:k+nsymbols]))[a[k:k+nsymbols].shape[0]:]
+            if rest.shape[0] > 0:
+                x = np.concatenate((rest, x))
+            n = x.shape[0] - x.shape[0] % blocksize
+            for m in range(0, n, blocksize):
+                yield x[m:m+blocksize]
+            rest = x[n:]
+        if rest.shape[0] > 0:
+            yield rest
@@ -0,0 +1,82 @@
+import numpy as np
+from scipy import signal
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import burstsync
+import wcslib as wcs
+from filters import design_bandpass, design_lowpass
+from parameters import Tb, fc, fs
+
+
+def _transmit(msg, A=1.0):
+    xb = wcs.encode_baseband_signal(wcs.encode_string(msg), Tb, fs)
+    t = np.arange(len(xb)) / fs
+    return signal.sosfilt(design_bandpass(), A * xb * np.sin(2 * np.pi * fc * t))
+
+
+def _receive(y):
+    t = np.arange(len(y)) / fs
+    y = signal.sosfilt(design_bandpass(), y)
+    return signal.sosfilt(design_lowpass(), 2 * y * np.exp(1j * 2 * np.pi * fc * t))
+
+
+def _recording(rng, noise=0.3):
+    x = np.concatenate((
+        np.zeros(15000), _transmit("First"), np.zeros(9000),
+        _transmit("Second burst", 0.5), np.zeros(5000),
+        _transmit("3rd", 2.0), np.zeros(20000)
+    ))
+    return _receive(x + noise * rng.standard_normal(len(x)))
+
+
+def test_finds_and_decodes_all_bursts():
+    yb = _recording(np.random.default_rng(0))
+    bursts = burstsync.find_bursts(yb, Tb, fs)
+
+    assert len(bursts) == 3
+    assert [b.nsymbols for b in bursts] == [2 + 40, 2 + 96, 2 + 24]
+    assert np.allclose([b.amplitude for b in bursts], [1, 0.5, 2], rtol=0.1)
+    assert [wcs.decode_string(b) for b in burstsync.decode_bursts(yb, Tb, fs)] == ["First", "Second burst", "3rd"]
+
+    # The single-burst decoder only finds the first one
+    assert wcs.decode_string(wcs.decode_baseband_signal(yb.copy(), Tb, fs))[:5] == "First"
+
+
+def test_timing_and_phase():
+    yb = _recording(np.random.default_rng(1))
+    phi = 1.0
+    bursts = burstsync.find_bursts(yb * np.exp(1j * phi), Tb, fs)
+    bursts0 = burstsync.find_bursts(yb, Tb, fs)
+
+    assert [b.start for b in bursts] == [b.start for b in bursts0]
+    assert np.allclose(np.angle(np.exp(1j * (np.array([b.phase - b0.phase for b, b0 in zip(bursts, bursts0)]) - phi))), 0, atol=1e-6)
+    assert [wcs.decode_string(b) for b in burstsync.decode_bursts(yb * np.exp(1j * phi), Tb, fs)] == ["First", "Second burst", "3rd"]
+
+
+def test_decimated_and_noise_only():
+    yb = _recording(np.random.default_rng(2))
+    assert [wcs.decode_string(b) for b in burstsync.decode_bursts(yb[::10], Tb, fs / 10)] == ["First", "Second burst", "3rd"]
+
+    rng = np.random.default_rng(3)
+    assert burstsync.find_bursts(_receive(rng.standard_normal(200000)), Tb, fs) == []
+
+
+def test_decodes_8psk_bursts():
+    def transmit(msg):
+        xb = wcs.encode_baseband_signal(wcs.encode_string(msg), Tb, fs, M=8)
+        t = np.arange(len(xb)) / fs
+        return signal.sosfilt(design_bandpass(), np.imag(np.conj(xb) * np.exp(1j * 2 * np.pi * fc * t)))
+
+    x = np.concatenate((np.zeros(15000), transmit("8-PSK"), np.zeros(9000), transmit("bursts"), np.zeros(15000)))
+    x = x + 0.05 * np.random.default_rng(4).standard_normal(len(x))
+    bs = burstsync.decode_bursts(_receive(x), Tb, fs, M=8)
+    # 8-PSK pads the messages to whole symbols (3 bits)
+    assert [wcs.decode_string(b[:len(b) // 8 * 8]) for b in bs] == ["8-PSK", "bursts"]
+
+
+def test_burst_at_the_end():
+    # A signal that ends right after the synchronization sequence
+    Kb = int(Tb * fs)
+    yb = np.concatenate((np.zeros(4 * Kb), burstsync.sync_template(Kb), 0.01 * np.ones(Kb // 2))).astype(complex)
+    assert burstsync.find_bursts(yb, Tb, fs) == []
@@ -0,0 +1,73 @@
+import numpy as np
+from scipy import signal
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from channelizer import Channelizer, all_channel_ids, center_frequency, decode_channels
+from parameters import Tb, fs
+
+
+def _transmit(msg, fc):
+    xb = wcs.encode_baseband_signal(wcs.encode_string(msg), Tb, fs)
+    return xb * np.sin(2 * np.pi * fc * np.arange(len(xb)) / fs)
+
+
+def test_all_channels_are_bins():
+    ch = Channelizer()
+    assert ch.channel_ids == all_channel_ids()
+    assert np.array_equal(ch.bins * 100, ch.fcs)
+    assert center_frequency(8) == 2500
+
+
+def test_matches_mixing_and_filtering():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(20000)
+    ch = Channelizer([1, 8, 13])
+    y = np.concatenate([ch.process(x[i:i+777]) for i in range(0, len(x), 777)], axis=1)
+
+    # Mix each channel to baseband, filter with the prototype, decimate
+    n = np.arange(len(x))
+    h = signal.firwin(ch.L, 50, window=("kaiser", 8.0), fs=fs)
+    for i, fc in enumerate(ch.fcs):
+        yref = signal.lfilter(h, 1, x * np.exp(2j * np.pi * fc * n / fs))[::50]
+        assert np.allclose(y[i], yref, atol=1e-10)
+
+
+def test_decodes_simultaneous_channels():
+    rng = np.random.default_rng(1)
+    x = np.zeros(160000)
+    for msg, channel_id, n in [("Channel five", 5, 10000), ("Channel eight", 8, 25000), ("13", 13, 5000)]:
+        xt = _transmit(msg, center_frequency(channel_id))
+        x[n:n+len(xt)] += xt
+    x += 0.3 * rng.standard_normal(len(x))
+
+    b = decode_channels(x, Tb, fs, [5, 8, 13])
+    assert wcs.decode_string(b[5]) == "Channel five"
+    assert wcs.decode_string(b[8]) == "Channel eight"
+    assert wcs.decode_string(b[13]) == "13"
+
+
+def test_receive_channels_qpsk(capsys):
+    from filters import design_bandpass
+    from parameters import Ac
+    from receiver import receive_channels
+    from streaming import StreamingTransmitter
+
+    # The channelizer's baseband must match the receiver's IQ demodulation,
+    # otherwise the QPSK symbols are mirrored
+    tx = StreamingTransmitter(design_bandpass(), center_frequency(8), Ac, Tb, fs, M=4)
+    xt = np.concatenate(list(tx.blocks(wcs.encode_string("QPSK msg!"))))
+    x = np.concatenate((np.zeros(5000), xt, np.zeros(5000)))
+    receive_channels([x[i:i+2048] for i in range(0, len(x), 2048)], [8], fs, M=4)
+    assert "[Rx] Channel 8:\nReceived: QPSK msg! (no of bits: 72)" in capsys.readouterr().out
+
+
+def test_receive_channels_message_at_end(capsys):
+    from receiver import receive_channels
+
+    # The recording ends with the last symbol, which is only complete once
+    # the channelizer has been flushed
+    x = _transmit("Hello there", center_frequency(8))
+    receive_channels([x[i:i+2048] for i in range(0, len(x), 2048)], [8], fs, 10)
+    assert "[Rx] Channel 8:\nReceived: Hello there (no of bits: 88)" in capsys.readouterr().out
@@ -0,0 +1,53 @@
+import numpy as np
+from scipy.stats import chi2
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from detection import EnergyDetector, chi2_threshold
+from kernels import moving_sum
+
+
+def _magnitude(rng, N, Kb, dtype=np.float64):
+    y = 0.1 * (rng.standard_normal(N) + 1j * rng.standard_normal(N))
+    y[N // 3:N // 3 + 4 * Kb] += 0.3
+    return np.abs(y).astype(dtype)
+
+
+def test_threshold_is_cached_quantile():
+    chi2_threshold.cache_clear()
+    assert chi2_threshold(2000) == chi2.ppf(0.99, 2000)
+    assert chi2_threshold(2000) == chi2.ppf(0.99, 2000)
+    assert chi2_threshold.cache_info().hits == 1
+    assert chi2_threshold(40, 0.9) == chi2.ppf(0.9, 40)
+
+
+def test_matches_chi2_cdf_test():
+    rng = np.random.default_rng(0)
+    for Kb, q, dtype in [(1000, 1, np.float64), (100, 10, np.float64), (1000, 1, np.float32)]:
+        xm = _magnitude(rng, 30000, Kb, dtype)
+        expected = chi2.cdf(q * moving_sum(xm**2, Kb) / np.var(xm, dtype=np.float64), 2 * q * Kb) > 0.99
+        d = EnergyDetector(Kb, q).process(xm)
+        assert np.array_equal(d, expected)
+        assert np.any(d) and not np.all(d)
+
+
+def test_blockwise_energy_and_variance():
+    rng = np.random.default_rng(1)
+    Kb = 1000
+    xm = _magnitude(rng, 50000, Kb)
+    detector = EnergyDetector(Kb)
+    xm2 = []
+    for i in range(0, len(xm), 777):
+        block = xm[i:i+777]
+        detector.update(block)
+        xm2.append(detector.energy(block))
+
+    assert np.allclose(np.concatenate(xm2), moving_sum(xm**2, Kb))
+    assert np.isclose(detector.variance, np.var(xm))
+    assert np.isclose(detector.mean, np.mean(xm))
+    assert detector.tail.shape == (Kb - 1,)
+
+    # Block by block detection finds the signal
+    detector.reset()
+    d = np.concatenate([detector.process(xm[i:i+2048]) for i in range(0, len(xm), 2048)])
+    assert np.all(d[len(xm) // 3 + 2 * Kb:len(xm) // 3 + 4 * Kb])
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from scipy.io import wavfile
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+import fileio
+from filters import design_bandpass, design_lowpass
+from parameters import Tb, fc, fs, Ac
+from streaming import StreamingReceiver, StreamingTransmitter
+
+
+def test_wav_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    x = 0.5 * rng.standard_normal((5000, 2)).clip(-1, 1)
+    for sample_format in ["int16", "float32"]:
+        path = str(tmp_path / f"{sample_format}.wav")
+        with fileio.CaptureWriter(path, fs, sample_format, channels=2) as f:
+            f.write(x[:3000])
+            f.write(x[3000:])
+
+        # The file is a valid WAV file
+        rate, y = wavfile.read(path)
+        assert rate == fs and y.shape == x.shape
+
+        capture = fileio.open_capture(path)
+        assert capture.sample_format == sample_format
+        assert (capture.fs, capture.channels, capture.nframes) == (fs, 2, 5000)
+        for channel in [0, 1]:
+            blocks = list(fileio.read_blocks(capture, 1024, channel))
+            assert all(b.dtype == np.float32 and len(b) <= 1024 for b in blocks)
+            assert np.allclose(np.concatenate(blocks), x[:, channel], atol=1 / 32768)
+
+
+def test_raw_roundtrip(tmp_path):
+    x = np.linspace(-1, 1, 1001)
+    for sample_format in ["int16", "float32"]:
+        path = str(tmp_path / f"capture.{sample_format}")
+        with fileio.CaptureWriter(path, fs, sample_format) as f:
+            f.write(x)
+        assert os.path.getsize(path) == 1001 * fileio.sample_formats[sample_format].itemsize
+
+        capture = fileio.open_capture(path, fs, sample_format)
+        y = np.concatenate(list(fileio.read_blocks(capture, 100, dtype=np.float64)))
+        assert np.allclose(y, x, atol=1 / 32768)
+        assert np.array_equal(fileio.read_frames(capture, 250, 400, dtype=np.float64), y[250:400])
+        assert fileio.read_frames(capture, 950, 2000).shape == (51,)
+
+
+def test_truncated_wav(tmp_path):
+    # A recording that was not closed has a wrong data size in the header
+    path = str(tmp_path / "truncated.wav")
+    f = fileio.CaptureWriter(path, fs)
+    f.write(np.zeros(1000))
+    f.file.close()
+
+    assert fileio.open_capture(path).nframes == 1000
+
+
+def test_wav_size_limit(tmp_path):
+    # A WAV file just below the 4 GiB limit (faked, only the header counts)
+    path = str(tmp_path / "large.wav")
+    f = fileio.CaptureWriter(path, fs)
+    f.nframes = fileio.max_wav_bytes // 2 - 10
+    f.write(np.zeros(10))
+    with pytest.raises(ValueError):
+        f.write(np.zeros(1))
+    assert f.nframes == fileio.max_wav_bytes // 2
+    f.close()
+    with open(path, "rb") as g:
+        header = g.read(44)
+    assert int.from_bytes(header[40:44], "little") == fileio.max_wav_bytes
+
+    # The header is never packed with an overflowing size
+    f = fileio.CaptureWriter(path, fs, "float32")
+    f.nframes = 2**30
+    with pytest.raises(ValueError):
+        f.close()
+    assert f.file.closed
+
+
+def test_decode_from_file(tmp_path):
+    path = str(tmp_path / "message.wav")
+    rng = np.random.default_rng(1)
+    tx = StreamingTransmitter(design_bandpass(), fc, 4 * Ac, Tb, fs)
+    with fileio.CaptureWriter(path, fs) as f:
+        f.write(0.01 * rng.standard_normal(30000))
+        for xt in tx.blocks(wcs.encode_string("From file"), 2048):
+            f.write(xt + 0.01 * rng.standard_normal(len(xt)))
+
+    # The file ends right after the message; flush() decodes it
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs)
+    received = []
+    for x in fileio.read_blocks(fileio.open_capture(path), 2048):
+        received += [wcs.decode_string(b) for b in rx.process(x)]
+    received += [wcs.decode_string(b) for b in rx.flush()]
+
+    assert received == ["From file"]
+
+
+def test_decode_transmitter_output(tmp_path):
+    # The transmitter's file starts with the message at the first sample and
+    # ends right after it
+    import subprocess
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    path = str(tmp_path / "tx.wav")
+    cases = [([], []), ([], ["-q", "10"]), (["-m", "qpsk"], ["-m", "qpsk"]), ([], ["--daemon"])]
+    for tx_args, rx_args in cases:
+        subprocess.run([sys.executable, "transmitter.py", "-o", path] + tx_args + ["Hello there"], cwd=root, capture_output=True, check=True)
+        out = subprocess.run([sys.executable, "receiver.py", "-i", path] + rx_args, cwd=root, capture_output=True, text=True, check=True).stdout
+        assert out.count("Hello there") == 1, (rx_args, out)
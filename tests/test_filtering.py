@@ -0,0 +1,44 @@
+import numpy as np
+from scipy import signal
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import filtering
+from filters import design, design_bandpass, design_lowpass
+from parameters import fs
+
+
+def test_overlap_save_matches_sosfilt():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((2, 30000))
+    for sos, xx in [(design_bandpass(), x), (design_lowpass(), x + 1j * x[::-1])]:
+        f = filtering.make_filter(sos, backend="ols")
+        y = np.concatenate([f.process(xx[:, n:n+1234]) for n in range(0, 30000, 1234)], axis=1)
+        assert f.backend == "ols"
+        assert np.allclose(y, signal.sosfilt(sos, xx, axis=-1), atol=1e-5)
+
+
+def test_direct_filter_carries_state():
+    rng = np.random.default_rng(1)
+    x = rng.standard_normal(10000)
+    f = filtering.make_filter(design_bandpass(), backend="sos")
+    y = np.concatenate([f.process(x[n:n+777]) for n in range(0, 10000, 777)])
+    assert np.allclose(y, signal.sosfilt(design_bandpass(), x))
+
+
+def test_backend_selection():
+    # Our low-order designs are filtered directly, high-order designs on long
+    # signals by FFT convolution, but not in short blocks
+    sos_hi = design(wp=(2425, 2575), ws=(2300, 2700), gpass=1, gstop=140, fs=fs)
+    assert filtering.make_filter(design_bandpass()).backend == "sos"
+    assert filtering.make_filter(design_lowpass(), 2048).backend == "sos"
+    assert filtering.make_filter(sos_hi).backend == "ols"
+    assert filtering.make_filter(sos_hi, 256).backend == "sos"
+
+
+def test_fir_filter():
+    rng = np.random.default_rng(2)
+    x = rng.standard_normal(5000)
+    for L in [10, 300]:
+        h = rng.standard_normal(L)
+        assert np.allclose(filtering.fir_filter(h, x), signal.lfilter(h, 1, x))
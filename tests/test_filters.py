@@ -6,6 +6,7 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+import filters
 from filters import design_bandpass, design_lowpass, fs
 
 # ---------- Bandpass tests ----------
@@ -71,3 +72,43 @@ def test_bandpass_stability():
     z, p, k = signal.sos2zpk(sos)
     assert np.all(np.abs(p) < 1)
 
+
+# ---------- Filter registry tests ----------
+
+def test_registry_caches_designs():
+    filters.clear_cache()
+    sos1 = design_bandpass()
+    sos2 = filters.design(wp=[2425, 2575], ws=[2300, 2700], gpass=1, gstop=40, fs=fs)
+
+    assert np.array_equal(sos1, sos2)
+    assert filters.cache_info()['misses'] == 1
+    assert filters.cache_info()['hits'] == 1
+
+
+def test_registry_cache_cannot_be_modified():
+    filters.clear_cache()
+    sos = design_lowpass()
+    sos[:] = 0
+    assert not np.all(design_lowpass() == 0)
+    assert not any(s.flags.writeable for s in filters._cache.values())
+
+
+def test_registry_matches_iirdesign():
+    sos = design_lowpass()
+    ref = signal.iirdesign(wp=100, ws=500, gpass=1, gstop=40, ftype="butter", output="sos", fs=fs)
+    assert np.array_equal(sos, ref)
+
+
+def test_registry_disk_cache(tmp_path):
+    filters.set_cache_dir(str(tmp_path))
+    try:
+        filters.clear_cache()
+        sos1 = filters.design(wp=200, ws=600, gpass=1, gstop=40, fs=fs)
+        filters.clear_cache()
+        sos2 = filters.design(wp=200, ws=600, gpass=1, gstop=40, fs=fs)
+
+        assert filters.cache_info()['disk_hits'] == 1
+        assert filters.cache_info()['misses'] == 0
+        assert np.array_equal(sos1, sos2)
+    finally:
+        filters.set_cache_dir(None)
@@ -0,0 +1,79 @@
+import numpy as np
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import framing
+from filters import design_bandpass, design_lowpass
+from parameters import Tb, fc, fs, Ac
+from streaming import StreamingReceiver, StreamingTransmitter
+
+
+def _stream(packets, rng):
+    # Packets separated by random bits
+    pieces = []
+    for p in packets:
+        pieces += [rng.integers(0, 2, rng.integers(0, 20)), p]
+    return np.concatenate(pieces + [rng.integers(0, 2, 7)])
+
+
+def test_packets_roundtrip():
+    rng = np.random.default_rng(0)
+    data = rng.bytes(1000)
+    for crc_bits in [16, 32]:
+        packets = framing.encode_packets(data, 64, crc_bits)
+        assert len(packets) == 16
+        assert packets[0].shape == (framing.packet_bits(64, crc_bits),)
+
+        # Feed the bit stream in pieces of random size
+        bits = _stream(packets, rng)
+        decoder = framing.PacketDecoder(crc_bits)
+        received = []
+        n = 0
+        while n < len(bits):
+            m = rng.integers(1, 300)
+            received += decoder.feed(bits[n:n+m])
+            n += m
+
+        assert [p.seq for p in received] == list(range(16))
+        assert b"".join(p.payload for p in received) == data
+
+
+def test_corrupted_packet_is_dropped():
+    rng = np.random.default_rng(1)
+    packets = framing.encode_packets(b"abcdefghijklmnopqrstuvwxyz", 8)
+    packets[1] = packets[1].copy()
+    packets[1][40] ^= 1
+    decoder = framing.PacketDecoder()
+    received = decoder.feed(_stream(packets, rng))
+
+    assert [p.seq for p in received] == [0, 2, 3]
+    assert received[2].payload == b"yz"
+    assert decoder.dropped >= 1
+
+
+def test_memory_is_bounded():
+    rng = np.random.default_rng(2)
+    decoder = framing.PacketDecoder(max_payload=64)
+    for _ in range(100):
+        decoder.feed(rng.integers(0, 2, 1000))
+        assert decoder.buffer.shape[0] <= framing.packet_bits(64)
+
+
+def test_packets_over_the_air():
+    rng = np.random.default_rng(3)
+    message = "Packets resynchronize on every burst."
+    packets = framing.encode_packets(message.encode(), 12)
+    tx = StreamingTransmitter(design_bandpass(), fc, 4 * Ac, Tb, fs)
+    x = np.concatenate([np.zeros(20000)] + list(tx.bursts(packets, 2048, 0.5)) + [np.zeros(20000)])
+    x = x + 0.05 * rng.standard_normal(len(x))
+
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, decimation=10)
+    decoder = framing.PacketDecoder()
+    received = []
+    for i in range(0, len(x), 2048):
+        for br in rx.process(x[i:i+2048]):
+            received += decoder.feed(br)
+            decoder.flush()
+
+    assert len(received) == len(packets)
+    assert b"".join(p.payload for p in received).decode() == message
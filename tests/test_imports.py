@@ -0,0 +1,35 @@
+import subprocess
+import sys, os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _imported(module):
+    # Import the module in a fresh interpreter and list the loaded modules
+    out = subprocess.run(
+        [sys.executable, '-c', f'import sys, {module}; print(" ".join(sys.modules))'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return set(out.split())
+
+
+def test_wcslib_and_filters_are_lightweight():
+    for module in ['wcslib', 'filters']:
+        loaded = _imported(module)
+        assert 'matplotlib' not in loaded
+        assert 'scipy.signal' not in loaded
+        assert 'scipy.stats' not in loaded
+
+
+def test_clis_do_not_import_audio_or_plotting():
+    for module in ['transmitter', 'receiver']:
+        loaded = _imported(module)
+        assert 'sounddevice' not in loaded
+        assert 'matplotlib' not in loaded
+
+
+def test_filters_lazy_attributes():
+    sys.path.append(ROOT)
+    import filters
+    assert filters.sos_bp.shape[1] == 6
+    assert filters.sos_lp.shape[1] == 6
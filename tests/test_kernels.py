@@ -0,0 +1,47 @@
+import numpy as np
+from scipy import signal
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from kernels import moving_sum
+
+
+def test_moving_sum_matches_lfilter():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(5000)
+    for K in [1, 7, 1000, 6000]:
+        assert np.allclose(moving_sum(x, K), signal.lfilter(np.ones(K), 1, x))
+
+
+def test_moving_sum_complex_and_2d():
+    rng = np.random.default_rng(1)
+    x = rng.standard_normal((3, 2000)) + 1j * rng.standard_normal((3, 2000))
+    y = moving_sum(x, 50)
+
+    assert y.shape == x.shape
+    assert np.allclose(y, signal.lfilter(np.ones(50), 1, x, axis=-1))
+
+
+def test_moving_sum_across_segments():
+    # Restarting the cumulative sum must not change the result
+    rng = np.random.default_rng(2)
+    x = rng.standard_normal(10000)
+    assert np.allclose(moving_sum(x, 300, segment=512), moving_sum(x, 300, segment=10**6))
+
+
+def test_moving_sum_no_drift():
+    # A long signal with a large offset: the error must not grow with the
+    # signal length
+    x = 1e3 + np.tile([0.1, -0.1], 10**6)
+    y = moving_sum(x, 100)
+    assert np.max(np.abs(y[100:] - 1e5)) < 1e-6
+
+
+def test_moving_sum_single_precision():
+    # Single-precision input gives single-precision output, but the sums are
+    # accumulated in double precision
+    x = (1e3 + np.tile([0.1, -0.1], 10**5)).astype(np.float32)
+    y = moving_sum(x, 100)
+    assert y.dtype == np.float32
+    assert moving_sum(x.astype(np.complex64), 100).dtype == np.complex64
+    assert np.allclose(y[100:], 1e5, rtol=1e-7)
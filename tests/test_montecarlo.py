@@ -0,0 +1,34 @@
+import numpy as np
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from montecarlo import simulate_channel_batch, run_trials
+from parameters import fs
+
+
+def test_simulate_channel_batch_rows_differ():
+    x = np.ones(1000)
+    y = simulate_channel_batch(x, fs, 8, 5, rng=np.random.default_rng(0))
+
+    assert y.shape[0] == 5
+    assert y.shape[1] >= 1000 + int(0.5 * fs)
+    assert not np.allclose(y[0], y[1])
+
+
+def test_simulate_channel_batch_reproducible():
+    x = np.ones(1000)
+    y1 = simulate_channel_batch(x, fs, 8, 3, rng=np.random.default_rng(42))
+    y2 = simulate_channel_batch(x, fs, 8, 3, rng=np.random.default_rng(42))
+
+    assert np.array_equal(y1, y2)
+
+
+def test_run_trials_high_snr():
+    bs = wcs.encode_string("Hi")
+    result = run_trials(bs, 10, Ac=1.0, SNR=40, batch_size=4, rng=np.random.default_rng(0))
+
+    assert result.errors.shape == (10,)
+    assert np.all(result.errors == 0)
+    assert np.all(result.sync)
+    assert result.ber() == 0
@@ -0,0 +1,43 @@
+import numpy as np
+from scipy import signal
+import pytest
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from multirate import Decimator, decimate, check_decimation
+from montecarlo import run_trials
+from parameters import Tb, fs
+
+
+def test_decimator_blockwise_matches_batch():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(5000) + 1j * rng.standard_normal(5000)
+    d = Decimator(10)
+    y = np.concatenate([d.process(x[i:i+333]) for i in range(0, len(x), 333)])
+
+    ref = signal.lfilter(d.h[::-1], 1, x)[::10]
+    assert np.allclose(y, ref)
+
+
+def test_decimate_length():
+    x = np.ones(1000)
+    assert decimate(x, 10).shape == (100,)
+    assert decimate(x, 1) is x
+
+
+def test_check_decimation():
+    check_decimation(10, Tb, fs)
+    with pytest.raises(ValueError):
+        check_decimation(3, Tb, fs)
+    with pytest.raises(ValueError):
+        check_decimation(0, Tb, fs)
+
+
+def test_decimation_does_not_change_ber():
+    b = wcs.encode_string("Hi")
+    r1 = run_trials(b, 16, Ac=0.3, rng=np.random.default_rng(3))
+    r10 = run_trials(b, 16, Ac=0.3, decimation=10, rng=np.random.default_rng(3))
+
+    assert abs(r1.ber() - r10.ber()) <= 0.02
+    assert np.sum(r10.sync) >= np.sum(r1.sync) - 1
@@ -0,0 +1,55 @@
+import numpy as np
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from nco import NCO
+from parameters import fc, fs
+
+
+def test_period():
+    assert NCO(2500, 20000).period == 8
+    assert NCO(2500, 44100).period == 441
+    assert NCO(1000.5, 20000).period == 40000
+
+
+def test_carrier_matches_trig():
+    n = np.arange(5000)
+    for f, s in [(fc, fs), (1000.5, 20000), (2500, 44100)]:
+        o = NCO(f, s)
+        assert np.allclose(o.cos(5000, 0), np.cos(2 * np.pi * f * n / s))
+        assert np.allclose(o.sin(5000, 0), np.sin(2 * np.pi * f * n / s))
+        assert np.allclose(o.phasor(1000, 123), np.exp(1j * 2 * np.pi * f * (123 + n[:1000]) / s))
+
+
+def test_phase_continues_between_calls():
+    o = NCO(fc, fs)
+    y = np.concatenate([o.sin(777) for _ in range(10)])
+    assert np.allclose(y, NCO(fc, fs).sin(7770, 0))
+
+
+def test_mix():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(1000)
+    n = np.arange(1000)
+    y = NCO(fc, fs).mix(x, 0)
+
+    assert np.allclose(y.real, 2 * x * np.cos(2 * np.pi * fc * n / fs))
+    assert np.allclose(y.imag, 2 * x * np.sin(2 * np.pi * fc * n / fs))
+
+    # Rows of a 2-D array are mixed with the same carrier
+    Y = NCO(fc, fs).mix(np.vstack((x, x)), 0)
+    assert np.allclose(Y[1], y)
+
+
+def test_irrational_fallback():
+    o = NCO(np.pi * 1000, fs)
+    n = np.arange(100)
+    assert np.allclose(o.cos(100, 0), np.cos(2 * np.pi * np.pi * 1000 * n / fs))
+
+
+def test_single_precision():
+    o = NCO(fc, fs, np.float32)
+    assert o.sin(100).dtype == np.float32
+    assert o.mix(np.ones(100, dtype=np.float32)).dtype == np.complex64
+    assert NCO(1000.5, 3e6 + 1, np.float32).phasor(10).dtype == np.complex64
+    assert np.allclose(o.sin(1000, 0), NCO(fc, fs).sin(1000, 0), atol=1e-7)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from filters import design_bandpass
+from parameters import Tb, fc, fs
+from pipeline import PipelineConfig, RxPipeline, TxPipeline
+from streaming import StreamingTransmitter
+
+
+def _channel(x, rng, noise=0.02):
+    y = np.concatenate((np.zeros(5000), x, np.zeros(5000)))
+    return y + noise * rng.standard_normal(len(y))
+
+
+def test_config_is_frozen():
+    config = PipelineConfig()
+    assert config.Kb == int(Tb * fs)
+    with pytest.raises(AttributeError):
+        config.fc = 3000
+    assert PipelineConfig.for_channel(8, M=4).fc == 2500
+
+
+def test_encode_matches_streaming_transmitter():
+    for M in (2, 4):
+        tx = TxPipeline(PipelineConfig(Ac=1.0, M=M))
+        bs = wcs.encode_string("Pipeline")
+        expected = np.concatenate(list(StreamingTransmitter(design_bandpass(), fc, 1.0, Tb, fs, M=M).blocks(bs)))
+        assert np.allclose(tx.encode(bs), expected, atol=1e-9)
+        assert np.array_equal(tx.encode("Pipeline"), tx.encode(b"Pipeline"))
+
+
+def test_roundtrip_reuses_workspaces():
+    rng = np.random.default_rng(0)
+    for config in (PipelineConfig(Ac=1.0), PipelineConfig(Ac=1.0, M=4, decimation=10), PipelineConfig(Ac=1.0, dtype=np.float32)):
+        tx, rx = TxPipeline(config), RxPipeline(config)
+        messages = ["Hello World!", "Hi", "A somewhat longer message"]
+        assert [wcs.decode_string(rx.decode(_channel(tx.encode(m), rng))) for m in messages] == messages
+
+        # The work arrays are only grown for longer messages
+        work = rx.y, tx.xb
+        assert wcs.decode_string(rx.decode(_channel(tx.encode("Short"), rng))) == "Short"
+        assert work[0] is rx.y and work[1] is tx.xb
+
+
+def test_decode_is_independent_of_previous_messages():
+    rng = np.random.default_rng(1)
+    tx, rx = TxPipeline(PipelineConfig(Ac=1.0)), RxPipeline()
+    y = _channel(tx.encode("Again"), rng)
+    b1 = rx.decode(y)
+    rx.decode(_channel(tx.encode("Something else"), rng))
+    assert np.array_equal(rx.decode(y), b1)
+
+
+def test_decoder_is_precomputed():
+    rng = np.random.default_rng(2)
+    for config in (PipelineConfig(Ac=1.0, decimation=10), PipelineConfig(Ac=1.0, dtype=np.float32)):
+        tx, rx = TxPipeline(config), RxPipeline(config)
+        Kb = int(np.floor(config.Tb * rx.fs_bb))
+        assert np.array_equal(rx.template, wcs.sync_template(Kb, config.dtype))
+        assert rx.template.dtype == np.dtype(config.dtype)
+
+        # The same bits as the decoder looking up the threshold and template
+        y = _channel(tx.encode("Precomputed"), rng)
+        b = wcs.decode_baseband_signal(rx.baseband(y), config.Tb, rx.fs_bb, config.decimation, config.M)
+        assert np.array_equal(rx.decode(y), b)
+        assert wcs.decode_string(b) == "Precomputed"
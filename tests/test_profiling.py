@@ -0,0 +1,81 @@
+import json
+import numpy as np
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import profiling
+import wcslib as wcs
+from pipeline import PipelineConfig, RxPipeline, TxPipeline
+
+
+def _signal():
+    tx = TxPipeline(PipelineConfig(Ac=0.5))
+    x = np.concatenate((np.zeros(10000), tx.encode("profile"), np.zeros(10000)))
+    return x + 0.01 * np.random.default_rng(0).standard_normal(x.shape[0])
+
+
+def test_disabled_does_nothing():
+    profiling.disable()
+    assert profiling.active() is None
+    assert profiling.stage("bandpass", 10) is profiling.stage("mix")
+    watch = profiling.stopwatch(10)
+    watch.lap("detect")
+    watch.stop("sync")
+
+
+def test_receiver_stages():
+    x = _signal()
+    rx = RxPipeline()
+    profiler = profiling.enable()
+    try:
+        assert wcs.decode_string(rx.decode(x)) == "profile"
+        RxPipeline(PipelineConfig(fc=3000))
+    finally:
+        profiling.disable()
+
+    profiles = {p.name: p for p in profiler.profiles()}
+    assert list(profiles) == ["bandpass", "mix", "lowpass", "decimate", "detect", "sync", "bits", "design"]
+    assert profiles["bandpass"].samples == x.shape[0] and profiles["bandpass"].calls == 1
+    assert profiles["design"].calls == 1 and profiles["design"].samples == 0
+    assert all(p.seconds > 0 and p.peak_bytes == 0 and p.allocations == 0 for p in profiles.values())
+
+    # Exports
+    stages = json.loads(profiler.to_json())["stages"]
+    assert [s["name"] for s in stages] == list(profiles)
+    text = profiler.export("prometheus")
+    assert "# TYPE wcs_stage_seconds_total counter" in text
+    assert f'wcs_stage_samples_total{{stage="mix"}} {x.shape[0]}' in text.splitlines()
+
+
+def test_nested_allocations():
+    profiler = profiling.enable(trace_allocations=True)
+    try:
+        with profiling.stage("outer"):
+            with profiling.stage("inner"):
+                x = np.ones(1 << 17)
+            del x
+            watch = profiling.stopwatch()
+            _ = np.ones(1 << 16)
+            watch.stop("lap")
+    finally:
+        profiling.disable()
+
+    profiles = {p.name: p for p in profiler.profiles()}
+    assert profiles["inner"].peak_bytes >= 8 << 17
+    assert profiles["outer"].peak_bytes >= profiles["inner"].peak_bytes
+    assert 8 << 16 <= profiles["lap"].peak_bytes < 8 << 17
+    assert profiles["lap"].allocations >= 1
+    assert profiles["inner"].allocations >= 1
+
+
+def test_session_writes_profile(tmp_path):
+    path = str(tmp_path / "profile.json")
+    with profiling.session("json", path) as profiler:
+        with profiling.stage("encode", 5):
+            pass
+    assert profiling.active() is None
+    with open(path) as f:
+        assert json.load(f) == {"stages": [{"name": "encode", "calls": 1, "seconds": profiler.profiles()[0].seconds, "samples": 5, "peak_bytes": 0, "allocations": 0}]}
+
+    with profiling.session(None) as profiler:
+        assert profiler is None and profiling.active() is None
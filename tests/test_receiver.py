@@ -29,3 +29,65 @@ def test_complex_baseband_generation():
 
     assert np.iscomplexobj(y_complex)
     assert np.allclose(np.real(y_complex), 1)
+
+
+def test_daemon_emits_each_message_once():
+    import io, json
+    import wcslib as wcs
+    from filters import design_bandpass, design_lowpass
+    from parameters import Tb
+    from receiver import EventWriter, receive_daemon
+    from streaming import StreamingReceiver
+    from synthesis import TemplateSynthesizer
+
+    fs = int(1/dt)
+    synth = TemplateSynthesizer(design_bandpass(), fc, 1.0, Tb, fs)
+    rng = np.random.default_rng(0)
+    messages = ["first", "second one", "3", "fourth message"]
+    pieces, starts = [np.zeros(7000)], []
+    for msg in messages:
+        starts.append(sum(map(len, pieces)) / fs)
+        pieces += [np.concatenate(list(synth.blocks(wcs.encode_string(msg)))), np.zeros(int(rng.integers(5000, 15000)))]
+    x = np.concatenate(pieces)
+    x = x + 0.02 * rng.standard_normal(len(x))
+
+    # Blocks of random size, such that messages straddle the block boundaries
+    edges = np.concatenate(([0], np.sort(rng.integers(0, len(x), 40)), [len(x)]))
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs)
+    nbuffer = rx.buffer.shape[0]
+    out = io.StringIO()
+    events = EventWriter(rx.fs_bb, out=out, t0=0)
+    receive_daemon((x[a:b] for a, b in zip(edges[:-1], edges[1:])), rx, events.message)
+
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [e["text"] for e in lines] == messages
+    assert all(e["event"] == "message" for e in lines)
+    assert np.allclose([e["start"] for e in lines], starts, atol=0.2)
+    assert all(e["end"] > e["start"] for e in lines)
+    assert lines[0]["time"].startswith("1970-01-01T00:00:0")
+    assert rx.buffer.shape[0] == nbuffer and rx.history.shape[0] <= rx.npre
+
+
+def test_all_bursts_with_input_file(tmp_path):
+    import subprocess
+    import fileio
+    from filters import design_bandpass
+    from parameters import Ac, Tb
+    from synthesis import TemplateSynthesizer
+    import wcslib as wcs
+
+    fs = int(1/dt)
+    synth = TemplateSynthesizer(design_bandpass(), fc, Ac, Tb, fs)
+    xt = np.concatenate(list(synth.blocks(wcs.encode_string("twice"))))
+    path = str(tmp_path / "two.wav")
+    with fileio.CaptureWriter(path, fs) as f:
+        for x in [np.zeros(10000), xt, np.zeros(10000), xt, np.zeros(10000)]:
+            f.write(x)
+
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    out = subprocess.run([sys.executable, "receiver.py", "-i", path, "-a"], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert out.count("Received: twice") == 2
+
+    # Combinations without a burst search are rejected
+    result = subprocess.run([sys.executable, "receiver.py", "-i", path, "-a", "-c", "8"], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 2 and "--all-bursts" in result.stderr
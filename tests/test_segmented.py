@@ -0,0 +1,67 @@
+import numpy as np
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import burstsync
+import fileio
+import wcslib as wcs
+from parameters import fs
+from pipeline import PipelineConfig, RxPipeline, TxPipeline
+from segmented import decode_segmented, merge, plan_segments, settling_samples
+from streaming import Message
+
+
+def _recording(path, config, messages, seed=0):
+    tx = TxPipeline(config)
+    rng = np.random.default_rng(seed)
+    parts = [np.zeros(20000)]
+    for msg in messages:
+        parts += [tx.encode(msg), np.zeros(int(rng.integers(10000, 30000)))]
+    x = np.concatenate(parts)
+    x += 0.01 * rng.standard_normal(x.shape[0])
+    with fileio.CaptureWriter(path, fs, "float32") as f:
+        f.write(x)
+    return x
+
+
+def test_plan_segments():
+    segments = plan_segments(10000, 3000, 500, 800, q=10)
+    assert [s.start for s in segments] == [0, 3000, 6000, 9000]
+    assert segments[-1].stop == 10000
+    assert segments[0].begin == 0 and segments[1].begin == 2500
+    assert segments[1].end == 6800 and segments[-1].end == 10000
+
+    # Boundaries are multiples of the decimation factor
+    segments = plan_segments(10000, 2995, 495, 800, q=10)
+    assert all(s.start % 10 == 0 and s.begin % 10 == 0 for s in segments)
+
+
+def test_merge_drops_duplicates():
+    b = np.ones(4)
+    messages = [Message(b, 500, 900), Message(b, 100, 400), Message(b, 102, 402), Message(b, 400, 450)]
+    assert [(m.start, m.end) for m in merge(messages)] == [(100, 400), (400, 450), (500, 900)]
+
+
+def test_segmented_matches_whole_recording(tmp_path):
+    messages = [f"msg {i}" + "x" * (i % 4) for i in range(10)]
+    for q in [1, 10]:
+        config = PipelineConfig(Ac=0.5, decimation=q)
+        path = str(tmp_path / f"capture{q}.wav")
+        x = _recording(path, config, messages)
+        capture = fileio.open_capture(path)
+
+        # Reference: the whole recording at once
+        rx = RxPipeline(config)
+        yb = rx.baseband(x)
+        bursts = burstsync.find_bursts(yb, config.Tb, rx.fs_bb)
+
+        # Segments shorter than a message, so that the seams cut through
+        # messages
+        assert settling_samples(config) < fs
+        for segment in [1.0, 2.3, 100.0]:
+            decoded = decode_segmented(capture, config, segment, max_duration=6.0, workers=1)
+            assert [wcs.decode_string(m.bits) for m in decoded] == messages
+            assert [m.start for m in decoded] == [burst.start for burst in bursts]
+
+        # Same result with a process pool
+        assert [(m.start, m.end) for m in decode_segmented(capture, config, 2.3, max_duration=6.0, workers=2)] == [(m.start, m.end) for m in decoded]
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from filters import design_bandpass, design_lowpass
+from parameters import Tb, fc, fs
+from pipeline import PipelineConfig, TxPipeline
+from staged import StagedPipeline, format_stats, receiver_stages
+from streaming import StreamingReceiver
+
+
+def test_stages_keep_order_and_count():
+    pipeline = StagedPipeline([("double", lambda x: 2 * x), ("sum", np.sum)], maxsize=2)
+    blocks = [np.arange(n) for n in range(1, 50)]
+    assert list(pipeline.run(blocks)) == [2 * np.sum(x) for x in blocks]
+
+    stats = pipeline.stats()
+    assert [s.name for s in stats] == ["double", "sum"]
+    assert all(s.blocks == 49 and s.samples == sum(range(1, 50)) for s in stats)
+    assert all(0 <= s.utilization <= 1 and s.depth == 0 and s.max_depth <= 2 for s in stats)
+    assert "double" in format_stats(stats)
+
+
+def test_full_queue_drops_blocks():
+    pipeline = StagedPipeline([("copy", np.copy)], maxsize=2)
+    assert pipeline.put(np.zeros(4), block=False)
+    assert pipeline.put(np.zeros(4), block=False)
+    assert not pipeline.put(np.zeros(4), block=False)
+    assert pipeline.dropped == 1
+
+    pipeline.start()
+    pipeline.close()
+    assert len(list(pipeline.results())) == 2
+
+
+def test_close_does_not_block_on_full_queue():
+    pipeline = StagedPipeline([("copy", np.copy)], maxsize=1)
+    assert pipeline.put(np.zeros(4), block=False)
+    pipeline.close(block=False)
+    assert pipeline.closed
+
+    # The end is marked once the stage has taken the block
+    pipeline.start()
+    assert len(list(pipeline.results())) == 1
+
+
+def test_stage_error_is_raised():
+    def fail(x):
+        if x[0] == 3:
+            raise ValueError("bad block")
+        return x
+
+    pipeline = StagedPipeline([("fail", fail), ("copy", np.copy)])
+    with pytest.raises(ValueError, match="bad block"):
+        list(pipeline.run([np.full(2, n) for n in range(10)]))
+
+
+def test_staged_receiver_matches_sequential():
+    tx = TxPipeline(PipelineConfig(Ac=0.5))
+    rng = np.random.default_rng(0)
+    x = np.concatenate([np.zeros(20000), tx.encode("first"), np.zeros(15000), tx.encode("second"), np.zeros(20000)])
+    x += 0.01 * rng.standard_normal(x.shape[0])
+    blocks = [x[i:i+2048] for i in range(0, x.shape[0], 2048)]
+
+    for q in [1, 10]:
+        rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, decimation=q)
+        expected = [m for block in blocks for m in rx.receive(block)] + rx.drain()
+
+        rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, decimation=q)
+        pipeline = StagedPipeline(receiver_stages(rx))
+        messages = [m for ms in pipeline.run(blocks) for m in ms] + rx.drain()
+
+        assert [wcs.decode_string(m.bits) for m in messages] == ["first", "second"]
+        assert [(m.start, m.end) for m in messages] == [(m.start, m.end) for m in expected]
+        assert all(np.array_equal(m.bits, e.bits) for m, e in zip(messages, expected))
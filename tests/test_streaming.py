@@ -0,0 +1,211 @@
+import numpy as np
+from scipy import signal
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from filters import design_bandpass, design_lowpass
+from parameters import Tb, fc, fs, Ac
+from streaming import StreamingReceiver, StreamingTransmitter
+
+
+def _transmit(msg, A=1.0):
+    bs = wcs.encode_string(msg)
+    xb = wcs.encode_baseband_signal(bs, Tb, fs)
+    t = np.arange(len(xb)) / fs
+    return signal.sosfilt(design_bandpass(), A * xb * np.sin(2 * np.pi * fc * t))
+
+
+def test_blockwise_filtering_matches_batch():
+    sos_bp, sos_lp = design_bandpass(), design_lowpass()
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(10000)
+
+    # Batch receiver chain
+    t = np.arange(len(x)) / fs
+    y = signal.sosfilt(sos_bp, x)
+    yI = signal.sosfilt(sos_lp, 2 * y * np.cos(2 * np.pi * fc * t))
+    yQ = signal.sosfilt(sos_lp, 2 * y * np.sin(2 * np.pi * fc * t))
+
+    # Streaming receiver chain with uneven block sizes
+    rx = StreamingReceiver(sos_bp, sos_lp, fc, Tb, fs)
+    blocks = []
+    for i in range(0, len(x), 777):
+        blocks.append(rx.lowpass(rx.mix(rx.bandpass(x[i:i+777]))))
+    yb = np.concatenate(blocks)
+
+    assert np.allclose(yb, yI + 1j * yQ, atol=1e-9)
+
+
+def test_decodes_messages_as_they_arrive():
+    rng = np.random.default_rng(1)
+    x = np.concatenate((
+        np.zeros(30000), _transmit("Hello World!"),
+        np.zeros(20000), _transmit("Second"),
+        np.zeros(40000)
+    ))
+    x = x + 0.05 * rng.standard_normal(len(x))
+
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs)
+    received = []
+    for i in range(0, len(x), 2048):
+        received += [wcs.decode_string(b) for b in rx.process(x[i:i+2048])]
+
+    assert received == ["Hello World!", "Second"]
+
+
+def test_constant_memory():
+    rng = np.random.default_rng(2)
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, max_duration=1.0)
+    nbuffer = rx.buffer.shape[0]
+    for _ in range(200):
+        rx.process(0.05 * rng.standard_normal(2048))
+
+    assert rx.buffer.shape[0] == nbuffer
+    assert rx.history.shape[0] <= rx.npre
+
+
+def test_blockwise_transmitter_matches_batch():
+    sos_bp = design_bandpass()
+    bs = wcs.encode_string("Hello")
+    xb = wcs.encode_baseband_signal(bs, Tb, fs)
+    t = np.arange(len(xb)) / fs
+    xt = signal.sosfilt(sos_bp, xb * Ac * np.sin(2 * np.pi * fc * t))
+
+    tx = StreamingTransmitter(sos_bp, fc, Ac, Tb, fs)
+    blocks = list(tx.blocks(bs, 1000))
+
+    assert all(len(b) <= 1000 for b in blocks)
+    assert np.allclose(np.concatenate(blocks), xt, atol=1e-9)
+
+
+def test_transmitter_is_lazy():
+    # The first block is available without synthesizing the whole message
+    tx = StreamingTransmitter(design_bandpass(), fc, Ac, Tb, fs)
+    bs = np.ones(10**7, dtype=int)
+    first = next(tx.blocks(bs, 2048))
+
+    assert first.shape == (2048,)
+
+
+def test_decodes_with_decimation():
+    rng = np.random.default_rng(4)
+    x = np.concatenate((np.zeros(30000), _transmit("Decimated"), np.zeros(40000)))
+    x = x + 0.05 * rng.standard_normal(len(x))
+
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, decimation=10)
+    received = []
+    for i in range(0, len(x), 2048):
+        received += [wcs.decode_string(b) for b in rx.process(x[i:i+2048])]
+
+    assert rx.Kb == 100
+    assert received == ["Decimated"]
+
+
+def test_single_precision():
+    rng = np.random.default_rng(5)
+    x = np.concatenate((np.zeros(30000), _transmit("Single"), np.zeros(40000)))
+    x = (x + 0.05 * rng.standard_normal(len(x))).astype(np.float32)
+
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, decimation=10, dtype=np.float32)
+    received = []
+    for i in range(0, len(x), 2048):
+        y = rx.decimate(rx.lowpass(rx.mix(rx.bandpass(x[i:i+2048]))))
+        assert y.dtype == np.complex64
+        received += [wcs.decode_string(b) for b in rx.detect(y)]
+    assert received == ["Single"]
+
+    tx = StreamingTransmitter(design_bandpass(), fc, Ac, Tb, fs, np.float32)
+    blocks = list(tx.blocks(wcs.encode_string("Hi"), 1000))
+    xt = np.concatenate(list(StreamingTransmitter(design_bandpass(), fc, Ac, Tb, fs).blocks(wcs.encode_string("Hi"), 1000)))
+    assert all(b.dtype == np.float32 for b in blocks)
+    assert np.allclose(np.concatenate(blocks), xt, atol=1e-6)
+
+
+def test_overlap_save_backend():
+    rng = np.random.default_rng(6)
+    x = np.concatenate((np.zeros(30000), _transmit("FFT"), np.zeros(40000)))
+    x = x + 0.05 * rng.standard_normal(len(x))
+
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, backend="ols")
+    received = []
+    for i in range(0, len(x), 2048):
+        received += [wcs.decode_string(b) for b in rx.process(x[i:i+2048])]
+    assert received == ["FFT"]
+
+
+def test_qpsk_transmit_and_receive():
+    bs = wcs.encode_string("QPSK stream")
+    tx = StreamingTransmitter(design_bandpass(), fc, 1.0, Tb, fs, M=4)
+    x = np.concatenate(list(tx.blocks(bs, 1000)))
+
+    # Same as modulating the complex baseband signal at once
+    xb = wcs.encode_baseband_signal(bs, Tb, fs, M=4)
+    t = np.arange(len(xb)) / fs
+    assert np.allclose(x, signal.sosfilt(design_bandpass(), np.imag(np.conj(xb) * np.exp(1j * 2 * np.pi * fc * t))), atol=1e-9)
+
+    x = np.concatenate((np.zeros(20000), x, np.zeros(20000)))
+    x = x + 0.05 * np.random.default_rng(3).standard_normal(len(x))
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, M=4)
+    received = []
+    for i in range(0, len(x), 2048):
+        received += [wcs.decode_string(b) for b in rx.process(x[i:i+2048])]
+    assert received == ["QPSK stream"]
+
+
+def _receive(rx, x):
+    messages = []
+    for i in range(0, len(x), 2048):
+        messages += rx.receive(x[i:i+2048])
+    return messages
+
+
+def test_calibration_confirmed_by_detection():
+    rng = np.random.default_rng(3)
+    x = np.concatenate((np.zeros(30000), _transmit("Hello"), np.zeros(20000)))
+    x = x + 0.05 * rng.standard_normal(len(x))
+
+    # The first window (noise) is the noise floor
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs)
+    messages = _receive(rx, x)
+    assert not rx.calibrating
+    assert [wcs.decode_string(m.bits) for m in messages] == ["Hello"]
+    assert messages[0].start > 20000
+
+
+def test_calibration_revised_by_quiet_window():
+    rng = np.random.default_rng(4)
+    x = np.concatenate((_transmit("Hello"), np.zeros(20000), _transmit("again"), np.zeros(20000)))
+    x = x + 0.05 * rng.standard_normal(len(x))
+
+    # The first window is the message; the quiet window after it is the
+    # noise floor
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs)
+    messages = _receive(rx, x)
+    assert rx.noise_power * rx.threshold < rx.p0 * rx.Kb
+    assert [wcs.decode_string(m.bits) for m in messages] == ["Hello", "again"]
+    assert messages[0].start == 0
+
+
+def test_calibration_confirmed_by_full_buffer():
+    rng = np.random.default_rng(5)
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs, max_duration=1.0)
+    assert _receive(rx, 0.05 * rng.standard_normal(30000)) == []
+    assert not rx.calibrating and rx.nbuffer == 0
+    assert rx.drain() == []
+
+
+def test_drain_while_calibrating():
+    rng = np.random.default_rng(6)
+
+    # A reception that is one transmission is decoded...
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs)
+    assert _receive(rx, _transmit("Hello")) == []
+    assert rx.calibrating
+    assert [wcs.decode_string(m.bits) for m in rx.drain()] == ["Hello"]
+
+    # ...noise is not
+    rx = StreamingReceiver(design_bandpass(), design_lowpass(), fc, Tb, fs)
+    assert _receive(rx, 0.05 * rng.standard_normal(30000)) == []
+    assert rx.calibrating
+    assert rx.drain() == []
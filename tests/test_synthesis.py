@@ -0,0 +1,50 @@
+import numpy as np
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from filters import design_bandpass
+from parameters import Tb, fc, fs, Ac
+from streaming import StreamingTransmitter
+from synthesis import TemplateSynthesizer
+
+
+def _reference(bs, M=2, gap=0.0, Tb=Tb):
+    tx = StreamingTransmitter(design_bandpass(), fc, Ac, Tb, fs, M=M, backend='sos')
+    return np.concatenate(list(tx.bursts(bs, 2048, gap)))
+
+
+def test_matches_streaming_transmitter():
+    bs = [wcs.encode_string("Template"), wcs.encode_string("synthesis")]
+    for M in (2, 4, 8):
+        synth = TemplateSynthesizer(design_bandpass(), fc, Ac, Tb, fs, M=M)
+        assert (synth.table is not None) == (M < 8)
+        x = np.concatenate(list(synth.bursts(bs, 2048, 0.3)))
+        assert np.allclose(x, _reference(bs, M, 0.3), rtol=0, atol=1e-7 * Ac)
+
+
+def test_block_sizes():
+    b = wcs.encode_string("Blocks")
+    synth = TemplateSynthesizer(design_bandpass(), fc, Ac, Tb, fs)
+    x = np.concatenate(list(synth.blocks(b)))
+    for blocksize in (100, 1000, 4096):
+        blocks = list(synth.blocks(b, blocksize))
+        assert all(len(block) == blocksize for block in blocks[:-1])
+        assert np.array_equal(np.concatenate(blocks), x)
+
+
+def test_carrier_phase_classes():
+    # Kb = 1002 is not a multiple of the carrier period of 8 samples
+    Tb2 = 0.0501
+    synth = TemplateSynthesizer(design_bandpass(), fc, Ac, Tb2, fs)
+    assert synth.nphases == 4
+    b = wcs.encode_string("Phase")
+    assert np.allclose(np.concatenate(list(synth.blocks(b))), _reference([b], Tb=Tb2), rtol=0, atol=1e-7 * Ac)
+
+
+def test_single_precision():
+    b = wcs.encode_string("float32")
+    synth = TemplateSynthesizer(design_bandpass(), fc, Ac, Tb, fs, dtype=np.float32)
+    x = np.concatenate(list(synth.blocks(b)))
+    assert x.dtype == np.float32
+    assert np.allclose(x, _reference([b]), rtol=0, atol=1e-6 * Ac)
@@ -30,3 +30,11 @@ def test_modulation_handles_zero_bits():
 
     # When xb = 0, xm must be exactly 0
     assert np.allclose(xm[xb == 0], 0, atol=1e-12)
+
+
+def test_parse_bits():
+    from transmitter import parse_bits
+    assert np.array_equal(parse_bits("0110"), [0, 1, 1, 0])
+    for data in ["0101201a", "01 10", "01ä"]:
+        with pytest.raises(ValueError):
+            parse_bits(data)
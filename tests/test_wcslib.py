@@ -0,0 +1,154 @@
+import numpy as np
+from scipy import signal
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import wcslib as wcs
+from filters import design_bandpass, design_lowpass
+from parameters import Tb, fc, fs
+
+
+def _receive(y):
+    t = np.arange(len(y)) / fs
+    y = signal.sosfilt(design_bandpass(), y)
+    return signal.sosfilt(design_lowpass(), 2 * y * np.exp(1j * 2 * np.pi * fc * t))
+
+
+def _transmit(bs, A=1.0):
+    xb = wcs.encode_baseband_signal(bs.copy(), Tb, fs)
+    t = np.arange(len(xb)) / fs
+    return signal.sosfilt(design_bandpass(), A * xb * np.sin(2 * np.pi * fc * t))
+
+
+def test_encode_baseband_signal():
+    xb = wcs.encode_baseband_signal(np.array([1, 0, 1]), Tb, fs)
+    Kb = int(Tb * fs)
+
+    assert xb.shape == (5 * Kb,)
+    assert np.array_equal(xb, np.repeat([1, -1, 1, -1, 1], Kb))
+
+
+def test_simulate_channel_roundtrip():
+    np.random.seed(0)
+    bs = wcs.encode_string("Hi!")
+    y = wcs.simulate_channel(_transmit(bs), fs, 8)
+    br = wcs.decode_baseband_signal(_receive(y), Tb, fs)
+
+    assert np.array_equal(br, bs)
+
+
+def test_decode_baseband_batch_matches_decode_baseband_signal():
+    np.random.seed(1)
+    rows = []
+    for A in [0.2, 0.5, 1.0, 0.3]:
+        bs = np.random.randint(0, 2, 24)
+        y = wcs.simulate_channel(_transmit(bs, A), fs, 8)[:36000]
+        rows.append(_receive(y))
+    yb = np.array(rows)
+
+    b, n = wcs.decode_baseband_batch(yb, Tb, fs)
+    for i in range(yb.shape[0]):
+        br = wcs.decode_baseband_signal(yb[i].copy(), Tb, fs)
+        assert n[i] == len(br)
+        assert np.array_equal(b[i, :n[i]], br)
+
+
+def test_single_precision_decodes_identically():
+    np.random.seed(2)
+    for A in [0.2, 0.5, 1.0]:
+        bs = np.random.randint(0, 2, 32)
+        yb = _receive(wcs.simulate_channel(_transmit(bs, A), fs, 8))
+        br64 = wcs.decode_baseband_signal(yb.copy(), Tb, fs)
+        br32 = wcs.decode_baseband_signal(yb.astype(np.complex64), Tb, fs)
+        assert np.array_equal(br32, br64)
+
+        b, n = wcs.decode_baseband_batch(yb[None, :].astype(np.complex64), Tb, fs)
+        assert np.array_equal(b[0, :n[0]], br64)
+
+
+def test_encode_baseband_signal_dtype():
+    xb = wcs.encode_baseband_signal(np.array([1, 0, 1]), Tb, fs, np.float32)
+    assert xb.dtype == np.float32
+
+
+def test_string_codec_utf8():
+    for s in ["Hello World!", "Grüße, 世界 ✓ 😀", ""]:
+        b = wcs.encode_string(s)
+        assert b.shape == (8 * len(s.encode("utf-8")),)
+        assert wcs.decode_string(b) == s
+
+    # ASCII is encoded one byte per character, as before
+    assert np.array_equal(wcs.encode_string("Hi"), np.unpackbits(np.array([72, 105], dtype=np.uint8)))
+
+    # Invalid UTF-8 (e.g., bit errors) does not raise
+    assert wcs.decode_string(np.unpackbits(np.array([72, 0xff, 105], dtype=np.uint8))) == "H�i"
+
+
+def test_bytes_codec():
+    data = np.random.default_rng(3).bytes(100000)
+    b = wcs.encode_bytes(data)
+    assert b.dtype == np.uint8 and b.shape == (800000,)
+    assert wcs.decode_bytes(b) == data
+    assert wcs.decode_bytes(b.astype(int)) == data
+    assert wcs.decode_bytes([1, 0, 1]) == b"\xa0"
+
+
+def test_channel_simulator_block_size_independent():
+    x = _transmit(wcs.encode_string('Hello'), A=4.0)
+    ys = []
+    for blocksize in (257, 2048, len(x)):
+        sim = wcs.ChannelSimulator(fs, 2, rng=np.random.default_rng(7))
+        blocks = [x[n:n+blocksize] for n in range(0, len(x), blocksize)]
+        ys.append(np.concatenate(list(sim.stream(blocks))))
+    assert len(ys[0]) == len(x) + sim.m + sim.Nbuf
+    assert np.array_equal(ys[0], ys[1]) and np.array_equal(ys[0], ys[2])
+
+
+def test_channel_simulator_delay_and_interference():
+    x = _transmit(wcs.encode_string('Hi'), A=4.0)
+    sim = wcs.ChannelSimulator(fs, 2, SNR=300.0, rng=np.random.default_rng(3))
+    y = np.concatenate(list(sim.stream([x])))
+    k = np.arange(len(y))
+    expected = sim.attenuation*np.concatenate((np.zeros(sim.m), x, np.zeros(sim.Nbuf)))
+    expected += sim.Ai*np.sin(2*np.pi*sim.fi*k/fs)
+    assert np.allclose(y, expected, atol=1e-9)
+    assert sim.delay.shape == (sim.m,)
+
+
+def test_channel_simulator_decodes():
+    bs = wcs.encode_string('Hello, world!')
+    x = _transmit(bs, A=4.0)
+    sim = wcs.ChannelSimulator(fs, 2, rng=np.random.default_rng(1))
+    y = np.concatenate(list(sim.stream(x[n:n+2048] for n in range(0, len(x), 2048))))
+    br = wcs.decode_baseband_signal(_receive(y), Tb, fs)
+    assert wcs.decode_string(br) == 'Hello, world!'
+
+
+def test_psk_symbols_roundtrip():
+    rng = np.random.default_rng(0)
+    for M in (2, 4, 8):
+        b = rng.integers(0, 2, 60)
+        s = wcs.encode_symbols(b, M)
+        assert np.allclose(np.abs(s), 1)
+        # A phase error below pi/M does not change the decision
+        br = wcs.decode_symbols(s * np.exp(0.9j * np.pi / M), M)
+        assert np.array_equal(br[:len(b)], b)
+        assert not np.any(br[len(b):])
+    # The symbol 1 carries the bits 1...1 (as for BPSK), neighbours are Gray coded
+    assert np.allclose(wcs.encode_symbols([1, 1], 4), 1)
+    v = np.array([int("".join(map(str, wcs.decode_symbols(np.exp(2j * np.pi * m / 8), 8))), 2) for m in range(8)])
+    assert np.all(np.array([bin(d).count("1") for d in v ^ np.roll(v, 1)]) == 1)
+
+
+def test_qpsk_roundtrip():
+    bs = wcs.encode_string('Hello, QPSK!')
+    xb = wcs.encode_baseband_signal(bs, Tb, fs, M=4)
+    assert np.iscomplexobj(xb) and len(xb) == (2 + len(bs) // 2) * int(Tb * fs)
+
+    # In-phase part on the sine, quadrature part on the negative cosine
+    t = np.arange(len(xb)) / fs
+    x = signal.sosfilt(design_bandpass(), np.imag(np.conj(xb) * np.exp(1j * 2 * np.pi * fc * t)))
+    y = np.concatenate((np.zeros(4000), x, np.zeros(4000)))
+    y = y + 0.01 * np.random.default_rng(0).standard_normal(len(y))
+    br = wcs.decode_baseband_signal(_receive(y), Tb, fs, M=4)
+    assert wcs.decode_string(br) == 'Hello, QPSK!'
@@ -14,14 +14,19 @@ $ python3 transmitter.py -b 010010000110100100100001
 """
 
 import argparse
+import queue
+import threading
 import numpy as np
-from scipy import signal
-import sounddevice as sd
 
 import wcslib as wcs
+import fileio
+import profiling
+import framing
 
 # TODO: Add relevant parameters to parameters.py
-from parameters import Tb, dt, fc, Ac, fs
+from parameters import Tb, dt, fc, Ac, blocksize
+from synthesis import TemplateSynthesizer
+from pipeline import PipelineConfig, TxPipeline
 
 
 def main():
@@ -36,66 +41,212 @@ def main():
         help='message is a binary sequence',
         action='store_true'
     )
+    parser.add_argument(
+        '-s',
+        '--stream',
+        help='synthesize and play the signal block by block',
+        action='store_true'
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='write the transmit signal to a WAV or raw file instead of '
+             'playing it'
+    )
+    parser.add_argument(
+        '-f',
+        '--format',
+        help='sample format of the output file',
+        choices=list(fileio.sample_formats),
+        default='int16'
+    )
+    parser.add_argument(
+        '--float32',
+        help='synthesize the signal in single precision (float32)',
+        action='store_true'
+    )
+    parser.add_argument(
+        '--file',
+        help='transmit the contents of a file (arbitrary binary data)'
+    )
+    parser.add_argument(
+        '-p',
+        '--packet-size',
+        help='split the message into packets of this many bytes (with '
+             'preamble, header and CRC), sent as separate bursts',
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        '--gap',
+        help='silence between packets in seconds',
+        type=float,
+        default=0.5
+    )
+    parser.add_argument(
+        '-m',
+        '--modulation',
+        help='phase-shift keying scheme (QPSK and 8-PSK send 2 and 3 bits per '
+             'symbol)',
+        choices=list(wcs.modulations),
+        default='bpsk'
+    )
+    parser.add_argument(
+        '--profile',
+        help='profile the processing stages and print the profile in this '
+             'format to standard error (or --profile-output) at the end',
+        choices=['json', 'prometheus']
+    )
+    parser.add_argument(
+        '--profile-output',
+        help='write the profile to this file'
+    )
+    parser.add_argument(
+        '--profile-memory',
+        help='also trace the memory allocated by each stage (slow)',
+        action='store_true'
+    )
     parser.add_argument('message', help='message to transmit', nargs='?')
     args = parser.parse_args()
 
+    with profiling.session(args.profile, args.profile_output, args.profile_memory):
+        run(args)
+
+
+def run(args):
+    """
+    Runs the transmitter with the parsed command-line arguments (see `main()`).
+    """
     if args.message is None:
         args.message = 'Hello World!'
 
     # Set parameters
     data = args.message
+    dtype = np.float32 if args.float32 else np.float64
+    M = wcs.modulations[args.modulation]
 
     # Convert string to bit sequence or string bit sequence to numeric bit
     # sequence
-    if args.binary:
-        bs = np.array([bit for bit in map(int, data)])
+    if args.file is not None:
+        with open(args.file, 'rb') as f:
+            bs = wcs.encode_bytes(f.read())
+        data = args.file
+    elif args.binary:
+        bs = parse_bits(data)
     else:
         bs = wcs.encode_string(data)
     
-    # Transmit signal
-    print(f'Sending: {data} (no of bits: {len(bs)}; message duration: {np.round(len(bs)*Tb, 1)} s).')
+    # Split into packets (each sent as a burst); otherwise the message is sent
+    # as a single burst
+    if args.packet_size > 0:
+        bursts = framing.encode_packets(wcs.decode_bytes(bs), args.packet_size)
+    else:
+        bursts = [bs]
 
-    # Encode baseband signal
-    # TODO: Adjust fs (lab 2 only, leave untouched for lab 1 unless you know what you are doing)
-    xb = wcs.encode_baseband_signal(bs, Tb, 1/dt)
+    # Transmit signal
+    # The message duration covers every burst (with the preamble, header, and
+    # CRC of packets) and the gaps between them, in whole symbols
+    k = wcs.bits_per_symbol(M)
+    nsymbols = sum(int(np.ceil(len(b)/k)) for b in bursts) + (len(bursts) - 1)*int(np.ceil(args.gap/Tb))
+    print(f'Sending: {data} (no of bits: {len(bs)}; message duration: {np.round(nsymbols*Tb, 1)} s).')
+    if args.packet_size > 0:
+        print(f'[Tx] {len(bursts)} packets of up to {framing.packet_bits(args.packet_size)} bits.')
 
-    # TODO: Implement transmitter code here
-    t = np.arange(len(xb)) * dt
-    
-    xm = xb * Ac * np.sin(2 * np.pi * fc * t)
-    
     # Use actual sampling rate (must match sounddevice playback)
     fs_local = int(1/dt)
 
-    fp_bp = [2425, 2575]   # passband (Hz)
-    fs_bp = [2300, 2700]   # stopband (Hz)
-    gpass_bp = 1           # dB ripple
-    gstop_bp = 40          # dB attenuation
-
-    
-    sos_bp = signal.iirdesign(
-        wp=fp_bp,
-        ws=fs_bp,
-        gpass=gpass_bp,
-        gstop=gstop_bp,
-        ftype="butter",
-        output="sos",
-        fs=fs_local
-    )
-
-    # Filter transmit signal (band-limit into allocated channel)
-    xt = signal.sosfilt(sos_bp, xm)
+    # Bandpass filter (passband 2425-2575 Hz, stopband below 2300 Hz and
+    # above 2700 Hz, 1 dB ripple, 40 dB attenuation; see PipelineConfig),
+    # designed once together with the carrier
+    config = PipelineConfig(fc=fc, Tb=Tb, fs=fs_local, Ac=Ac, M=M, dtype=dtype)
+    pipeline = TxPipeline(config)
+    sos_bp = pipeline.sos_bp
+
+    if args.output is not None:
+        # Synthesize block by block from the precomputed symbol waveforms and
+        # write each block to the file
+        tx = TemplateSynthesizer(sos_bp, fc, Ac, Tb, fs_local, dtype, M=M)
+        with fileio.CaptureWriter(args.output, fs_local, args.format) as f:
+            for xt in tx.bursts(bursts, blocksize, args.gap):
+                f.write(xt)
+        print(f'[Tx] Wrote {f.nframes/fs_local:.2f} s to {args.output}.')
+        return
+
+    if args.stream:
+        transmit_stream(sos_bp, bursts, fs_local, dtype, args.gap, M)
+        return
+
+    if args.packet_size > 0:
+        # Packets with gaps between them
+        tx = TemplateSynthesizer(sos_bp, fc, Ac, Tb, fs_local, dtype, M=M)
+        xt = np.concatenate(list(tx.bursts(bursts, blocksize, args.gap)))
+    else:
+        # Encode baseband signal, modulate, and filter the transmit signal
+        # (band-limit into allocated channel)
+        xb = pipeline.symbols(bs)
+        xt = pipeline.encode(bs)
+        print("[Tx] xb unique values:", np.unique(xb)[:10])
 
     print(f"[Tx] fs={fs_local} Hz, BPF sections={sos_bp.shape[0]}, duration={len(xt)/fs_local:.2f} s")
 
-    
-    print("[Tx] xb unique values:", np.unique(xb)[:10])
-
-
-    # Ensure the signal is mono, then play through speakers
+    # Ensure the signal is mono, then play through speakers (sounddevice is
+    # only needed, and imported, when playing)
+    import sounddevice as sd
     xt = np.stack((xt, np.zeros(xt.shape)), axis=1)
     sd.play(xt, 1/dt, blocking=True)
 
 
+def parse_bits(data):
+    """
+    Converts a string of 0s and 1s (e.g., '0100') to a binary array.
+    """
+    bs = np.frombuffer(data.encode('ascii', 'replace'), dtype=np.uint8) - ord('0')
+    if np.any(bs > 1):
+        raise ValueError(f'binary message must consist of 0s and 1s, but \'{data}\' given.')
+    return bs
+
+
+def transmit_stream(sos_bp, bursts, fs, dtype=np.float64, gap=0.0, M=2, maxsize=8):
+    """
+    Synthesizes the transmit signal for the bit sequences `bursts` (sent as
+    separate bursts of `M`-PSK symbols, `gap` seconds apart) block by block 
+    and plays each block as soon as it is generated. The blocks are
+    synthesized in a separate thread, up to `maxsize` blocks ahead, so the
+    audio callback only copies them.
+    """
+    import sounddevice as sd
+
+    tx = TemplateSynthesizer(sos_bp, fc, Ac, Tb, fs, dtype, M=M)
+    blocks = queue.Queue(maxsize)
+    finished = threading.Event()
+    underruns = [0]
+
+    def synthesize():
+        for xt in tx.bursts(bursts, blocksize, gap):
+            blocks.put(xt)
+        blocks.put(None)
+
+    def callback(outdata, frames, time, status):
+        if status:
+            print(f'[Tx] {status}')
+        outdata.fill(0)
+        try:
+            xt = blocks.get_nowait()
+        except queue.Empty:
+            # The synthesis fell behind: play silence
+            underruns[0] += 1
+            return
+        if xt is None:
+            raise sd.CallbackStop
+        outdata[:len(xt), 0] = xt
+
+    threading.Thread(target=synthesize, name='tx-synthesis', daemon=True).start()
+    print(f"[Tx] fs={fs} Hz, BPF sections={sos_bp.shape[0]}, streaming blocks of {blocksize} samples")
+    with sd.OutputStream(samplerate=fs, blocksize=blocksize, channels=2, dtype='float32', callback=callback, finished_callback=finished.set):
+        finished.wait()
+    if underruns[0] > 0:
+        print(f'[Tx] The synthesis fell behind {underruns[0]} times.')
+
+
 if __name__ == "__main__":    
     main()
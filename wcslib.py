@@ -7,8 +7,11 @@ Library for the wireless communication system project in Signals and Transforms
 """
 
 import numpy as np
-from scipy import signal
-from scipy.stats import chi2
+
+import profiling
+from detection import EnergyDetector, chi2_threshold
+from kernels import moving_sum
+from nco import NCO
 
 # List of channels and their max average power [fl, fu, Pmax]^T
 _channels = np.array([
@@ -17,24 +20,66 @@ _channels = np.array([
     [np.nan,   30,   33,   27,   33,   33,   33,   30,   27,   30,   33,   33,   27,   33,   30,   30,   33,   27,   33,   30,   27,   30, np.nan]
 ])
 
-def encode_string(instr: str) -> np.array:
+# Modulation schemes and their number of symbols M (M-PSK)
+modulations = {
+    'bpsk': 2,
+    'qpsk': 4,
+    '8psk': 8,
+}
+
+def encode_bytes(data: bytes) -> np.array:
+    """
+    Converts arbitrary binary data to a binary numpy array (most significant
+    bit of each byte first).
+
+    Parameters
+    ----------
+    data : bytes
+        The data (any bytes-like object).
+
+    Returns
+    -------
+    binary : numpy.array
+        A binary array (uint8) of 8 bits per byte.
+    """
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+
+def decode_bytes(inbin: np.array) -> bytes:
+    """
+    Converts a binary numpy array to binary data. If the number of bits is not
+    a multiple of 8, the last byte is padded with zeros.
+
+    Parameters
+    ----------
+    inbin : numpy.array
+        A binary array of ones and zeros.
+
+    Returns
+    -------
+    data : bytes
+        The data.
+    """
+    return np.packbits(np.asarray(inbin, dtype=np.uint8)).tobytes()
+
+def encode_string(instr: str, encoding: str='utf-8') -> np.array:
     """
     Converts a string to a binary numpy array.
 
     Parameters
     ----------
     instr : str
-        A UTf-8 encoded Python string.
+        A Python string.
+    encoding : str, default: 'utf-8'
+        Character encoding of the string.
 
     Returns
     -------
     binary : numpy.array
         A binary array encoding the string.
     """
-    tmp = [np.uint8(ord(c)) for c in instr]
-    return np.unpackbits(tmp)
+    return encode_bytes(instr.encode(encoding))
 
-def decode_string(inbin: np.array) -> str:
+def decode_string(inbin: np.array, encoding: str='utf-8', errors: str='replace') -> str:
     """
     Converts a binary numpy array to string.
 
@@ -42,17 +87,86 @@ def decode_string(inbin: np.array) -> str:
     ----------
     inbin : numpy.array
         A binary array of ones and zeros encoding a string.
+    encoding : str, default: 'utf-8'
+        Character encoding of the string.
+    errors : str, default: 'replace'
+        How to handle invalid byte sequences (e.g., due to bit errors), see
+        `bytes.decode()`.
     
     Returns
     -------
     outstr : str
-        A UTF-8 encoded Python string.
+        A Python string.
+    """
+    return decode_bytes(inbin).decode(encoding, errors)
+
+def bits_per_symbol(M: int) -> int:
+    """
+    Returns the number of bits per symbol of M-PSK, log2(`M`).
     """
-    tmp = np.packbits(inbin)
-    outstr = "".join([chr(b) for b in tmp])
-    return outstr
+    k = int(M).bit_length() - 1
+    if M < 2 or M != 1 << k:
+        raise ValueError(f'M must be a power of two (at least 2), but {M} given.')
+    return k
 
-def encode_baseband_signal(b: np.array, Tb: float, fs: float=22050) -> np.array:
+def _psk_values(M: int) -> np.array:
+    """
+    Returns the bit values (as integers) of the M-PSK symbols 
+    exp(1j*2*pi*m/M), m = 0, ..., M-1. The values are Gray coded such that
+    neighbouring symbols differ in one bit, and the symbol 1 (m = 0) carries 
+    the value with all bits set, as for BPSK.
+    """
+    m = np.arange(M)
+    return (m ^ (m >> 1)) ^ (M - 1)
+
+def encode_symbols(b: np.array, M: int=4) -> np.array:
+    """
+    Maps a binary sequence to M-PSK symbols, `log2(M)` bits per symbol (most
+    significant bit first). If the number of bits is not a multiple of 
+    `log2(M)`, the last symbol is padded with zeros.
+
+    Parameters
+    ----------
+    b : numpy.array
+        A binary array of 1s and 0s.
+    M : int, default: 4
+        Number of symbols (a power of two; 2 for BPSK, 4 for QPSK).
+
+    Returns
+    -------
+    s : numpy.array
+        The complex-valued symbols exp(1j*2*pi*m/M).
+    """
+    k = bits_per_symbol(M)
+    b = np.asarray(b, dtype=np.int64)
+    b = np.concatenate((b, np.zeros(-b.shape[0] % k, dtype=np.int64)))
+    v = b.reshape(-1, k) @ (1 << np.arange(k-1, -1, -1))
+    m = np.argsort(_psk_values(M))[v]
+    return np.exp(2j*np.pi*m/M)
+
+def decode_symbols(z: np.array, M: int=4) -> np.array:
+    """
+    Decodes (phase-corrected) M-PSK symbols into a binary sequence: Each 
+    symbol is decided by its phase, the closest of 2*pi*m/M.
+
+    Parameters
+    ----------
+    z : numpy.array
+        The complex-valued received symbols.
+    M : int, default: 4
+        Number of symbols (see `encode_symbols()`).
+
+    Returns
+    -------
+    b : numpy.array
+        A binary array of 1s and 0s, `log2(M)` bits per symbol.
+    """
+    k = bits_per_symbol(M)
+    m = np.round(np.angle(np.atleast_1d(z))/(2*np.pi/M)).astype(int) % M
+    v = _psk_values(M)[m]
+    return ((v[:, None] >> np.arange(k-1, -1, -1)) & 1).ravel()
+
+def encode_baseband_signal(b: np.array, Tb: float, fs: float=22050, dtype: np.dtype=np.float64, M: int=2) -> np.array:
     """
     Encodes a binary sequence into a baseband signal. In particular, generates 
     a discrete-time signal that encodes the binary signal `b` into pulses of 
@@ -80,6 +194,15 @@ def encode_baseband_signal(b: np.array, Tb: float, fs: float=22050) -> np.array:
         Pulse width in seconds to encode the bits to.
     fs : float
         Sampling frequency in Hz (default: 22050 Hz).
+    dtype : numpy.dtype, default: numpy.float64
+        Data type of the baseband signal (e.g., numpy.float32 for single 
+        precision).
+    M : int, default: 2
+        Number of symbols of the phase-shift keying. For M > 2 (e.g., 4 for 
+        QPSK), `log2(M)` bits are sent per pulse as the M-PSK symbols of
+        `encode_symbols()`, and the baseband signal is complex-valued (of the 
+        precision of `dtype`). The synchronization sequence is the same as for
+        BPSK.
 
     Returns
     -------
@@ -87,6 +210,11 @@ def encode_baseband_signal(b: np.array, Tb: float, fs: float=22050) -> np.array:
         Encoded baseband signal.
     """
 
+    Kb = int(np.floor(Tb*fs))
+    if M != 2:
+        s = np.concatenate(([1, -1], encode_symbols(b, M)))
+        return np.repeat(s.astype(np.result_type(dtype, np.complex64)), Kb)
+
     # Prepend synchronization sequence and a trailing zero
     b = np.concatenate(([1, 0], b))
 
@@ -96,18 +224,40 @@ def encode_baseband_signal(b: np.array, Tb: float, fs: float=22050) -> np.array:
     b[b == 1] = s[1]
 
     # Expand
-    Kb = int(np.floor(Tb*fs))
     Nx = b.shape[0]
-    xb = np.zeros(Nx*Kb)
+    xb = np.zeros(Nx*Kb, dtype=dtype)
     xb[np.arange(0, Nx*Kb, Kb)] = b
 
-    # "Lowpass filtering"
-    b = np.ones(Kb)
-    xb = signal.lfilter(b, 1, xb)
+    # "Lowpass filtering" (with a rect of length Kb)
+    xb = moving_sum(xb, Kb)
 
     return xb
 
-def decode_baseband_signal(yb: np.array, Tb: float, fs: float=22050) -> np.array:
+def sync_template(Kb: int, dtype: np.dtype=np.float64) -> np.array:
+    """
+    Returns the matched filter of the synchronization sequence [1, 0] for
+    pulses of `Kb` samples, as one weight per pulse (the most recent pulse
+    first): The impulse response of the filter is
+
+        hb = 1/(2*Kb)*[-1, ..., -1, 1, ..., 1],
+
+    that is, each weight holds for `Kb` samples. See `decode_baseband_signal()`.
+    """
+    return np.array([-1, 1], dtype=dtype)/(2*Kb)
+
+def _matched_filter(xd: np.array, template: np.array, Kb: int) -> np.array:
+    """
+    Filters `xd` along its last axis with the matched filter `template` (see
+    `sync_template()`), as the weighted sum of delayed moving sums of `Kb`
+    samples.
+    """
+    xds = moving_sum(xd, Kb)
+    xs = template[0]*xds
+    for j in range(1, template.shape[0]):
+        xs[..., j*Kb:] += template[j]*xds[..., :-j*Kb]
+    return xs
+
+def decode_baseband_signal(yb: np.array, Tb: float, fs: float=22050, decimation: int=1, M: int=2, threshold: float=None, template: np.array=None) -> np.array:
     """
     Decodes an IQ-demodulated complex-valued baseband signal `yb` into a binary
     bit sequence.
@@ -143,6 +293,26 @@ def decode_baseband_signal(yb: np.array, Tb: float, fs: float=22050) -> np.array
         Pulse width in seconds to encode the bits to.
     fs : float
         Sampling frequency in Hz (default: 22050 Hz).
+    decimation : int, default: 1
+        Factor by which `yb` has been decimated, that is, `fs` is the 
+        sampling frequency after decimation. The signal detection threshold is
+        calculated for the original sampling frequency such that decimation 
+        does not change the sensitivity of the detector.
+    M : int, default: 2
+        Number of symbols of the phase-shift keying (see 
+        `encode_baseband_signal()`). For M > 2, the phase of each pulse 
+        relative to the symbol of the bit `1` is decided by 
+        `decode_symbols()`.
+    threshold : float, optional
+        Precomputed signal detection threshold,
+        `detection.chi2_threshold(2*decimation*Kb)` (default: looked up).
+    template : numpy.array, optional
+        Precomputed matched filter of the synchronization sequence,
+        `sync_template(Kb, dtype)` (default: built for `Kb`).
+
+    The precision of `yb` determines the precision of the intermediate 
+    signals, that is, a complex64 signal is decoded in single precision. Sums
+    and the signal variance are always accumulated in double precision.
 
     Returns
     -------
@@ -152,51 +322,56 @@ def decode_baseband_signal(yb: np.array, Tb: float, fs: float=22050) -> np.array
 
     # Parameters
     Kb = int(np.floor(Tb*fs))
+    dtype = _real_dtype(yb.dtype)
+    watch = profiling.stopwatch(yb.shape[0])
 
     # 0. Get amplitude and phase
-    xm = np.abs(yb)
-    xp = np.angle(yb)
+    xm = np.abs(yb).astype(dtype, copy=False)
+    xp = np.angle(yb).astype(dtype, copy=False)
 
     # TODO: Bug if yb is purely real, not sure why
 
     # 1. Zero-pad
     # Zero-pad the signals with Kb zeros to make sure the whole signal is 
     # preserved after filtering.
-    xm = np.concatenate((xm, np.zeros(Kb)))
-    xp = np.concatenate((xp, np.zeros(Kb)))
+    xm = np.concatenate((xm, np.zeros(Kb, dtype=dtype)))
+    xp = np.concatenate((xp, np.zeros(Kb, dtype=dtype)))
 
     # 2. Signal detection
     # Calculate the squared signal amplitude, normalized by its variance and
-    # run a Chi-squared test to find the signal. Then find the onset of the 
-    # signal (stored in m).
-    hd = np.ones((Kb,))
-    xm2 = signal.lfilter(hd, 1, xm**2)
-    xm_var = np.var(xm)
-    xtest = chi2.cdf(xm2/xm_var, 2*Kb)
-    d = xtest > 0.99
+    # run a Chi-squared test to find the signal, that is, compare it to the 
+    # 99 % quantile (see detection.EnergyDetector). Then find the onset of the
+    # signal (stored in m). For a decimated signal, the sum over Kb samples
+    # is scaled to the sum over the Kb*decimation samples at the original 
+    # sampling frequency.
+    d = EnergyDetector(Kb, decimation, threshold=threshold).process(xm)
     m = np.argmax(d)
+    watch.lap('detect')
 
     # 3. Synchronization
     # Synchronize using a matched filter. N.B: Expects the first two bits to be
     # [1, 0] as prepended by encode_baseband_signal()
     # NOTE: Remove unwrapping? by doing this in the complex domain as well.
-    # NOTE: Synchronization sequence is hardcoded here.
     xpd = _unwrap(xp)
-    hb = 1/(2*Kb)*np.concatenate((-np.ones(Kb), np.ones(Kb)))
+    # The matched filter's impulse response consists of one rect per
+    # synchronization bit (see sync_template()), hence, its output is the
+    # weighted sum of delayed moving sums.
+    if template is None:
+        template = sync_template(Kb, dtype)
     xd = np.sign(xpd)*d
-    xs = signal.lfilter(hb, 1, xd)
+    xs = _matched_filter(xd, template, Kb)
     
     # The peak of the synchronization sequence is within m+Nsynch*Kb. Hence, we
     # can get an exact match within that window to get "perfect" 
     # synchronization
-    # NOTE: "2" is hardcoded here, assumes two synchronization bits.
-    k0 = np.argmax(abs(xs[:m+2*Kb]))
+    k0 = np.argmax(abs(xs[:m+template.shape[0]*Kb]))
     xx = np.vstack((
-        1/Kb*signal.lfilter(hd, 1, np.cos(xp)),
-        1/Kb*signal.lfilter(hd, 1, np.sin(xp))
+        1/Kb*moving_sum(np.cos(xp), Kb),
+        1/Kb*moving_sum(np.sin(xp), Kb)
     ))
     b1 = xx[:, k0-Kb]
     b0 = xx[:, k0]
+    watch.lap('sync')
 
     # 4. Recover the bits
     # Calculate the projection of the complex number onto the symbol of the bit
@@ -205,8 +380,14 @@ def decode_baseband_signal(yb: np.array, Tb: float, fs: float=22050) -> np.array
     # and zeros (the inner product is close to 1 if the bit is close to the 
     # symbol for `1`` or close to -1 if the bit is close to the symbol for 
     # `0`).
+    if M != 2:
+        z = (b1[0] - 1j*b1[1])*(xx[0, k0+Kb::Kb] + 1j*xx[1, k0+Kb::Kb])
+        b = decode_symbols(z[d[k0+Kb::Kb]], M)
+        watch.stop('bits')
+        return b
     b = b1@xx[:, k0+Kb::Kb]
     b = b[d[k0+Kb::Kb]] > 0
+    watch.stop('bits')
 
     #alpha = 0.9
     #b = np.array([])
@@ -222,6 +403,98 @@ def decode_baseband_signal(yb: np.array, Tb: float, fs: float=22050) -> np.array
 
     return b.astype(int)
 
+def decode_baseband_batch(yb: np.array, Tb: float, fs: float=22050, decimation: int=1) -> tuple:
+    """
+    Decodes a batch of IQ-demodulated complex-valued baseband signals, one per
+    row of `yb`, into binary bit sequences.
+
+    This is a vectorized version of `decode_baseband_signal()` that processes
+    all rows at once (see there for the details of the algorithm); row `i` of
+    the result contains the same bits as `decode_baseband_signal(yb[i], Tb, 
+    fs)`. Since the number of decoded bits may differ between the rows, the 
+    bits are returned as a 2-D array together with the number of valid bits 
+    per row.
+
+    Parameters
+    ----------
+    yb : numpy.array
+        The complex-valued IQ-demodulated baseband signals, one per row.
+    Tb : float
+        Pulse width in seconds to encode the bits to.
+    fs : float
+        Sampling frequency in Hz (default: 22050 Hz).
+    decimation : int, default: 1
+        Factor by which `yb` has been decimated (see 
+        `decode_baseband_signal()`).
+
+    As for `decode_baseband_signal()`, the precision of `yb` determines the 
+    precision of the intermediate signals.
+
+    Returns
+    -------
+    b : numpy.array
+        A binary array of 1s and 0s with one message per row. Only the first
+        `n[i]` bits of row `i` are valid.
+    n : numpy.array
+        Number of decoded bits per row.
+    """
+
+    # Parameters
+    Kb = int(np.floor(Tb*fs))
+    M = yb.shape[0]
+    dtype = _real_dtype(yb.dtype)
+
+    # 0. Get amplitude and phase
+    xm = np.abs(yb).astype(dtype, copy=False)
+    xp = np.angle(yb).astype(dtype, copy=False)
+
+    # 1. Zero-pad
+    xm = np.concatenate((xm, np.zeros((M, Kb), dtype=dtype)), axis=1)
+    xp = np.concatenate((xp, np.zeros((M, Kb), dtype=dtype)), axis=1)
+    N = xm.shape[1]
+
+    # 2. Signal detection
+    xm2 = moving_sum(xm**2, Kb)
+    xm_var = np.var(xm, axis=1, keepdims=True, dtype=np.float64)
+    d = decimation*xm2/xm_var > chi2_threshold(2*decimation*Kb)
+    m = np.argmax(d, axis=1)
+
+    # 3. Synchronization
+    xpd = _unwrap(xp)
+    template = sync_template(Kb, dtype)
+    xd = np.sign(xpd)*d
+    xs = _matched_filter(xd, template, Kb)
+
+    # Search for the peak within m+2*Kb (per row)
+    k = np.arange(N)
+    k0 = np.argmax(np.where(k < (m + template.shape[0]*Kb)[:, None], abs(xs), -1), axis=1)
+    xx = 1/Kb*moving_sum(np.exp(1j*xp), Kb)
+    rows = np.arange(M)
+    b1 = xx[rows, (k0 - Kb) % N]
+
+    # 4. Recover the bits at every Kb starting from k0+Kb, drop the bits where
+    # no signal was detected, and move the remaining bits to the front of each
+    # row
+    kb = k0[:, None] + Kb*np.arange(1, (N - 1)//Kb + 1)
+    valid = kb < N
+    kb = np.minimum(kb, N - 1)
+    valid = valid & np.take_along_axis(d, kb, axis=1)
+    b = np.real(np.conj(b1)[:, None]*np.take_along_axis(xx, kb, axis=1)) > 0
+    order = np.argsort(~valid, axis=1, kind='stable')
+    b = np.take_along_axis(b, order, axis=1)
+    n = np.sum(valid, axis=1)
+
+    return b.astype(int), n
+
+def _real_dtype(dtype: np.dtype) -> np.dtype:
+    """
+    Returns the real floating-point type of the same precision as `dtype`:
+    float32 for float32 and complex64, float64 otherwise.
+    """
+    if np.dtype(dtype) in (np.float32, np.complex64):
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
 def _unwrap(xp: np.array, alpha: float=np.pi/8) -> np.array:
     """
     Unwraps the phase for binary phase-shift keying modulated signals.
@@ -249,7 +522,7 @@ def _unwrap(xp: np.array, alpha: float=np.pi/8) -> np.array:
 
     return xp
 
-def simulate_channel(x: np.array, fs: float, channel_id: int, SNR: float=20.0, eta: float=0.25, dmax: float=5.0) -> np.array:
+def simulate_channel(x: np.array, fs: float, channel_id: int, SNR: float=20.0, eta: float=0.25, dmax: float=5.0, rng: np.random.Generator=None) -> np.array:
     """
     Takes the modulated (discrete-time) signal `x` (generated at sampling 
     frequency `fs`) and simulates a wireless transmission through open space at
@@ -280,6 +553,9 @@ def simulate_channel(x: np.array, fs: float, channel_id: int, SNR: float=20.0, e
     sampled from a Gaussian distribution with mean 1 and standard deviation 
     0.2.
 
+    See `ChannelSimulator` for a block-by-block version with constant memory
+    (which draws the random numbers in a different order).
+
     /!\ The default values for `SNR`, `eta`,  as well as `dmax` should not be
         changed unless you know what you are doing. /!\
 
@@ -305,21 +581,31 @@ def simulate_channel(x: np.array, fs: float, channel_id: int, SNR: float=20.0, e
     dmax : float, default 5.0
         The maximum transmission distance.
 
+    rng : numpy.random.Generator, optional
+        Random number generator to draw the distance, noise, and interference
+        from. If not given, the global state of `numpy.random` is used.
+
     Returns
     -------
     y : numpy.array
         The signal received by the receiver.
     """
 
+    from filtering import fir_filter
+
+    watch = profiling.stopwatch(x.shape[0])
+
     # Get channel parameters
-    if not (channel_id >= 1 and channel_id < _channels.shape[1]-1):
-        raise ValueError(f'channel_id must be between 1 and {_channels.shape[1]}, but {channel_id} given.')
-    channel = _channels[:, channel_id]
+    sigma2, fis = _channel_model(channel_id, SNR, fs)
+    if rng is None:
+        rand, randn, randint = np.random.rand, np.random.randn, np.random.randint
+    else:
+        rand, randn, randint = rng.random, rng.standard_normal, rng.integers
 
     # Create the channel impulse response: A Kronecker delta with amplitude 
     # exp(-eta*d) at sample m
     c = 340
-    d = dmax*np.random.rand(1)
+    d = dmax*rand()
     m = int(np.round(d/c*fs))
     h = np.zeros(m+1)
     h[m] = np.exp(-eta*d)
@@ -330,34 +616,148 @@ def simulate_channel(x: np.array, fs: float, channel_id: int, SNR: float=20.0, e
     Nbuf = int(np.round(0.5*fs))
     x = np.concatenate((x, np.zeros(m+Nbuf,)))
 
-    # Calculate the noise variance based on the SNR (and the sampling 
-    # frequency)
-    fb = (channel[1] - channel[0])/2            # One-sided channel bandwidth
-    Pnoise = 10**((channel[2] - SNR)/10)*1e-3   # In-band noise power for given SNR
-    sigma2 = Pnoise*fs/(4*fb)                   # White noise power for given SNR
+    # Add noise with the variance for the given SNR
     Nx = x.shape[0]
-    vn = np.sqrt(sigma2)*np.random.randn(Nx)
+    vn = np.sqrt(sigma2)*randn(Nx)
 
-    # Add out-of-band interference at a random channel, uniformly distributed
-    # outside the channel's frequency band taking aliasing into account (i.e.,
-    # making sure that the interference doesn't cause aliasing). The latter is 
-    # achieved by noting that the sampling frequency ws >> 4*wc, which means 
-    # that channels with carrier frequency <= 2*wc are allowed.
-    fc = (channel[0]+channel[1])/2
-    fcs = (_channels[0, :]+_channels[1, :])/2
-    ichannels = (fcs <= 2*fc) & (fcs != fc)
-    fcs = fcs[ichannels]
-    ichannel = np.random.randint(0, fcs.shape[0])
-    fi = fcs[ichannel]
+    # Add out-of-band interference at a random channel
+    ichannel = randint(0, fis.shape[0])
+    fi = fis[ichannel]
 
     # Now, sample the interference amplitude with a mean of 1 (30 dBm) and 
     # a standard deviation of 0.2 (95 % between 0.6 and 1.4). Then add 
     # everything together to generate the interference signal
-    Ai = 1 + 0.2*np.random.rand(1)
+    Ai = 1 + 0.2*rand()
     k = np.arange(0, x.shape[0])
     vi = Ai*np.sin(2*np.pi*fi*k/fs)
 
     # Construct received signal
-    y = signal.lfilter(h, 1, x) + vn + vi
+    y = fir_filter(h, x) + vn + vi
+    watch.stop('channel')
 
     return y
+
+class ChannelSimulator:
+    """
+    Streaming version of `simulate_channel()`: Simulates the transmission of a
+    signal through the channel block by block, with constant memory, such
+    that arbitrarily long transmissions can be simulated.
+
+    The distance (attenuation and delay) and the interference are drawn when
+    the simulator is created, the noise is drawn block by block. The delay is
+    applied by shifting the signal through a delay line of `m` samples. The
+    output does not depend on the block size.
+
+    Parameters
+    ----------
+    fs : float
+        Sampling frequency.
+    channel_id : int
+        The id of the communication channel.
+    SNR : float, default 20.0
+        The signal-to-noise ratio at the transmitter (in dBm).
+    eta : float, default 0.25
+        Fading coefficient.
+    dmax : float, default 5.0
+        The maximum transmission distance.
+    rng : numpy.random.Generator, optional
+        Random number generator (default: a new, randomly seeded generator).
+    """
+
+    def __init__(self, fs: float, channel_id: int, SNR: float=20.0, eta: float=0.25, dmax: float=5.0, rng: np.random.Generator=None):
+        if rng is None:
+            rng = np.random.default_rng()
+        self.fs = fs
+        self.rng = rng
+        sigma2, fis = _channel_model(channel_id, SNR, fs)
+        self.sigma = np.sqrt(sigma2)
+
+        # Distance, attenuation, and delay
+        c = 340
+        self.d = dmax*rng.random()
+        self.m = int(np.round(self.d/c*fs))
+        self.attenuation = np.exp(-eta*self.d)
+
+        # Interference
+        self.fi = fis[rng.integers(0, fis.shape[0])]
+        self.Ai = 1 + 0.2*rng.random()
+        self.interference = NCO(self.fi, fs)
+
+        # Delay line and length of the buffer appended by flush() (as in
+        # simulate_channel())
+        self.delay = np.zeros(self.m)
+        self.Nbuf = int(np.round(0.5*fs))
+
+    def process(self, x: np.array) -> np.array:
+        """
+        Simulates the transmission of a block of the signal. Returns a block of
+        the received signal of the same length.
+        """
+        N = x.shape[0]
+        with profiling.stage('channel', N):
+            xx = np.concatenate((self.delay, x))
+            self.delay = xx[N:]
+            return self.attenuation*xx[:N] + self.sigma*self.rng.standard_normal(N) + self.Ai*self.interference.sin(N)
+
+    def flush(self) -> np.array:
+        """
+        Ends the transmission: Returns the rest of the delayed signal and a 
+        buffer of 0.5 s of noise and interference.
+        """
+        return self.process(np.zeros(self.m + self.Nbuf))
+
+    def stream(self, blocks):
+        """
+        Simulates the transmission of a signal given block by block (any
+        iterable of blocks, e.g., `streaming.StreamingTransmitter.blocks()`)
+        and yields the received signal block by block, followed by the block
+        returned by `flush()`.
+        """
+        for x in blocks:
+            yield self.process(x)
+        yield self.flush()
+
+def _channel_model(channel_id: int, SNR: float, fs: float) -> tuple:
+    """
+    Calculates the parameters of the channel model used by
+    `simulate_channel()`: The variance of the white noise for the given SNR
+    and the frequencies the out-of-channel interference may be drawn from.
+
+    Parameters
+    ----------
+    channel_id : int
+        The id of the communication channel.
+    SNR : float
+        The signal-to-noise ratio at the transmitter (in dBm).
+    fs : float
+        Sampling frequency.
+
+    Returns
+    -------
+    sigma2 : float
+        White noise power.
+    fis : numpy.array
+        Possible interference frequencies.
+    """
+
+    if not (channel_id >= 1 and channel_id < _channels.shape[1]-1):
+        raise ValueError(f'channel_id must be between 1 and {_channels.shape[1]}, but {channel_id} given.')
+    channel = _channels[:, channel_id]
+
+    # Calculate the noise variance based on the SNR (and the sampling 
+    # frequency)
+    fb = (channel[1] - channel[0])/2            # One-sided channel bandwidth
+    Pnoise = 10**((channel[2] - SNR)/10)*1e-3   # In-band noise power for given SNR
+    sigma2 = Pnoise*fs/(4*fb)                   # White noise power for given SNR
+
+    # The interference is at a random channel, uniformly distributed outside
+    # the channel's frequency band taking aliasing into account (i.e., making
+    # sure that the interference doesn't cause aliasing). The latter is 
+    # achieved by noting that the sampling frequency ws >> 4*wc, which means 
+    # that channels with carrier frequency <= 2*wc are allowed.
+    fc = (channel[0]+channel[1])/2
+    fcs = (_channels[0, :]+_channels[1, :])/2
+    ichannels = (fcs <= 2*fc) & (fcs != fc)
+    fis = fcs[ichannels]
+
+    return sigma2, fis